@@ -0,0 +1 @@
+""" Package for timing the simulation's hot paths, and recording their timings to spot regressions between runs. """
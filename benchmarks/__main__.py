@@ -0,0 +1,41 @@
+""" Runs the benchmarks, records them to the history file, and reports any regressions since the previous run. """
+
+from argparse import ArgumentParser
+from sys import exit
+
+from src.classes.config import Config
+from benchmarks.history import DEFAULT_HISTORY_PATH, DEFAULT_THRESHOLD, load_history, save_history, make_record, find_regressions
+from benchmarks.suite import PARTICLE_COUNTS, run_benchmarks
+from benchmarks.startup import MEASURED_MODULE, measure_import_time
+
+
+def parse_arguments() -> dict:
+    parser = ArgumentParser(prog="python -m benchmarks", description="Times the simulation's hot paths on setups built from `.config/config.yaml`.")
+    parser.add_argument("--particle-counts", type=int, nargs="+", default=PARTICLE_COUNTS, help="particle counts to time each benchmark at")
+    parser.add_argument("--repeats", type=int, default=3, help="timings taken of each benchmark, of which the fastest is kept")
+    parser.add_argument("--only", nargs="+", dest="names", help="names of the benchmarks to run, such as `simulate_timestep`, or `startup` for the import time")
+    parser.add_argument("--history", default=DEFAULT_HISTORY_PATH, help="JSON file the timings are recorded to")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="fractional slowdown flagged as a regression")
+    parser.add_argument("--no-record", action="store_true", help="compare against the history without adding this run to it")
+    return vars(parser.parse_args())
+
+
+def main(particle_counts: list[int], repeats: int, names: list[str] | None, history: str, threshold: float, no_record: bool) -> int:
+    CFG = Config()
+    timings = run_benchmarks(CFG, tuple(particle_counts), repeats, names)
+    if (not names) or ("startup" in names):
+        key = f"startup/import {MEASURED_MODULE}"
+        timings[key] = measure_import_time(repeats=repeats)
+        print(f"{key:<72} {timings[key]:>12.6f} s")
+
+    records = load_history(history)
+    regressions = find_regressions(records, timings, threshold)
+    for key, (previous, current) in regressions.items():
+        print(f"REGRESSION {key}: {previous:.6f} s -> {current:.6f} s ({current/previous - 1:+.0%})")
+    if not no_record:
+        save_history(history, records + [make_record(timings)])
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    exit(main(**parse_arguments()))
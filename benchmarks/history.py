@@ -0,0 +1,57 @@
+""" Module for recording benchmark timings to a JSON history, and flagging regressions against earlier runs. """
+
+import json
+from datetime import datetime, timezone
+from os import path, replace
+from platform import python_version
+from subprocess import run, DEVNULL
+
+import numpy
+
+DEFAULT_HISTORY_PATH = "benchmarks/history.json"
+DEFAULT_THRESHOLD = 0.2 #* Fractional slowdown beyond which a timing is flagged.
+
+
+def load_history(filename: str) -> list[dict]:
+    """ Returns the list of recorded runs in `filename`, or an empty list if there isn't one yet. """
+    if not path.exists(filename):
+        return list()
+    with open(filename, "r") as history_file:
+        return json.load(history_file)
+
+
+def save_history(filename: str, history: list[dict]) -> None:
+    """ Writes `history` to `filename`, via a temporary file so an interrupted write can't lose earlier runs. """
+    with open(filename + ".tmp", "w") as history_file:
+        json.dump(history, history_file, indent=1)
+    replace(filename + ".tmp", filename)
+
+
+def get_commit() -> str | None:
+    """ Returns the current git commit hash, or `None` outside a git repository. """
+    result = run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, stdin=DEVNULL)
+    return result.stdout.strip() if (result.returncode == 0) else None
+
+
+def make_record(timings: dict[str, float]) -> dict:
+    """ Returns a history entry for `timings`, along with what's needed to tell runs apart. """
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": get_commit(),
+        "python": python_version(),
+        "numpy": numpy.__version__,
+        "timings": timings,
+    }
+
+
+def find_regressions(history: list[dict], timings: dict[str, float], threshold: float = DEFAULT_THRESHOLD) -> dict[str, tuple[float, float]]:
+    """
+    Compares each of `timings` against its most recent timing in `history`.\n
+    Returns a dictionary mapping each benchmark that slowed down by more than `threshold` to its (previous, current) timings.
+    """
+    regressions = dict()
+    for key, timing in timings.items():
+        previous = next(( record["timings"][key] for record in reversed(history) if key in record["timings"] ), None)
+        if (previous is not None) and (timing > previous * (1 + threshold)):
+            regressions[key] = (previous, timing)
+    return regressions
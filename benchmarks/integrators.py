@@ -0,0 +1,71 @@
+""" Compares the energy error each integrator reaches against the CPU time it takes, over a range of timestep sizes. """
+
+from argparse import ArgumentParser
+from copy import copy
+from time import process_time
+
+from src.classes.config import Config, INTEGRATORS
+from src.energy import calculate_total_energy_of_particles
+from src.motion_calcs import initialise_particles, simulate_timestep
+from src.particle_setup import get_configured_system
+
+TIMESTEP_SIZES = (0.02, 0.01, 0.005, 0.0025)
+
+
+def measure_integrator(config_object: Config, integrator: str, dt: float, duration: float) -> dict:
+    """
+    Simulates the particles `config_object` sets up for `duration`, without collisions, using `integrator` and steps of `dt`.\n
+    Returns the CPU time it took and the relative change in total energy by the end.
+    """
+    run_config = copy(config_object)
+    run_config.integrator, run_config.block_timesteps = integrator, False
+    run_config.dt, run_config.half_dtsq = dt, .5*dt**2
+    run_config.collision_distance = 0 #* Merges would change the energy for reasons other than the integrator.
+
+    system = get_configured_system(run_config)
+    initialise_particles(system, run_config)
+    initial_energy = calculate_total_energy_of_particles(system.to_particles(), run_config)
+
+    steps = round(duration / dt)
+    start = process_time()
+    for _ in range(steps):
+        simulate_timestep(system, run_config)
+    cpu_seconds = process_time() - start
+
+    final_energy = calculate_total_energy_of_particles(system.to_particles(), run_config)
+    return {
+        "integrator": integrator,
+        "dt": dt,
+        "steps": steps,
+        "cpu_seconds": cpu_seconds,
+        "energy_error": abs(final_energy / initial_energy - 1),
+    }
+
+
+def compare_integrators(config_object: Config, timestep_sizes: tuple[float] = TIMESTEP_SIZES, duration: float = 5.) -> list[dict]:
+    """ Returns a measurement of every integrator at every one of `timestep_sizes`. """
+    return [
+        measure_integrator(config_object, integrator, dt, duration)
+        for integrator in INTEGRATORS for dt in timestep_sizes
+    ]
+
+
+def format_comparison(results: list[dict]) -> str:
+    header = f"{'integrator':>10} {'dt':>8} {'steps':>7} {'cpu (s)':>9} {'energy error':>13}"
+    rows = [
+        f"{row['integrator']:>10} {row['dt']:>8.4g} {row['steps']:>7} {row['cpu_seconds']:>9.3f} {row['energy_error']:>13.3e}"
+        for row in results
+    ]
+    return "\n".join([header, *rows])
+
+
+def main() -> None:
+    parser = ArgumentParser(prog="python -m benchmarks.integrators", description="Compares integrators on the particles set up by `.config/config.yaml`.")
+    parser.add_argument("--dt", type=float, nargs="+", default=TIMESTEP_SIZES, help="timestep sizes to run each integrator with")
+    parser.add_argument("--duration", type=float, default=5., help="simulated time each run covers")
+    arguments = parser.parse_args()
+    print(format_comparison(compare_integrators(Config(), tuple(arguments.dt), arguments.duration)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+""" Measures how long a fresh interpreter takes to import the headless entry point, against a target that batch jobs rely on. """
+
+from argparse import ArgumentParser
+from subprocess import run
+from sys import executable, exit
+
+IMPORT_TIME_TARGET = 0.4 #* Seconds. Importing `src.main` with matplotlib took about 0.8 s, and 0.23 s without it.
+MEASURED_MODULE = "src.main"
+
+
+def measure_import_time(module: str = MEASURED_MODULE, repeats: int = 5) -> float:
+    """ Imports `module` in `repeats` fresh interpreters, returning the fastest time taken, in seconds, leaving out the interpreter's own startup. """
+    script = f"from time import perf_counter; start = perf_counter(); import {module}; print(perf_counter() - start)"
+    timings = list()
+    for _ in range(repeats):
+        result = run([executable, "-c", script], capture_output=True, text=True, check=True)
+        timings.append(float(result.stdout))
+    return min(timings)
+
+
+def loaded_modules(module: str = MEASURED_MODULE) -> set[str]:
+    """ Returns the names of every module a fresh interpreter has loaded after importing `module`. """
+    script = f"import sys, {module}; print(' '.join(sys.modules))"
+    return set(run([executable, "-c", script], capture_output=True, text=True, check=True).stdout.split())
+
+
+def main() -> None:
+    parser = ArgumentParser(prog="python -m benchmarks.startup", description=f"Times importing `{MEASURED_MODULE}`, failing if it takes longer than the target.")
+    parser.add_argument("--repeats", type=int, default=5, help="fresh interpreters to time, of which the fastest is kept")
+    parser.add_argument("--target", type=float, default=IMPORT_TIME_TARGET, help="most seconds the import may take")
+    arguments = parser.parse_args()
+
+    timing = measure_import_time(repeats=arguments.repeats)
+    print(f"import {MEASURED_MODULE}: {timing:.3f} s (target {arguments.target:.3f} s)")
+    exit(0 if timing <= arguments.target else 1)
+
+
+if __name__ == "__main__":
+    main()
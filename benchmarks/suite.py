@@ -0,0 +1,128 @@
+""" Module defining the benchmarked functions, and the particle setups they're timed on. """
+
+from copy import copy
+from time import perf_counter
+from typing import Callable
+
+from src.classes.config import Config
+from src.classes.particle_system import ParticleSystem
+from src.collision_handler import collision_pairs_finder, collided_id_grouper, get_disp_dist_and_handle_collisions, handle_collisions
+from src.energy import calculate_kinetic_energy_of_particles, calculate_potential_energy_of_particles
+from src.motion_calcs import initialise_particles, simulate_timestep
+from src.particle_setup import get_configured_system
+
+PARTICLE_COUNTS = (10, 100, 1_000, 10_000, 100_000)
+DENSITIES = ("sparse", "collision_heavy")
+
+
+def get_benchmark_config(config_object: Config, number_of_particles: int, density: str, force_engine: str | None = None) -> Config:
+    """
+    Takes in the base `config_object`, returns a copy set up for a benchmark.\n
+    A `collision_heavy` setup has a collision distance close to the typical spacing between particles, so most of them merge;
+    a `sparse` one has a collision distance small enough that collisions are rare.
+    """
+    benchmark_config = copy(config_object)
+    benchmark_config.number_of_particles = number_of_particles
+    benchmark_config.force_engine = force_engine or "direct"
+    benchmark_config.workers = 1
+    spacing = config_object.max_distance * number_of_particles**(-1/3)
+    benchmark_config.collision_distance = spacing if (density == "collision_heavy") else 1e-6 * spacing
+    return benchmark_config
+
+
+_GENERATED_SYSTEMS: dict[tuple, ParticleSystem] = dict()
+GENERATION_SETTINGS = ("random_seed", "number_of_particles", "max_mass", "max_distance", "max_speed")
+
+
+def _configured_system(config_object: Config) -> ParticleSystem:
+    """ Returns the particles `config_object` sets up, only generating them once for every setup that shares them. """
+    key = tuple( getattr(config_object, name) for name in GENERATION_SETTINGS )
+    if key not in _GENERATED_SYSTEMS:
+        _GENERATED_SYSTEMS[key] = get_configured_system(config_object)
+    return _GENERATED_SYSTEMS[key]
+
+
+def copy_system(system: ParticleSystem) -> ParticleSystem:
+    return ParticleSystem(system.ids, system.masses, system.positions, system.velocities, system.accelerations)
+
+
+class Benchmark:
+    """
+    A function to time, with a `setup` that takes in a benchmark `Config` and returns the function's arguments.\n
+    Setups aren't timed, and run again before every repeat, so functions that change their arguments can be timed repeatedly.\n
+    Benchmarks are only run up to `max_particles`, for each of their `densities`, and with their `force_engine` if they depend on one.
+    """
+    def __init__(self, name: str, function: Callable, setup: Callable, max_particles: int, densities: tuple[str] = DENSITIES, force_engine: str | None = None) -> None:
+        self.name = name
+        self.function = function
+        self.setup = setup
+        self.max_particles = max_particles
+        self.densities = densities
+        self.force_engine = force_engine
+        self.label = f"{name}[{force_engine}]" if force_engine else name
+
+    def time(self, config_object: Config, repeats: int) -> float:
+        """ Returns the fastest of `repeats` timings of the function, in seconds. """
+        timings = list()
+        for _ in range(repeats):
+            arguments = self.setup(config_object)
+            start = perf_counter()
+            self.function(*arguments)
+            timings.append(perf_counter() - start)
+        return min(timings)
+
+
+def _fresh_system(config_object: Config) -> tuple:
+    return copy_system(_configured_system(config_object)), config_object
+
+
+def _initialised_system(config_object: Config) -> tuple:
+    system = copy_system(_configured_system(config_object))
+    initialise_particles(system, config_object)
+    return system, config_object
+
+
+def _colliding_pairs(config_object: Config) -> tuple:
+    return collision_pairs_finder(_configured_system(config_object), config_object),
+
+
+def _particles(config_object: Config) -> tuple:
+    return _configured_system(config_object).to_particles(),
+
+
+def _particles_and_config(config_object: Config) -> tuple:
+    return _configured_system(config_object).to_particles(), config_object
+
+
+#* Limits keep each benchmark within a few seconds, and within memory for the ones that store every pair.
+BENCHMARKS = (
+    Benchmark("simulate_timestep", simulate_timestep, _initialised_system, 1_000, force_engine="direct"),
+    Benchmark("simulate_timestep", simulate_timestep, _initialised_system, 100_000, force_engine="barnes_hut"),
+    Benchmark("simulate_timestep", simulate_timestep, _initialised_system, 100_000, force_engine="particle_mesh"),
+    Benchmark("get_disp_dist_and_handle_collisions", get_disp_dist_and_handle_collisions, _fresh_system, 1_000),
+    Benchmark("handle_collisions", handle_collisions, _fresh_system, 100_000),
+    Benchmark("collided_id_grouper", collided_id_grouper, _colliding_pairs, 100_000),
+    Benchmark("calculate_kinetic_energy_of_particles", calculate_kinetic_energy_of_particles, _particles, 100_000, densities=("sparse",)),
+    Benchmark("calculate_potential_energy_of_particles", calculate_potential_energy_of_particles, _particles_and_config, 10_000, densities=("sparse",)),
+)
+
+
+def run_benchmarks(config_object: Config, particle_counts: tuple[int] = PARTICLE_COUNTS, repeats: int = 3, names: list[str] = None, report: Callable = print) -> dict[str, float]:
+    """
+    Takes in the base `config_object`, times every benchmark in `names` (or all of them) on every setup within its limits.\n
+    Returns a dictionary of timings keyed by `"label/density/number_of_particles"`, passing each to `report` as it's made.
+    """
+    timings = dict()
+    for benchmark in BENCHMARKS:
+        if names and (benchmark.name not in names):
+            continue
+        for number_of_particles in particle_counts:
+            if number_of_particles > benchmark.max_particles:
+                continue
+            for density in benchmark.densities:
+                benchmark_config = get_benchmark_config(config_object, number_of_particles, density, benchmark.force_engine)
+                key = f"{benchmark.label}/{density}/{number_of_particles}"
+                timings[key] = benchmark.time(benchmark_config, repeats)
+                report(f"{key:<72} {timings[key]:>12.6f} s")
+    _GENERATED_SYSTEMS.clear()
+    return timings
@@ -0,0 +1,133 @@
+""" Module for approximating gravitational accelerations with a Barnes-Hut octree. """
+
+from numpy import ndarray, uint64, int64, arange, argsort, bincount, cumsum, flatnonzero, floor, zeros, repeat, searchsorted, concatenate, r_
+
+from src.classes.config import Config
+from src.permutations import expand_ranges
+
+MAX_DEPTH = 21 #* 3 * 21 bits of Morton key fit into a uint64.
+CHUNK_SIZE = 4_096 #* Particles traversed at once, bounding the size of the interaction lists.
+
+
+class Octree:
+    """
+    Linear octree built from Morton-sorted particles.\n
+    Nodes are stored level by level, so the children of any node occupy a contiguous block of node indices.
+    """
+    def __init__(self, masses: ndarray, positions: ndarray) -> None:
+        lower = positions.min(axis=0)
+        width = (positions.max(axis=0) - lower).max()
+        width = width * (1 + 1e-9) if width > 0 else 1.0
+
+        self.keys = morton_keys(positions, lower, width)
+        self.order = argsort(self.keys, kind="stable")
+        sorted_keys = self.keys[self.order]
+        sorted_masses = masses[self.order]
+        sorted_moments = sorted_masses[:, None] * positions[self.order]
+
+        prefix, shift, start, count, size, parent = list(), list(), list(), list(), list(), list()
+        parent_starts, parent_counts, parent_offset, n_nodes = zeros(1, dtype=int64), r_[len(masses)], 0, 0
+        for level in range(MAX_DEPTH + 1):
+            level_shift = uint64(3 * (MAX_DEPTH - level))
+            prefixes = sorted_keys >> level_shift
+            starts = flatnonzero(r_[True, prefixes[1:] != prefixes[:-1]])
+            counts = r_[starts[1:], len(prefixes)] - starts
+
+            #* Only cells inside internal (multi-particle) nodes of the previous level are part of the tree.
+            parent_rows = searchsorted(parent_starts, starts, side="right") - 1
+            inside = (parent_rows >= 0) & (starts < parent_starts[parent_rows] + parent_counts[parent_rows]) #* -1 is before every parent.
+            in_tree = inside & ((parent_counts[parent_rows] > 1) | (level == 0))
+            starts, counts, parent_rows = starts[in_tree], counts[in_tree], parent_rows[in_tree]
+            if not len(starts):
+                break
+
+            prefix.append(prefixes[starts])
+            shift.append(repeat(level_shift, len(starts)))
+            start.append(starts)
+            count.append(counts)
+            size.append(repeat(width / 2**level, len(starts)))
+            parent.append(parent_rows + parent_offset)
+            parent_starts, parent_counts, parent_offset, n_nodes = starts, counts, n_nodes, n_nodes + len(starts)
+
+        self.prefix = concatenate(prefix)
+        self.shift  = concatenate(shift)
+        self.start  = concatenate(start)
+        self.count  = concatenate(count)
+        self.size   = concatenate(size)
+
+        #* Centre-of-mass aggregation for every node from prefix sums over the sorted particles.
+        ends = self.start + self.count
+        mass_sums = r_[0, cumsum(sorted_masses)]
+        moment_sums = concatenate([zeros((1, 3)), cumsum(sorted_moments, axis=0)])
+        self.mass = mass_sums[ends] - mass_sums[self.start]
+        self.centre_of_mass = (moment_sums[ends] - moment_sums[self.start]) / self.mass[:, None]
+
+        parents = concatenate(parent)[1:]
+        self.n_children = bincount(parents, minlength=len(self.prefix))
+        self.first_child = zeros(len(self.prefix), dtype=int64)
+        self.first_child[self.n_children > 0] = flatnonzero(r_[True, parents[1:] != parents[:-1]]) + 1
+
+    def __len__(self) -> int:
+        return len(self.prefix)
+
+
+def spread_bits(values: ndarray) -> ndarray:
+    """ Spreads the lower 21 bits of each value so that there are two zero bits between each of them. """
+    x = values.astype(uint64) & uint64(0x1fffff)
+    x = (x | x << uint64(32)) & uint64(0x1f00000000ffff)
+    x = (x | x << uint64(16)) & uint64(0x1f0000ff0000ff)
+    x = (x | x << uint64(8))  & uint64(0x100f00f00f00f00f)
+    x = (x | x << uint64(4))  & uint64(0x10c30c30c30c30c3)
+    x = (x | x << uint64(2))  & uint64(0x1249249249249249)
+    return x
+
+
+def morton_keys(positions: ndarray, lower: ndarray, width: float) -> ndarray:
+    """ Takes in `positions` inside the cube starting at `lower` with edge `width`, returns their interleaved Morton keys. """
+    cells = floor((positions - lower) / width * 2**MAX_DEPTH).clip(0, 2**MAX_DEPTH - 1)
+    return spread_bits(cells[:, 0]) << uint64(2) | spread_bits(cells[:, 1]) << uint64(1) | spread_bits(cells[:, 2])
+
+
+def calc_barnes_hut_accelerations(masses: ndarray, positions: ndarray, config_object: Config, out: ndarray | None = None, start: int = 0, stop: int | None = None) -> ndarray:
+    """
+    Takes in particle `masses` and `positions`, and optionally an (N, 3) array to write into.\n
+    Returns an (N, 3) array of accelerations, treating any node whose size is less than `opening_angle` times its distance as a point mass.\n
+    If given, only rows `start` to `stop` are calculated and written to; each row's result doesn't depend on which others are calculated with it.
+    """
+    stop = len(masses) if stop is None else stop
+    accelerations = zeros((len(masses), 3)) if out is None else out
+    block = accelerations[start:stop]
+    block[:] = 0
+    if len(masses) < 2:
+        return accelerations
+
+    tree = Octree(masses, positions)
+    theta_sq = config_object.opening_angle**2
+
+    def accumulate(chosen: ndarray, sources: ndarray, source_masses: ndarray) -> None:
+        displacements = sources - positions[chosen]
+        distances = (displacements**2).sum(axis=1)**.5
+        pair_terms = config_object.G * source_masses / distances**3
+        for axis in range(3):
+            block[:, axis] += bincount(chosen - start, weights=pair_terms * displacements[:, axis], minlength=len(block))
+
+    for chunk_start in range(start, stop, CHUNK_SIZE):
+        chosen = arange(chunk_start, min(chunk_start + CHUNK_SIZE, stop))
+        nodes = zeros(len(chosen), dtype=int64)
+        while len(chosen):
+            separation_sq = ((tree.centre_of_mass[nodes] - positions[chosen])**2).sum(axis=1)
+            contains = (tree.keys[chosen] >> tree.shift[nodes]) == tree.prefix[nodes]
+            is_leaf = tree.n_children[nodes] == 0
+            accept = ~contains & ((tree.size[nodes]**2 < theta_sq * separation_sq) | (is_leaf & (tree.count[nodes] == 1)))
+            accumulate(chosen[accept], tree.centre_of_mass[nodes[accept]], tree.mass[nodes[accept]])
+
+            #* Leaves holding several particles only occur at `MAX_DEPTH`, and are summed directly.
+            crowded = ~accept & is_leaf & (tree.count[nodes] > 1)
+            direct_chosen, direct_rows = expand_ranges(chosen[crowded], tree.start[nodes[crowded]], tree.count[nodes[crowded]])
+            direct_others = tree.order[direct_rows]
+            not_self = direct_others != direct_chosen
+            accumulate(direct_chosen[not_self], positions[direct_others[not_self]], masses[direct_others[not_self]])
+
+            opened = ~accept & ~is_leaf
+            chosen, nodes = expand_ranges(chosen[opened], tree.first_child[nodes[opened]], tree.n_children[nodes[opened]])
+    return accelerations
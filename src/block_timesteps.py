@@ -0,0 +1,62 @@
+""" Module for advancing particles with individual, hierarchical (block) timesteps. """
+
+from numpy import ndarray, ceil, clip, errstate, flatnonzero, int64, log2, zeros
+from numpy.linalg import norm
+
+from src.classes.config import Config
+from src.classes.particle_system import ParticleSystem
+from src.collision_handler import handle_collisions
+from src.hermite import calc_accelerations_and_jerks, hermite_predict, hermite_correct, update_accelerations_and_jerks
+from src.profiling import NULL_TIMER, PhaseTimer
+
+
+def get_block_levels(accelerations: ndarray, jerks: ndarray, config_object: Config) -> ndarray:
+    """
+    Returns the level each particle would like to step at, where level `k` is a step of `dt / 2**k`.\n
+    Each particle's step is at most `timestep_accuracy * |acceleration| / |jerk|`, capped at `block_levels` halvings.
+    """
+    with errstate(divide="ignore", invalid="ignore"):
+        wanted = config_object.timestep_accuracy * norm(accelerations, axis=1) / norm(jerks, axis=1)
+        levels = ceil(log2(config_object.dt / wanted))
+    levels[~(levels >= 0)] = 0 #* Also catches particles without any jerk.
+    return clip(levels, 0, config_object.block_levels).astype(int64)
+
+
+def simulate_block_timestep(system: ParticleSystem, config_object: Config, timer: PhaseTimer = NULL_TIMER) -> int:
+    """
+    Advances every particle in `system` by `dt`, as a series of sub-steps in which only the particles due an update are recalculated.\n
+    Uses a 4th-order Hermite predictor-corrector, so `system.jerks` must be up to date beforehand, as `initialise_particles` leaves them.\n
+    Each particle steps at its own power-of-two fraction of `dt`, and they're all back in sync at the end, when collisions are handled.\n
+    Returns the number of particle force evaluations made, of which a shared timestep would've needed `len(system)` per sub-step.
+    """
+    ticks = 1 << config_object.block_levels #* Integer times within `dt`, so that step boundaries line up exactly.
+    tick = config_object.dt / ticks
+    times = zeros(len(system), dtype=int64)
+    levels = get_block_levels(system.accelerations, system.jerks, config_object)
+    evaluations = 0
+
+    while (times < ticks).any():
+        ends = times + (ticks >> levels)
+        now = ends.min()
+        active = flatnonzero(ends == now)
+
+        #* Predicts every particle to the current time, from wherever it last stepped to, then corrects only the active ones.
+        h = ((now - times) * tick)[:, None]
+        predicted_positions, predicted_velocities = hermite_predict(system, h)
+        accelerations, jerks = calc_accelerations_and_jerks(system.masses, predicted_positions, predicted_velocities, config_object, active)
+        hermite_correct(system, active, h[active], accelerations, jerks)
+        evaluations += len(active)
+        times[active] = now
+
+        #* Steps can shrink at any time, but only grow by one level, and only when that keeps them in line with the larger blocks.
+        wanted, current = get_block_levels(accelerations, jerks, config_object), levels[active]
+        can_grow = (wanted < current) & (now % (ticks >> (current - 1).clip(0)) == 0)
+        levels[active] = (wanted > current)*wanted + (wanted <= current)*(current - can_grow)
+    timer.lap("acceleration")
+
+    particles = len(system)
+    handle_collisions(system, config_object)
+    if len(system) < particles: #* Merges change the forces on everything.
+        update_accelerations_and_jerks(system, config_object)
+    timer.lap("collisions")
+    return evaluations
@@ -0,0 +1,86 @@
+""" Module for saving the simulation's state to disk and resuming from it. """
+
+from hashlib import sha256
+from os import fsync, makedirs, path, replace
+
+from numpy import ndarray, load, savez, zeros
+
+from src.classes.config import Config
+from src.classes.particle_system import ParticleSystem
+
+#* Every setting that changes the trajectory itself, rather than how long it runs for or how it's displayed.
+TRAJECTORY_SETTINGS = (
+    "random_seed", "max_mass", "max_distance", "max_speed", "number_of_particles", "number_of_tracers",
+    "G", "dt", "collision_distance", "force_engine", "opening_angle", "mesh_size",
+    "integrator", "block_timesteps", "block_levels", "timestep_accuracy", "encounter_distance", "encounter_substeps", "legacy_seeding",
+    "stop_at_single_survivor", "escape_radius", "escape_action", #* Culling escapers changes how the survivors move.
+)
+
+
+def config_fingerprint(config_object: Config) -> str:
+    """ Returns a hash of the `config_object` settings that determine the trajectory, used to check a checkpoint belongs to it. """
+    normalised = ";".join(f"{name}={getattr(config_object, name)!r}" for name in TRAJECTORY_SETTINGS)
+    return sha256(normalised.encode()).hexdigest()
+
+
+def tracer_arrays(system: ParticleSystem) -> dict[str, ndarray]:
+    """ Returns the state of the `system`'s tracers to save alongside it, or nothing if it has none. """
+    tracers = system.tracers
+    if tracers is None:
+        return dict()
+    return {
+        "tracer_ids": tracers.ids, "tracer_positions": tracers.positions,
+        "tracer_velocities": tracers.velocities, "tracer_accelerations": tracers.accelerations,
+    }
+
+
+def save_checkpoint(filename: str, system: ParticleSystem, step: int, frame: int, config_object: Config) -> None:
+    """
+    Writes the full state of `system`, the next `step` to simulate and the next trajectory `frame` to `filename`,
+    along with the `simple_log_rate` the trajectory was recorded at.\n
+    The checkpoint is written to a temporary file and then renamed over the old one, so a crash never leaves a partial checkpoint.
+    """
+    folder = path.dirname(filename)
+    if folder:
+        makedirs(folder, exist_ok=True)
+    temporary = filename + ".tmp"
+    with open(temporary, "wb") as file:
+        savez(
+            file,
+            ids=system.ids, masses=system.masses, positions=system.positions,
+            velocities=system.velocities, accelerations=system.accelerations, jerks=system.jerks,
+            **tracer_arrays(system),
+            step=step, frame=frame, log_rate=config_object.simple_log_rate, fingerprint=config_fingerprint(config_object),
+        )
+        file.flush()
+        fsync(file.fileno())
+    replace(temporary, filename)
+
+
+def load_checkpoint(filename: str, config_object: Config) -> tuple[ParticleSystem, int, int]:
+    """
+    Reads the checkpoint at `filename`, checking it was made with the same trajectory settings as `config_object`.\n
+    Returns the saved `ParticleSystem`, the next step to simulate and the next trajectory frame.
+    """
+    with load(filename) as checkpoint:
+        if str(checkpoint["fingerprint"]) != config_fingerprint(config_object):
+            raise ValueError("Checkpoint was made with different settings to the current config, so it can't be resumed.")
+        system = ParticleSystem(
+            checkpoint["ids"], checkpoint["masses"], checkpoint["positions"],
+            checkpoint["velocities"], checkpoint["accelerations"], checkpoint["jerks"],
+        )
+        if "tracer_ids" in checkpoint:
+            system.tracers = ParticleSystem(
+                checkpoint["tracer_ids"], zeros(len(checkpoint["tracer_ids"])), checkpoint["tracer_positions"],
+                checkpoint["tracer_velocities"], checkpoint["tracer_accelerations"],
+            )
+        return system, int(checkpoint["step"]), int(checkpoint["frame"])
+
+
+def load_checkpoint_log_rate(filename: str) -> int | None:
+    """
+    Returns the `simple_log_rate` the checkpoint at `filename` was recorded at, or None if it predates them being saved.\n
+    A resumed run keeps logging at this rate, even if a longer `timesteps` would now give a different one.
+    """
+    with load(filename) as checkpoint:
+        return int(checkpoint["log_rate"]) if "log_rate" in checkpoint else None
@@ -0,0 +1,90 @@
+""" Class for finding neighbouring particles using a uniform grid of spatially hashed cells. """
+
+from itertools import product
+
+from numpy import ndarray, array, arange, argsort, cumsum, floor, insert, int64, ones, searchsorted, tile, unique
+
+from src.permutations import expand_ranges
+
+NEIGHBOUR_OFFSETS = array(list(product((-1, 0, 1), repeat=3)))
+HASH_PRIMES = array([73_856_093, 19_349_663, 83_492_791])
+
+
+def cell_hashes(cells: ndarray) -> ndarray:
+    """ Takes in an (N, 3) array of integer grid cells, returns a spatial hash for each. Distinct cells rarely share a hash. """
+    hashed = cells * HASH_PRIMES #* Wraps around on overflow, which is fine for hashing.
+    return hashed[:, 0] ^ hashed[:, 1] ^ hashed[:, 2]
+
+
+class CellList:
+    """
+    Bins particle rows into a uniform grid of `cell_size` cells, kept sorted by cell hash.\n
+    Rows can be moved or removed afterwards without rebuilding the whole grid.
+    """
+    def __init__(self, positions: ndarray, cell_size: float) -> None:
+        self.cell_size = cell_size
+        self.cells = floor(positions / cell_size).astype(int64)
+        self.keys = cell_hashes(self.cells)
+        self.order = argsort(self.keys, kind="stable")
+        self.sorted_keys = self.keys[self.order]
+
+    @classmethod
+    def from_arrays(cls, cell_size: float, cells: ndarray, keys: ndarray, order: ndarray, sorted_keys: ndarray) -> "CellList":
+        """ Rebuilds a `CellList` around existing arrays, such as another process's copy of them, without re-sorting. """
+        cell_list = cls.__new__(cls)
+        cell_list.cell_size, cell_list.cells, cell_list.keys, cell_list.order, cell_list.sorted_keys = cell_size, cells, keys, order, sorted_keys
+        return cell_list
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def neighbouring_pairs(self, rows: ndarray | None = None) -> tuple[ndarray, ndarray]:
+        """
+        Returns the row indices (x, y), x < y, of every pair sharing or bordering a cell, sorted by (x, y).\n
+        If `rows` are given, only pairs involving at least one of them are returned.
+        """
+        chosen_rows = arange(len(self)) if rows is None else rows
+
+        #* Every chosen row is paired with each of its 27 neighbouring cells at once.
+        neighbour_keys = cell_hashes((self.cells[chosen_rows][None, :, :] + NEIGHBOUR_OFFSETS[:, None, :]).reshape(-1, 3))
+        lower = searchsorted(self.sorted_keys, neighbour_keys, side="left")
+        upper = searchsorted(self.sorted_keys, neighbour_keys, side="right")
+        chosen, sorted_rows = expand_ranges(tile(chosen_rows, len(NEIGHBOUR_OFFSETS)), lower, upper - lower)
+        others = self.order[sorted_rows]
+
+        if rows is None:
+            ordered = chosen < others #* Each pair is found from both sides, so only one side is kept.
+            first, second = chosen[ordered], others[ordered]
+        else:
+            distinct = chosen != others
+            first = chosen[distinct].clip(max=others[distinct])
+            second = chosen[distinct].clip(min=others[distinct])
+
+        pair_codes = unique(first * len(self) + second) #* Also removes duplicates from any hash clashes.
+        return pair_codes // len(self), pair_codes % len(self)
+
+    def update(self, positions: ndarray, moved: ndarray, removed: ndarray) -> ndarray:
+        """
+        Takes in the post-removal `positions`, with the `moved` and `removed` rows numbered as they were before removal.\n
+        Patches the grid to match, and returns the new row numbers of the `moved` rows.
+        """
+        keep = ones(len(self), dtype=bool)
+        keep[removed] = False
+        new_rows = cumsum(keep) - 1
+
+        stale = ~keep
+        stale[moved] = True
+        retained = ~stale[self.order]
+        order, sorted_keys = new_rows[self.order[retained]], self.sorted_keys[retained]
+
+        moved = new_rows[moved]
+        self.cells, self.keys = self.cells[keep], self.keys[keep]
+        self.cells[moved] = floor(positions[moved] / self.cell_size).astype(int64)
+        self.keys[moved] = cell_hashes(self.cells[moved])
+
+        #* Re-inserts the moved rows in sorted order, rather than sorting everything again.
+        moved_by_key = moved[argsort(self.keys[moved], kind="stable")]
+        insert_at = searchsorted(sorted_keys, self.keys[moved_by_key])
+        self.sorted_keys = insert(sorted_keys, insert_at, self.keys[moved_by_key])
+        self.order = insert(order, insert_at, moved_by_key)
+        return moved
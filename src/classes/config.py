@@ -3,6 +3,10 @@
 from yaml import safe_load
 from logging import getLogger, basicConfig, INFO
 
+FORCE_ENGINES = ("direct", "barnes_hut", "particle_mesh")
+INTEGRATORS = ("verlet", "yoshida4", "hermite4")
+ESCAPE_ACTIONS = ("cull", "stop")
+
 
 class Config:
     """ Class containing useful values and accessing user-defined variables """
@@ -22,12 +26,57 @@ class Config:
             raise ValueError("Max distance must be greater than 0.")
         if self.max_speed < 0:
             raise ValueError("Max speed cannot be less than 0.")
+        self.legacy_seeding = config['legacy_seeding']
 
         self.G                   = config['gravitational_constant']
         self.dt                  = config['dt']
         self.timesteps           = config['timesteps']
         self.collision_distance  = config['collision_distance']
         self.number_of_particles = config['number_of_particles']
+        self.number_of_tracers   = config['number_of_tracers']
+        if (not isinstance(self.number_of_tracers, int)) or (self.number_of_tracers < 0):
+            raise ValueError("Number of tracers must be a positive integer, or 0 for none.")
+
+        self.force_engine        = config['force_engine']
+        self.opening_angle       = config['opening_angle']
+        if self.force_engine not in FORCE_ENGINES:
+            raise ValueError(f"Force engine must be one of: {', '.join(FORCE_ENGINES)}.")
+        if self.opening_angle < 0:
+            raise ValueError("Opening angle cannot be less than 0.")
+        self.mesh_size           = config['mesh_size']
+        if (not isinstance(self.mesh_size, int)) or (self.mesh_size < 4):
+            raise ValueError("Mesh size must be an integer of at least 4.")
+
+        self.workers             = config['workers']
+        if (not isinstance(self.workers, int)) or (self.workers < 1):
+            raise ValueError("Workers must be a positive integer.")
+
+        self.integrator          = config['integrator']
+        if self.integrator not in INTEGRATORS:
+            raise ValueError(f"Integrator must be one of: {', '.join(INTEGRATORS)}.")
+        if (self.integrator == "hermite4") and (self.force_engine != "direct"):
+            raise ValueError("The Hermite integrator can only be used with the direct force engine.")
+
+        self.block_timesteps     = config['block_timesteps']
+        self.block_levels        = config['block_levels']
+        self.timestep_accuracy   = config['timestep_accuracy']
+        if self.block_timesteps and (self.force_engine != "direct"):
+            raise ValueError("Block timesteps can only be used with the direct force engine.")
+        if (not isinstance(self.block_levels, int)) or not (0 <= self.block_levels <= 30):
+            raise ValueError("Block levels must be an integer from 0 to 30.")
+        if self.timestep_accuracy <= 0:
+            raise ValueError("Timestep accuracy must be greater than 0.")
+
+        self.encounter_distance  = config['encounter_distance']
+        self.encounter_substeps  = config['encounter_substeps']
+        if self.encounter_distance < 0:
+            raise ValueError("Encounter distance cannot be less than 0.")
+        if (not isinstance(self.encounter_substeps, int)) or (self.encounter_substeps < 1):
+            raise ValueError("Encounter substeps must be a positive integer.")
+        if self.encounter_distance and ((self.integrator != "verlet") or self.block_timesteps):
+            raise ValueError("Close encounters can only be sub-cycled by the verlet integrator, without block timesteps.")
+        if self.encounter_distance and (self.force_engine == "particle_mesh"):
+            raise ValueError("Close encounters can't be sub-cycled with the particle-mesh force engine, which smooths out close forces.")
 
         self.half_dtsq            = .5*self.dt**2
         self.logging              = config['Logging info']
@@ -37,17 +86,70 @@ class Config:
         self.scatter              = config["plot_scatter"]
         self.lines                = config["plot_lines"]
         self.marker_size          = config["marker_size"]
+        self.plot_max_points      = config["plot_max_points"]
+        self.plot_tolerance       = config["plot_tolerance"]
+        self.trajectory_path      = config["trajectory_path"]
+
+        self.animation_path       = config["animation_path"]
+        self.animation_fps        = config["animation_fps"]
+        self.animation_trail      = config["animation_trail"]
+        self.animation_resolution = config["animation_resolution"]
+        if self.animation_fps <= 0:
+            raise ValueError("Animation fps must be greater than 0.")
+        if (not isinstance(self.animation_trail, int)) or (self.animation_trail < 0):
+            raise ValueError("Animation trail must be a positive integer, or 0 to disable trails.")
+        if (len(self.animation_resolution) != 2) or not all( isinstance(pixels, int) and (pixels > 0) for pixels in self.animation_resolution ):
+            raise ValueError("Animation resolution must be a positive integer width and height.")
+
+        self.checkpoint_interval  = config["checkpoint_interval"]
+        self.checkpoint_path      = config["checkpoint_path"]
+        if (not isinstance(self.checkpoint_interval, int)) or (self.checkpoint_interval < 0):
+            raise ValueError("Checkpoint interval must be a positive integer, or 0 to disable checkpoints.")
         if not (self.scatter or self.lines):
             raise ValueError("At least 1 of `plot_scatter` or `plot_lines` must be True.")
+        if (not isinstance(self.plot_max_points, int)) or (self.plot_max_points < 2):
+            raise ValueError("Plot max points must be an integer of at least 2.")
+        if self.plot_tolerance < 0:
+            raise ValueError("Plot tolerance cannot be less than 0.")
 
+        self.stop_at_single_survivor = config["stop_at_single_survivor"]
+        self.escape_radius         = config["escape_radius"]
+        self.escape_action         = config["escape_action"]
+        self.wall_clock_budget     = config["wall_clock_budget"]
+        if self.escape_radius < 0:
+            raise ValueError("Escape radius cannot be less than 0.")
+        if self.escape_action not in ESCAPE_ACTIONS:
+            raise ValueError(f"Escape action must be one of: {', '.join(ESCAPE_ACTIONS)}.")
+        if self.wall_clock_budget < 0:
+            raise ValueError("Wall clock budget cannot be less than 0.")
+
+        self.run_cache_path        = config["run_cache_path"]
+        self.run_cache_max_mb      = config["run_cache_max_mb"]
+        if self.run_cache_max_mb < 0:
+            raise ValueError("Run cache max size cannot be less than 0.")
+
+        self.step_logging          = config["step_logging"]
+        self.telemetry_sample_rate = config["telemetry_sample_rate"]
+        self.telemetry_buffer_size = config["telemetry_buffer_size"]
+        self.telemetry_path        = config["telemetry_path"]
+        self.energy_diagnostics    = config["energy_diagnostics"]
+        if (not isinstance(self.telemetry_sample_rate, int)) or (self.telemetry_sample_rate < 0):
+            raise ValueError("Telemetry sample rate must be a positive integer, or 0 to disable telemetry.")
+        if (not isinstance(self.telemetry_buffer_size, int)) or (self.telemetry_buffer_size < 1):
+            raise ValueError("Telemetry buffer size must be a positive integer.")
+
+        self.output_filename = output_filename
         self.logger = getLogger(__name__)
+
+    def start_logging(self) -> None:
+        """ Sends the `logger`'s messages to `output_filename`, starting it afresh. Only runs call this, so just reading the config has no side effects. """
         basicConfig(
-            filename=output_filename,
+            filename=self.output_filename,
             level=INFO,
             format=self.logging['format'],
             datefmt=self.logging['datefmt'],
             filemode="w"
-        ) 
+        )
 
     @property
     def simple_log_rate(self) -> int:
@@ -57,6 +159,11 @@ class Config:
     def simple_log_rate(self, value) -> None:
         raise ValueError("Cannot change simple_log_rate.")
 
+    @property
+    def logged_frames(self) -> int:
+        """ Number of times positions are logged in a run: once at the start, then every `simple_log_rate` timesteps. """
+        return self.timesteps // self.simple_log_rate + 2
+
     @property
     def total_plot_points(self) -> int:
         return self._total_plot_points
@@ -72,5 +179,3 @@ class Config:
             self._total_plot_points = max_points
         else:
             self._total_plot_points = value
-
-CFG = Config()
\ No newline at end of file
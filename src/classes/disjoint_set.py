@@ -0,0 +1,36 @@
+""" Class for efficiently grouping elements that are linked together through chains of pairs. """
+
+from typing import Hashable
+
+
+class DisjointSet:
+    """ Union-find structure using path compression and union by rank. Elements are added the first time they're seen. """
+    def __init__(self) -> None:
+        self.parent: dict[Hashable, Hashable] = dict()
+        self.rank: dict[Hashable, int] = dict()
+
+    def find(self, element: Hashable) -> Hashable:
+        """ Returns the representative element of the set containing `element`. """
+        if element not in self.parent:
+            self.parent[element], self.rank[element] = element, 0
+            return element
+
+        root = element
+        while (parent := self.parent[root]) != root:
+            root = parent
+        #* Path compression: points everything along the path straight at the root.
+        while (parent := self.parent[element]) != root:
+            self.parent[element] = root
+            element = parent
+        return root
+
+    def union(self, element1: Hashable, element2: Hashable) -> None:
+        """ Merges the sets containing `element1` and `element2`. """
+        root1, root2 = self.find(element1), self.find(element2)
+        if root1 == root2:
+            return
+        if self.rank[root1] < self.rank[root2]:
+            root1, root2 = root2, root1
+        self.parent[root2] = root1
+        if self.rank[root1] == self.rank[root2]:
+            self.rank[root1] += 1
@@ -4,7 +4,10 @@ from numpy import array, isfinite, ndarray
 from numpy.linalg import norm
 
 class Particle:
-    """ Instances represent individual particles involved in simulation. Information about their mass, position, velocity are stored here. """
+    """
+    Instances represent individual particles involved in simulation. Information about their mass, position, velocity are stored here.\n
+    Their `acceleration`, and `jerk` for integrators that use it, are filled in once the simulation starts.
+    """
     def __init__(self, id:int, mass:float, initial_position:list, initial_velocity:list) -> None:
         if not isinstance(id, int):
             raise TypeError("ID must be an integer.")
@@ -34,6 +37,7 @@ class Particle:
         self.position = array(initial_position)
         self.velocity = array(initial_velocity)
         self.acceleration = None
+        self.jerk = None
         
     def momentum(self) -> ndarray:
         return self.mass*self.velocity
@@ -0,0 +1,139 @@
+""" Class for storing the state of every particle in the simulation as contiguous arrays. """
+
+from contextlib import contextmanager
+from typing import Generator
+
+from numpy import array, ndarray, concatenate, flatnonzero, ones, zeros, zeros_like, float64, int64
+
+from src.classes.particle import Particle
+
+STATE_BUFFERS = ("ids", "masses", "positions", "velocities", "accelerations", "last_accelerations", "jerks")
+
+
+def vectors_of(particles: list[Particle], name: str) -> ndarray | None:
+    """ Returns an (N, 3) array of each particle's vector attribute `name`, or None if any of them hasn't got one yet. """
+    if not particles:
+        return None
+    vectors = array([ getattr(ptcl, name, None) for ptcl in particles ], dtype=float64)
+    return vectors if vectors.shape == (len(particles), 3) else None
+
+
+class ParticleSystem:
+    """
+    Structure-of-arrays container for the particles involved in the simulation.\n
+    Row `i` of `masses`, `positions`, `velocities` and `accelerations` all describe the particle with ID `ids[i]`.\n
+    `last_accelerations` holds the previous step's accelerations and is swapped with `accelerations` each step,\n
+    while `scratch` is working space, so that a timestep can update the state without allocating new arrays.\n
+    `jerks` hold the time derivatives of `accelerations`, which are only kept up to date by integrators that use them.\n
+    `potential_energy` is left by force passes that calculate it along the way, and is `None` whenever it may be out of date.\n
+    `tracers`, if there are any, is a separate system of massless particles that follow this one's gravity without affecting it.
+    """
+    def __init__(self, ids: ndarray, masses: ndarray, positions: ndarray, velocities: ndarray, accelerations: ndarray | None = None, jerks: ndarray | None = None) -> None:
+        self.ids        = array(ids, dtype=int64)
+        self.masses     = array(masses, dtype=float64)
+        self.positions  = array(positions, dtype=float64).reshape(-1, 3)
+        self.velocities = array(velocities, dtype=float64).reshape(-1, 3)
+        self.accelerations = zeros((len(self.ids), 3)) if accelerations is None else array(accelerations, dtype=float64).reshape(-1, 3)
+        self.last_accelerations = zeros_like(self.accelerations)
+        self.jerks = zeros_like(self.accelerations) if jerks is None else array(jerks, dtype=float64).reshape(-1, 3)
+        self.scratch = zeros_like(self.accelerations)
+        self.potential_energy = None
+        self.tracers = None
+
+        if not (len(self.ids) == len(self.masses) == len(self.positions) == len(self.velocities) == len(self.accelerations) == len(self.jerks)):
+            raise ValueError("State arrays must all describe the same number of particles.")
+
+    @classmethod
+    def from_particles(cls, particles: list[Particle]) -> "ParticleSystem":
+        """ Takes in a `Particles` list and copies their states, including any accelerations and jerks they carry, into a new `ParticleSystem`. """
+        return cls(
+            [ptcl.id for ptcl in particles],
+            [ptcl.mass for ptcl in particles],
+            [ptcl.position for ptcl in particles],
+            [ptcl.velocity for ptcl in particles],
+            vectors_of(particles, "acceleration"),
+            vectors_of(particles, "jerk"),
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: int) -> Particle:
+        """ Returns a `Particle` snapshot of the particle stored at row `index`. """
+        particle = Particle(int(self.ids[index]), self.masses[index], self.positions[index], self.velocities[index])
+        particle.acceleration = self.accelerations[index].copy()
+        particle.jerk = self.jerks[index].copy()
+        return particle
+
+    def __iter__(self) -> Generator[Particle]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def to_particles(self) -> list[Particle]:
+        """ Returns a list of `Particle` snapshots, one per particle in the system. """
+        return list(self)
+
+    def index_map(self) -> dict[int, int]:
+        """ Returns a dictionary mapping each particle ID to its row in the state arrays. """
+        return { int(id): index for index, id in enumerate(self.ids) }
+
+    def logged_state(self) -> tuple[ndarray, ndarray, ndarray]:
+        """ Returns the `ids`, `masses` and `positions` of every particle that's logged, including any `tracers` after the massive particles. """
+        if self.tracers is None:
+            return self.ids, self.masses, self.positions
+        return (
+            concatenate([self.ids, self.tracers.ids]),
+            concatenate([self.masses, self.tracers.masses]),
+            concatenate([self.positions, self.tracers.positions]),
+        )
+
+    def momenta(self) -> ndarray:
+        return self.masses[:, None] * self.velocities
+
+    def swap_accelerations(self) -> None:
+        """ Swaps the `accelerations` and `last_accelerations` buffers, ready for new accelerations to be written in place. """
+        self.accelerations, self.last_accelerations = self.last_accelerations, self.accelerations
+
+    def remove(self, indices: list[int]) -> ndarray:
+        """
+        Removes the rows at `indices` from every state buffer, preserving the order of the remaining particles.\n
+        Returns the survivor index map, where new row `i` was previously row `survivors[i]`.
+        """
+        keep = ones(len(self), dtype=bool)
+        keep[indices] = False
+        survivors = flatnonzero(keep)
+        for name in STATE_BUFFERS:
+            setattr(self, name, getattr(self, name)[survivors])
+        self.scratch = self.scratch[:len(survivors)]
+        self.potential_energy = None
+        return survivors
+
+    def update_particles(self, particles: list[Particle]) -> None:
+        """
+        Takes in the `Particles` list this system was built from.\n
+        Copies the system's state back onto it, jerks included so that later timesteps can carry on from them,\n
+        removing any particles that no longer exist in the system.
+        """
+        rows = self.index_map()
+        particles[:] = [ptcl for ptcl in particles if ptcl.id in rows]
+        for particle in particles:
+            row = rows[particle.id]
+            particle.mass         = self.masses[row]
+            particle.position     = self.positions[row].copy()
+            particle.velocity     = self.velocities[row].copy()
+            particle.acceleration = self.accelerations[row].copy()
+            particle.jerk         = self.jerks[row].copy()
+
+
+@contextmanager
+def particle_system_of(particles: "list[Particle] | ParticleSystem") -> Generator[ParticleSystem]:
+    """
+    Yields a `ParticleSystem` for either a `ParticleSystem` or a `Particles` list.\n
+    When given a list, its particles are updated to match the system's state on exit.
+    """
+    if isinstance(particles, ParticleSystem):
+        yield particles
+        return
+    system = ParticleSystem.from_particles(particles)
+    yield system
+    system.update_particles(particles)
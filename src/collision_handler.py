@@ -1,108 +1,125 @@
 """ Module for finding, grouping, and handling collisions between particles. """
 
-from numpy import zeros
+from numpy import ndarray, array, int64, triu_indices
 from numpy.linalg import norm
 
 from src.classes.config import Config
-from src.data_types import Particles, IdCollection, IdPairVectorDict, IdPairFloatDict
-from src.permutations import ordered_pairs_permutations, get_others
+from src.classes.cell_list import CellList
+from src.classes.disjoint_set import DisjointSet
+from src.classes.particle_system import ParticleSystem
+from src.parallel import worker_pool_for
+from src.data_types import IdCollection, PairSeparations
 
 
-def collision_pairs_finder(distances: IdPairFloatDict, ordered_pairs: list[tuple], config_object: Config) -> IdCollection:
+def collision_cell_size(config_object: Config) -> float:
+    """ Returns the grid cell size used to find collisions, which is just the `collision_distance` when it's positive. """
+    return config_object.collision_distance if config_object.collision_distance > 0 else 1.0
+
+
+def collision_pairs_finder(system: ParticleSystem, config_object: Config, cell_list: CellList | None = None, rows: ndarray | None = None) -> IdCollection:
     """
-    Takes in `distances` and ordered `ordered_pairs_permutations`.\n
-    Outputs a list of sets containing pairs of IDs of particles that are colliding with one another.
+    Takes in a `ParticleSystem`, and optionally an up-to-date `CellList` of it and the `rows` to check.\n
+    Outputs a list of sets containing pairs of IDs of particles that are colliding with one another.\n
+    Only pairs in neighbouring `collision_distance`-sized grid cells are checked, as no others can be close enough to collide.\n
+    Full sweeps are split across `workers` if there are several.
     """
-    collision_pairs = list()
-    for x, y in ordered_pairs: # Ordered pairs is faster than iterating over keys directly
-        if distances[(x.id, y.id)] <= config_object.collision_distance:
-            collision_pairs.append({x.id, y.id})
-            # print(f"Collision between {id_pair[0]} and {id_pair[1]}.")
-    return collision_pairs
+    if cell_list is None:
+        cell_list = CellList(system.positions, collision_cell_size(config_object))
+
+    if (rows is None) and (pool := worker_pool_for(len(system), config_object)):
+        first, second = pool.colliding_pairs(cell_list, system.positions, config_object.collision_distance)
+    else:
+        first, second = cell_list.neighbouring_pairs(rows)
+        distances = norm(system.positions[first] - system.positions[second], axis=1)
+        colliding = distances <= config_object.collision_distance
+        first, second = first[colliding], second[colliding]
+    return [ {int(system.ids[x]), int(system.ids[y])} for x, y in zip(first, second) ]
 
 
 def collided_id_grouper(id_collection: IdCollection) -> IdCollection:
     """
-    Looks at every possible ordered pair permutation and merges them if an intersection exists,\n
-    repeating until all possible merges are exhausted.\n
-    Returns list containing sets of mutually colliding ids.
+    Unions the IDs of every colliding pair in a `DisjointSet`, so chains of pairs are grouped in near-linear time.\n
+    Returns list containing sets of mutually colliding ids, ordered by each group's first appearance in `id_collection`.
     """
-    merged = id_collection.copy()
-    def merger(array: IdCollection) -> IdCollection:
-        new_array = array.copy()
-        for group1, group2 in ordered_pairs_permutations(array):
-            if group1.intersection(group2):
-                group1 |= group2
-                new_array.remove(group2)
-                return new_array
-        return array
-    #* Repeats trying to merge until all possible merges are complete.
-    while (updated_merged:=merger(merged)) != merged:
-        merged = updated_merged
-    return merged
-
-
-def collision_handler(particles: Particles, collision_pairs: IdCollection) -> None:
+    disjoint_set = DisjointSet()
+    for first, *others in id_collection:
+        for other in others:
+            disjoint_set.union(first, other)
+
+    groups = dict()
+    for pair in id_collection:
+        for id in pair:
+            groups.setdefault(disjoint_set.find(id), set()).add(id)
+    return list(groups.values())
+
+
+def collision_handler(system: ParticleSystem, collision_pairs: IdCollection) -> tuple[ndarray, ndarray]:
     """
-    Takes in a `Particles` list, and an `IdCollection` representing ID pairs of particles that are both colliding with each other.\n
-    Returns an abbreviated list of the updated particles, post-collision.\n
-    
+    Takes in a `ParticleSystem`, and an `IdCollection` representing ID pairs of particles that are both colliding with each other.\n
+    Updates the system in place to its post-collision state.\n
+    Returns the rows of the `merged` particles and of the `removed` ones, numbered as they were before removal.\n
+
     Determines which particles are colliding with one another, establishes which is the largest of the group,\n
     combines the masses of the group together, averages their position, conserves their momenta, and removes the smaller particles.
     """
     mutually_colliding_ids = collided_id_grouper(collision_pairs)
+    rows = system.index_map()
 
+    merged, removed = list(), list()
     for collision_group_ids in mutually_colliding_ids:
-        collision_group_particles = [particle for particle in particles if particle.id in collision_group_ids]
-        
-        most_massive = max(collision_group_particles, key=lambda ptcl: ptcl.mass)
+        group = sorted(rows[id] for id in collision_group_ids) #* Sorted so that mass ties resolve the same way as list order.
+        group_masses = system.masses[group]
+        most_massive = group[group_masses.argmax()]
 
         #* Sums quantities to be conserved and applied to remaining particle
-        total_mass, net_position, net_momentum = 0, zeros(3), zeros(3)
-        for particle in collision_group_particles:
-            total_mass += particle.mass
-            net_position += particle.position
-            net_momentum += particle.momentum()
-    
+        total_mass = group_masses.sum()
+        net_momentum = (group_masses[:, None] * system.velocities[group]).sum(axis=0)
+        net_force = (group_masses[:, None] * system.accelerations[group]).sum(axis=0) #* Keeps the pending half-kick momentum-conserving.
+
         # Applies calculated quantities to new particle
-        most_massive.mass = total_mass
-        most_massive.position = net_position / len(collision_group_particles)
-        most_massive.velocity = net_momentum / total_mass
-
-        # Removes all smaller particles from particles list
-        for smaller in get_others(most_massive, collision_group_particles):
-            particles.remove(smaller)
-
-
-def get_displacements_and_distances_from_ordered_pairs(ordered_pairs: list[tuple]) -> tuple[IdPairVectorDict, IdPairFloatDict]:
-    """ Takes in an ordered particle pair list and outputs `displacements` and `distances` between all particles. """
-    displacements, distances = dict(), dict()
-    for x, y in ordered_pairs:
-        displacement = x.position - y.position
-        id_pair, id_pair_rev = (x.id, y.id), (y.id, x.id)
-        # Update displacements
-        displacements[id_pair] = displacement
-        displacements[id_pair_rev] = -displacement
-        # Update distances
-        distances[id_pair] = norm(displacement)
-        distances[id_pair_rev] = distances[id_pair] #*Much faster to lookup than recalculate.
-    return displacements, distances
-
-
-def get_disp_dist_and_handle_collisions(particles: Particles, config_object: Config) -> tuple[IdPairVectorDict, IdPairFloatDict]:
+        system.masses[most_massive] = total_mass
+        system.positions[most_massive] = system.positions[group].mean(axis=0)
+        system.velocities[most_massive] = net_momentum / total_mass
+        system.accelerations[most_massive] = net_force / total_mass
+
+        merged.append(most_massive)
+        removed.extend(row for row in group if row != most_massive)
+
+    # Removes all smaller particles from the system
+    system.remove(removed)
+    return array(merged, dtype=int64), array(removed, dtype=int64)
+
+
+def get_pair_separations(system: ParticleSystem) -> PairSeparations:
+    """
+    Takes in a `ParticleSystem`.\n
+    Returns the row indices of every ordered pair (x, y) with x < y, alongside the `displacements` (x - y) and `distances` between them.
+    """
+    first, second = triu_indices(len(system), k=1)
+    displacements = system.positions[first] - system.positions[second]
+    distances = norm(displacements, axis=1)
+    return first, second, displacements, distances
+
+
+def handle_collisions(system: ParticleSystem, config_object: Config) -> None:
+    """
+    Takes in a `ParticleSystem`.\n
+    Checks for collisions, if there are any then they're handled and then the loop repeats,\n
+    as merged particles may now be touching others. Loop breaks when no collisions remain.\n
+    Only merged particles can have started touching anything, so repeats patch the grid and re-check just those.
+    """
+    cell_list = CellList(system.positions, collision_cell_size(config_object))
+    rows = None
+    while collision_pairs := collision_pairs_finder(system, config_object, cell_list, rows):
+        # config_object.logger.info(f"Collision(s): {collision_pairs}")
+        merged, removed = collision_handler(system, collision_pairs)
+        rows = cell_list.update(system.positions, merged, removed)
+
+
+def get_disp_dist_and_handle_collisions(system: ParticleSystem, config_object: Config) -> PairSeparations:
     """
-    Takes in a Particles list.\n
-    Returns `displacements` and `distances` for post-collision particles.\n
-    Calculates disp/dist and checks for collisions, if there are any then they're handled and then the loop repeats.\n
-    When no collisions remain, disp/dist are calculated, collision_pairs is empty, and loop breaks.
+    Takes in a `ParticleSystem`.\n
+    Handles any collisions, then returns `separations` for the post-collision particles.
     """
-    collision_pairs = 1    # Functions as a 'do while'
-    while collision_pairs: #
-        ordered_pairs_list = list(ordered_pairs_permutations(particles)) #* Must be converted to list to reuse it
-
-        displacements, distances = get_displacements_and_distances_from_ordered_pairs(ordered_pairs_list)
-        collision_pairs = collision_pairs_finder(distances, ordered_pairs_list, config_object)
-        if collision_pairs:
-            # config_object.logger.info(f"Collision(s): {collision_pairs}")
-            collision_handler(particles, collision_pairs)
-    return displacements, distances
+    handle_collisions(system, config_object)
+    return get_pair_separations(system)
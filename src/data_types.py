@@ -1,10 +1,9 @@
 """ Module for abbrevating data structures found throughout the gravity simulation. """
 
-from numpy import ndarray, float64
+from numpy import ndarray
 from src.classes.particle import Particle
 
 Particles = list[Particle]
 IdCollection = list[set[int]]
 PositionLog = dict[int, list]
-IdPairVectorDict = dict[tuple[int,int], ndarray]
-IdPairFloatDict = dict[tuple[int,int],float64]
+PairSeparations = tuple[ndarray, ndarray, ndarray, ndarray] #* (first indices, second indices, displacements, distances)
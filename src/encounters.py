@@ -0,0 +1,81 @@
+""" Module for finding close encounters between particles, and integrating each group involved with smaller sub-steps than the rest of the system. """
+
+from numpy import ndarray, array, ceil, clip, einsum, errstate, inf, int64, isfinite, minimum, sqrt, triu_indices
+from numpy.linalg import norm
+
+from src.classes.cell_list import CellList
+from src.classes.config import Config
+from src.classes.particle_system import ParticleSystem
+from src.collision_handler import collided_id_grouper
+
+
+def find_encounter_groups(system: ParticleSystem, config_object: Config) -> list[ndarray]:
+    """
+    Takes in a `ParticleSystem`.\n
+    Returns the sorted rows of each group of particles within `encounter_distance` of one another, chaining pairs together as collisions do.\n
+    Only pairs in neighbouring `encounter_distance`-sized grid cells are checked, so finding them costs O(N).
+    """
+    cell_list = CellList(system.positions, config_object.encounter_distance)
+    first, second = cell_list.neighbouring_pairs()
+    close = norm(system.positions[first] - system.positions[second], axis=1) <= config_object.encounter_distance
+    pairs = [ {int(x), int(y)} for x, y in zip(first[close], second[close]) ]
+    return [ array(sorted(group), dtype=int64) for group in collided_id_grouper(pairs) ]
+
+
+def calc_group_accelerations(masses: ndarray, positions: ndarray, config_object: Config) -> ndarray:
+    """ Takes in the `masses` and `positions` of a small group of particles, returns their (k, 3) accelerations due to each other alone. """
+    displacements = positions[None, :, :] - positions[:, None, :] #* Point from each particle to every other.
+    distances_sq = einsum("ijk,ijk->ij", displacements, displacements)
+    distances_sq[distances_sq == 0] = inf #* Excludes each particle's interaction with itself, and with any it's stuck to by `stick_touching`.
+    return einsum("ij,ijk->ik", config_object.G * masses[None, :] * distances_sq**-1.5, displacements)
+
+
+def get_encounter_substeps(masses: ndarray, positions: ndarray, velocities: ndarray, config_object: Config) -> int:
+    """
+    Returns how many sub-steps an encounter group takes to cross one `dt`, at most `encounter_substeps`.\n
+    Each sub-step is at most `timestep_accuracy` times the shortest of its pairs' free-fall and crossing times.
+    """
+    first, second = triu_indices(len(masses), k=1)
+    separations = norm(positions[first] - positions[second], axis=1)
+    with errstate(divide="ignore", invalid="ignore"):
+        crossing_times = separations / norm(velocities[first] - velocities[second], axis=1)
+        free_fall_times = sqrt(separations**3 / (config_object.G * (masses[first] + masses[second])))
+        wanted = config_object.dt / (config_object.timestep_accuracy * minimum(free_fall_times, crossing_times).min())
+    if not isfinite(wanted): #* Coincident particles, which only happens without collisions, get as many sub-steps as allowed.
+        return config_object.encounter_substeps
+    return int(clip(ceil(wanted), 1, config_object.encounter_substeps))
+
+
+def stick_touching(masses: ndarray, positions: ndarray, velocities: ndarray, config_object: Config) -> None:
+    """
+    Moves each set of touching particles in an encounter group to their mean position and momentum-conserving velocity, in place.\n
+    That's just how a collision merges them, so they travel together until collisions are handled at the end of the timestep,
+    rather than passing through each other between its sub-steps.
+    """
+    first, second = triu_indices(len(masses), k=1)
+    touching = norm(positions[first] - positions[second], axis=1) <= config_object.collision_distance
+    if not touching.any():
+        return
+    for rows in collided_id_grouper([ {int(x), int(y)} for x, y in zip(first[touching], second[touching]) ]):
+        rows = sorted(rows)
+        positions[rows] = positions[rows].mean(axis=0)
+        velocities[rows] = masses[rows] @ velocities[rows] / masses[rows].sum()
+
+
+def sub_cycle_group(masses: ndarray, positions: ndarray, velocities: ndarray, config_object: Config) -> tuple[ndarray, ndarray]:
+    """
+    Takes in the state of an encounter group, and advances it by `dt` under its own gravity alone, in Velocity Verlet sub-steps.\n
+    Returns the group's new positions and velocities. The pull of the rest of the system is left to the caller's kicks either side.\n
+    Particles that touch along the way are stuck together with `stick_touching`, ready to be merged.
+    """
+    substeps = get_encounter_substeps(masses, positions, velocities, config_object)
+    h = config_object.dt / substeps
+    positions, velocities = positions.copy(), velocities.copy()
+    accelerations = calc_group_accelerations(masses, positions, config_object)
+    for _ in range(substeps):
+        velocities += accelerations * (h/2)
+        positions += velocities * h
+        stick_touching(masses, positions, velocities, config_object)
+        accelerations = calc_group_accelerations(masses, positions, config_object)
+        velocities += accelerations * (h/2)
+    return positions, velocities
@@ -1,31 +1,43 @@
-""" Module for calculating `Particles` system energies. """
+""" Module for calculating `Particles` system energies, and monitoring how well they and the momenta are conserved. """
 
-from numpy import float64
+from numpy import ndarray, array, arange, cross, divide, einsum, float64, sqrt, zeros
 from numpy.linalg import norm
 
 from src.classes.config import Config
-from src.motion_calcs import Particles
-from src.permutations import ordered_pairs_permutations
-from src.data_types import IdPairVectorDict, IdPairFloatDict
+from src.classes.particle_system import ParticleSystem
+from src.data_types import Particles, PairSeparations
+from src.profiling import StepObserver, StepRecord
 
+PAIRS_PER_TILE = 2**20 #* Bounds the working memory of `calc_potential_energy` to a few arrays of this many pairs.
 
-def get_displacements_and_distances(particles: Particles) -> tuple[IdPairVectorDict, IdPairFloatDict]:
+
+def calc_kinetic_energy(masses: ndarray, velocities: ndarray) -> float64:
+    """ Takes in particle `masses` and `velocities`, returns their total kinetic energy. """
+    return (.5 * masses * norm(velocities, axis=1)**2).sum()
+
+
+def calc_potential_energy(masses: ndarray, positions: ndarray, config_object: Config) -> float64:
     """
-    Takes in a `particles` list.\n
-    Returns a tuple containing displacement and distance dictionaries. 
+    Takes in particle `masses` and `positions`, returns their total potential energy.\n
+    Pairs are summed a tile of rows at a time, so memory grows with N rather than with the number of pairs.
     """
-    displacements, distances = dict(), dict()
-    for x, y in ordered_pairs_permutations(particles):
-        # Calculate variables
-        displacement = x.position - y.position
-        id_pair, id_pair_rev = (x.id, y.id), (y.id, x.id)
-        # Update displacements
-        displacements[id_pair] = displacement
-        displacements[id_pair_rev] = -displacement
-        # Update distances
-        distances[id_pair] = norm(displacement)
-        distances[id_pair_rev] = distances[id_pair]
-    return displacements, distances
+    total_potential = float64(0)
+    tile_size = max(1, PAIRS_PER_TILE // max(len(masses), 1))
+    for start in range(0, len(masses) - 1, tile_size):
+        stop = min(start + tile_size, len(masses))
+        #* Row i of the tile is paired with every later particle j > i, which all come after `start`.
+        displacements = positions[start:stop, None, :] - positions[None, start + 1:, :]
+        distances = sqrt(einsum("ijk,ijk->ij", displacements, displacements))
+        later = arange(start + 1, len(masses))[None, :] > arange(start, stop)[:, None]
+        inverse_distances = divide(1, distances, out=zeros(distances.shape), where=later)
+        total_potential -= config_object.G * (masses[start:stop] @ inverse_distances @ masses[start + 1:])
+    return total_potential
+
+
+def calc_pair_potential_energy(masses: ndarray, separations: PairSeparations, config_object: Config) -> float64:
+    """ Returns the total potential energy from pairwise `separations` that have already been calculated, such as by the force pass. """
+    first, second, _, distances = separations
+    return -config_object.G * (masses[first] * masses[second] / distances).sum()
 
 
 def calculate_kinetic_energy_of_particles(particles: Particles) -> float64:
@@ -35,20 +47,95 @@ def calculate_kinetic_energy_of_particles(particles: Particles) -> float64:
 
 def calculate_potential_energy_of_particles(particles: Particles, config_object: Config) -> float64:
     """ Takes in a `Particles` list, returns a `float64` value representing their total potential energy. """
-    total_potential = 0
-    _, distances = get_displacements_and_distances(particles)
-    for chosen, other in ordered_pairs_permutations(particles):
-        total_potential -= config_object.G * chosen.mass * other.mass / distances[(chosen.id, other.id)]
-    return total_potential
+    if not particles:
+        return float64(0)
+    return calc_potential_energy(array([ptcl.mass for ptcl in particles]), array([ptcl.position for ptcl in particles]), config_object)
 
 
 def calculate_total_energy_of_particles(particles: Particles, config_object: Config) -> float64:
     """ Takes in a `Particles` list and returns their total energy. """
-    total_energy = calculate_kinetic_energy_of_particles(particles) + calculate_potential_energy_of_particles(particles, config_object)    
+    total_energy = calculate_kinetic_energy_of_particles(particles) + calculate_potential_energy_of_particles(particles, config_object)
     return total_energy
 
 
-def print_gravitational_boundedness(particles: Particles, config_object: Config) -> None:
-    """ Takes in a `Particles` list and prints the system's total energy and bounded state. """
-    total_energy = calculate_total_energy_of_particles(particles, config_object)
+def print_gravitational_boundedness(system: ParticleSystem, config_object: Config) -> None:
+    """ Takes in a `ParticleSystem` and prints its total energy and bounded state. """
+    total_energy = calc_kinetic_energy(system.masses, system.velocities) + calc_potential_energy(system.masses, system.positions, config_object)
     print(f"The total system energy is: {total_energy:.2g} J:", "Bound." if (total_energy <=0 ) else "Unbound.")
+
+
+class Diagnostics:
+    """ The conserved quantities of a system at one instant: its `kinetic` and `potential` energies, and its total `momentum` and `angular_momentum`. """
+    __slots__ = ("kinetic", "potential", "momentum", "angular_momentum")
+
+    def __init__(self, kinetic: float64, potential: float64, momentum: ndarray, angular_momentum: ndarray) -> None:
+        self.kinetic = kinetic
+        self.potential = potential
+        self.momentum = momentum
+        self.angular_momentum = angular_momentum
+
+    @property
+    def total(self) -> float64:
+        return self.kinetic + self.potential
+
+    @property
+    def energy_scale(self) -> float64:
+        """ The size of the system's energies, which stays well away from 0 even when the `total` is close to it, as for a marginally bound system. """
+        return abs(self.kinetic) + abs(self.potential)
+
+    def as_dict(self) -> dict:
+        return {
+            "kinetic": float(self.kinetic),
+            "potential": float(self.potential),
+            "momentum": self.momentum.tolist(),
+            "angular_momentum": self.angular_momentum.tolist(),
+        }
+
+
+def get_diagnostics(system: ParticleSystem, config_object: Config) -> Diagnostics:
+    """
+    Returns the energies and momenta of `system`, all in O(N) memory.\n
+    The potential energy left by the last force pass is reused if there is one, otherwise it's calculated in tiles.
+    """
+    potential = system.potential_energy
+    if potential is None:
+        potential = calc_potential_energy(system.masses, system.positions, config_object)
+    momenta = system.momenta()
+    return Diagnostics(
+        calc_kinetic_energy(system.masses, system.velocities),
+        potential,
+        momenta.sum(axis=0),
+        cross(system.positions, momenta).sum(axis=0),
+    )
+
+
+class ConservationMonitor(StepObserver):
+    """
+    Observes the `Diagnostics` of each timestep, tracking the largest drifts in energy, momentum and angular momentum from the `initial` ones.\n
+    Without `initial` diagnostics, the first observed timestep is used instead.
+    The energy drift is relative to the initial `energy_scale`, rather than the initial total, which may be close to 0.
+    """
+    def __init__(self, initial: Diagnostics | None = None) -> None:
+        self.initial = initial
+        self.energy_drift = 0.
+        self.momentum_drift = 0.
+        self.angular_momentum_drift = 0.
+
+    def on_step(self, record: StepRecord) -> None:
+        diagnostics = record.diagnostics
+        if diagnostics is None:
+            return
+        if self.initial is None:
+            self.initial = diagnostics
+        scale = self.initial.energy_scale or 1. #* Only 0 for a single particle at rest.
+        self.energy_drift = max(self.energy_drift, abs(diagnostics.total - self.initial.total) / scale)
+        self.momentum_drift = max(self.momentum_drift, norm(diagnostics.momentum - self.initial.momentum))
+        self.angular_momentum_drift = max(self.angular_momentum_drift, norm(diagnostics.angular_momentum - self.initial.angular_momentum))
+
+    def summary(self) -> str:
+        return "\n".join([
+            "Largest changes since the start:",
+            f"  relative energy: {self.energy_drift:.3e}",
+            f"  momentum: {self.momentum_drift:.3e}",
+            f"  angular momentum: {self.angular_momentum_drift:.3e}",
+        ])
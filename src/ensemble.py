@@ -0,0 +1,195 @@
+""" Module for advancing many independent simulations at once, for sweeping over seeds and physical parameters. """
+
+from argparse import ArgumentParser
+from copy import copy
+from itertools import product
+
+from numpy import ndarray, array, errstate, flatnonzero, full, int64, isin, triu, ones, where, zeros
+from numpy.linalg import norm
+
+from src.classes.config import Config
+from src.classes.particle_system import ParticleSystem
+from src.collision_handler import handle_collisions
+from src.energy import calculate_total_energy_of_particles
+from src.particle_setup import get_configured_system
+
+SWEEPABLE_SETTINGS = ("random_seed", "G", "max_speed")
+
+
+def check_ensemble_config(config_object: Config) -> None:
+    """ Raises a ValueError for any setting the ensemble can't honour, since every member is stepped by direct-sum Velocity Verlet. """
+    if config_object.integrator != "verlet":
+        raise ValueError("Ensembles can only be run with the Verlet integrator.")
+    if config_object.block_timesteps:
+        raise ValueError("Ensembles can't be run with block timesteps.")
+    if config_object.force_engine != "direct":
+        raise ValueError("Ensembles can only be run with the direct force engine.")
+    if config_object.encounter_distance:
+        raise ValueError("Ensembles can't sub-cycle close encounters.")
+    if config_object.number_of_tracers:
+        raise ValueError("Ensembles can't be run with tracers.")
+
+
+class Ensemble:
+    """
+    Independent particle systems stacked along a leading ensemble axis, each padded out to the largest particle count.\n
+    Row `[k, i]` of each state array describes slot `i` of member `k`; padded and merged-away slots are not `alive` and have no mass.
+    """
+    def __init__(self, systems: list[ParticleSystem], configs: list[Config]) -> None:
+        for config in configs:
+            check_ensemble_config(config)
+        if any( system.tracers is not None for system in systems ):
+            raise ValueError("Ensembles can't be run with tracers.")
+        members, slots = len(systems), max(len(system) for system in systems)
+        self.configs = configs
+        self.ids                = full((members, slots), -1, dtype=int64)
+        self.alive              = zeros((members, slots), dtype=bool)
+        self.masses             = zeros((members, slots))
+        self.positions          = zeros((members, slots, 3))
+        self.velocities         = zeros((members, slots, 3))
+        self.accelerations      = zeros((members, slots, 3))
+        self.last_accelerations = zeros((members, slots, 3))
+        for member, system in enumerate(systems):
+            self.ids[member, :len(system)] = system.ids
+            self.set_member(member, system)
+
+        #* Per-member constants, shaped to broadcast against the (members, slots, 3) state arrays.
+        self.G         = array([ config.G for config in configs ])[:, None, None]
+        self.dt        = array([ config.dt for config in configs ])[:, None, None]
+        self.half_dtsq = array([ config.half_dtsq for config in configs ])[:, None, None]
+        self.collision_distance = array([ config.collision_distance for config in configs ])[:, None, None]
+
+    def __len__(self) -> int:
+        return len(self.configs)
+
+    def member(self, member: int) -> ParticleSystem:
+        """ Returns a `ParticleSystem` copy of the living particles of `member`. """
+        alive = self.alive[member]
+        return ParticleSystem(
+            self.ids[member, alive], self.masses[member, alive], self.positions[member, alive],
+            self.velocities[member, alive], self.accelerations[member, alive],
+        )
+
+    def set_member(self, member: int, system: ParticleSystem) -> None:
+        """ Overwrites `member` with the state of `system`, whose particles must be a subset of the member's, in the same order. """
+        self.alive[member] = isin(self.ids[member], system.ids)
+        self.masses[member], self.velocities[member], self.accelerations[member] = 0, 0, 0
+        rows = self.alive[member]
+        self.masses[member, rows] = system.masses
+        self.positions[member, rows] = system.positions
+        self.velocities[member, rows] = system.velocities
+        self.accelerations[member, rows] = system.accelerations
+
+
+def get_ensemble_separations(positions: ndarray) -> tuple[ndarray, ndarray]:
+    """ Takes in (M, N, 3) `positions`, returns (M, N, N, 3) `displacements` where `[k, i, j]` points from slot i to slot j, and their `distances`. """
+    displacements = positions[:, None, :, :] - positions[:, :, None, :]
+    return displacements, norm(displacements, axis=3)
+
+
+def calc_ensemble_accelerations(ensemble: Ensemble, displacements: ndarray, distances: ndarray) -> ndarray:
+    """ Returns the (M, N, 3) accelerations of every slot of every member, where slots without mass exert no force. """
+    with errstate(divide="ignore"):
+        inverse_cubes = where(distances > 0, distances**-3., 0) #* Zero for each slot with itself.
+    weights = ensemble.masses[:, None, :] * inverse_cubes
+    return ensemble.G * (weights[..., None] * displacements).sum(axis=2)
+
+
+def handle_ensemble_collisions(ensemble: Ensemble, distances: ndarray) -> bool:
+    """
+    Finds every member with colliding particles, and handles their collisions just as a single simulation would.\n
+    Returns whether any collisions occurred.
+    """
+    both_alive = ensemble.alive[:, :, None] & ensemble.alive[:, None, :]
+    colliding = triu(ones(distances.shape[1:], dtype=bool), k=1) & both_alive & (distances <= ensemble.collision_distance)
+    collided = flatnonzero(colliding.any(axis=(1, 2)))
+    for member in collided:
+        system = ensemble.member(member)
+        handle_collisions(system, ensemble.configs[member])
+        ensemble.set_member(member, system)
+    return bool(len(collided))
+
+
+def initialise_ensemble(ensemble: Ensemble) -> None:
+    """ Handles any initial collisions and calculates initial accelerations, as `initialise_particles` does for one system. """
+    displacements, distances = get_ensemble_separations(ensemble.positions)
+    if handle_ensemble_collisions(ensemble, distances):
+        displacements, distances = get_ensemble_separations(ensemble.positions)
+    ensemble.accelerations = calc_ensemble_accelerations(ensemble, displacements, distances)
+
+
+def simulate_ensemble_timestep(ensemble: Ensemble) -> None:
+    """ Advances every member of the `ensemble` by one Velocity Verlet timestep, as `simulate_timestep` does for one system. """
+    ensemble.positions += ensemble.velocities*ensemble.dt + ensemble.accelerations*ensemble.half_dtsq
+
+    displacements, distances = get_ensemble_separations(ensemble.positions)
+    if handle_ensemble_collisions(ensemble, distances):
+        displacements, distances = get_ensemble_separations(ensemble.positions)
+
+    ensemble.last_accelerations = ensemble.accelerations
+    ensemble.accelerations = calc_ensemble_accelerations(ensemble, displacements, distances)
+    ensemble.velocities += (ensemble.last_accelerations + ensemble.accelerations)*ensemble.dt/2
+    ensemble.velocities[~ensemble.alive] = 0 #* Keeps empty slots from drifting.
+
+
+def get_member_configs(config_object: Config, sweeps: dict[str, list]) -> list[Config]:
+    """ Returns a copy of `config_object` for every combination of the values in `sweeps`, which maps setting names to lists of values. """
+    configs = list()
+    for values in product(*sweeps.values()):
+        member_config = copy(config_object)
+        for name, value in zip(sweeps, values):
+            setattr(member_config, name, value)
+        configs.append(member_config)
+    return configs
+
+
+def run_ensemble(configs: list[Config], timesteps: int) -> Ensemble:
+    """ Sets up a member for each of `configs`, then simulates them all together for `timesteps` timesteps. """
+    systems = [ get_configured_system(config) for config in configs ]
+    ensemble = Ensemble(systems, configs)
+    initialise_ensemble(ensemble)
+    for _ in range(timesteps + 1):
+        simulate_ensemble_timestep(ensemble)
+    return ensemble
+
+
+def summarise_ensemble(ensemble: Ensemble) -> list[dict]:
+    """ Returns a row per member with its swept settings, final total energy, whether it's bound and how many particles survived. """
+    summary = list()
+    for member, config in enumerate(ensemble.configs):
+        particles = ensemble.member(member).to_particles()
+        total_energy = calculate_total_energy_of_particles(particles, config)
+        summary.append({
+            **{ name: getattr(config, name) for name in SWEEPABLE_SETTINGS },
+            "total_energy": total_energy,
+            "bound": total_energy <= 0,
+            "survivors": len(particles),
+        })
+    return summary
+
+
+def format_summary(summary: list[dict]) -> str:
+    """ Formats an ensemble `summary` as a plain-text table. """
+    header = f"{'member':>6} {'random_seed':>20} {'G':>10} {'max_speed':>10} {'total_energy':>13} {'state':>8} {'survivors':>9}"
+    rows = [
+        f"{member:>6} {row['random_seed']:>20} {row['G']:>10.4g} {row['max_speed']:>10.4g} {row['total_energy']:>13.3g} {'Bound' if row['bound'] else 'Unbound':>8} {row['survivors']:>9}"
+        for member, row in enumerate(summary)
+    ]
+    return "\n".join([header, *rows])
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Runs every combination of the given settings together, starting from `.config/config.yaml`, and prints a summary table.")
+    parser.add_argument("--seeds", type=int, nargs="+", help="values of `random_seed` to run")
+    parser.add_argument("--gravitational-constants", type=float, nargs="+", help="values of `gravitational_constant` to run")
+    parser.add_argument("--max-speeds", type=float, nargs="+", help="values of `max_speed` to run")
+    arguments = parser.parse_args()
+
+    CFG = Config()
+    sweeps = { name: values for name, values in zip(SWEEPABLE_SETTINGS, (arguments.seeds, arguments.gravitational_constants, arguments.max_speeds)) if values }
+    ensemble = run_ensemble(get_member_configs(CFG, sweeps), CFG.timesteps)
+    print(format_summary(summarise_ensemble(ensemble)))
+
+
+if __name__ == "__main__":
+    main()
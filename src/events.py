@@ -0,0 +1,204 @@
+""" Module for events that end a run early, or cull particles from it, once their conditions are met. """
+
+import json
+from time import perf_counter
+
+from numpy import ndarray, array, divide, einsum, flatnonzero, int64, sqrt, zeros
+
+from src.classes.config import Config
+from src.classes.particle_system import ParticleSystem
+from src.hermite import update_accelerations_and_jerks
+from src.motion_calcs import calc_and_update_accel, uses_jerks
+from src.tracers import calc_tracer_accelerations
+
+PAIRS_PER_BLOCK = 2**20 #* Bounds the working memory of `find_escapers` to a few arrays of this many pairs.
+NO_ROWS = array([], dtype=int64)
+EVENTS_FILE = "events.jsonl" #* Written inside the trajectory folder, so events are kept, and cached, with the trajectory they happened in.
+
+
+class Event:
+    """
+    Base class for a condition checked after every timestep.\n
+    `check` returns None until the condition is met, then the rows of the massive particles and of the tracers it concerns.\n
+    Its `action` is either to "stop" the run there, or to "cull" those particles and carry on without them.\n
+    Events that don't depend on the simulation alone aren't `deterministic`, so runs they stop can't be reproduced.
+    """
+    name = "event"
+    action = "stop"
+    deterministic = True
+
+    def start(self) -> None:
+        """ Called once the run's timesteps are about to begin. """
+        pass
+
+    def check(self, system: ParticleSystem, config_object: Config) -> tuple[ndarray, ndarray] | None:
+        return None
+
+
+class SingleSurvivor(Event):
+    """ Stops the run once every massive particle has merged into one, unless tracers are still orbiting it. """
+    name = "single_survivor"
+
+    def check(self, system: ParticleSystem, config_object: Config) -> tuple[ndarray, ndarray] | None:
+        tracers_left = (system.tracers is not None) and len(system.tracers)
+        if (len(system) == 0) or ((len(system) == 1) and not tracers_left):
+            return NO_ROWS, NO_ROWS
+        return None
+
+
+def find_escapers(system: ParticleSystem, positions: ndarray, velocities: ndarray, radius: float, config_object: Config) -> ndarray:
+    """
+    Takes in the `positions` and `velocities` of particles moving in the gravity of `system`, which may be its own.\n
+    Returns the rows of those further than `radius` from the system's centre of mass with enough energy, relative to it, to escape to infinity.\n
+    Only particles beyond `radius` have their potential summed, so the check costs O(N) until something starts to escape.
+    """
+    total_mass = system.masses.sum()
+    if (total_mass <= 0) or not len(positions):
+        return NO_ROWS
+    centre = system.masses @ system.positions / total_mass
+    offsets = positions - centre
+    candidates = flatnonzero(einsum("ij,ij->i", offsets, offsets) > radius**2)
+    if not len(candidates):
+        return NO_ROWS
+
+    potentials = zeros(len(candidates))
+    rows_per_block = max(1, PAIRS_PER_BLOCK // len(system))
+    for start in range(0, len(candidates), rows_per_block):
+        block = slice(start, start + rows_per_block)
+        displacements = system.positions[None, :, :] - positions[candidates[block], None, :]
+        distances = sqrt(einsum("ijk,ijk->ij", displacements, displacements))
+        #* A particle is at zero distance from itself, which is left out of its own potential.
+        inverse_distances = divide(1, distances, out=zeros(distances.shape), where=distances > 0)
+        potentials[block] = -config_object.G * (inverse_distances @ system.masses)
+
+    relative_velocities = velocities[candidates] - system.masses @ system.velocities / total_mass
+    specific_energies = .5 * einsum("ij,ij->i", relative_velocities, relative_velocities) + potentials
+    return candidates[specific_energies > 0]
+
+
+class Escape(Event):
+    """ Triggers on any particle or tracer that is beyond `escape_radius` of the centre of mass and energetically unbound from the rest. """
+    name = "escape"
+
+    def __init__(self, radius: float, action: str) -> None:
+        self.radius = radius
+        self.action = action
+
+    def check(self, system: ParticleSystem, config_object: Config) -> tuple[ndarray, ndarray] | None:
+        rows = find_escapers(system, system.positions, system.velocities, self.radius, config_object)
+        tracer_rows = NO_ROWS
+        if system.tracers is not None:
+            tracer_rows = find_escapers(system, system.tracers.positions, system.tracers.velocities, self.radius, config_object)
+        return (rows, tracer_rows) if (len(rows) or len(tracer_rows)) else None
+
+
+class WallClockBudget(Event):
+    """ Stops the run once it has taken `seconds` of real time. """
+    name = "wall_clock_budget"
+    deterministic = False
+
+    def __init__(self, seconds: float) -> None:
+        self.seconds = seconds
+        self.started = perf_counter()
+
+    def start(self) -> None:
+        self.started = perf_counter()
+
+    def check(self, system: ParticleSystem, config_object: Config) -> tuple[ndarray, ndarray] | None:
+        return (NO_ROWS, NO_ROWS) if (perf_counter() - self.started >= self.seconds) else None
+
+
+def get_configured_events(config_object: Config) -> list[Event]:
+    """ Returns the events enabled in `config_object`, with culling events ahead of those that would stop the run. """
+    events = list()
+    if config_object.escape_radius:
+        events.append(Escape(config_object.escape_radius, config_object.escape_action))
+    if config_object.stop_at_single_survivor:
+        events.append(SingleSurvivor())
+    if config_object.wall_clock_budget:
+        events.append(WallClockBudget(config_object.wall_clock_budget))
+    return events
+
+
+def cull(system: ParticleSystem, rows: ndarray, tracer_rows: ndarray, config_object: Config) -> None:
+    """
+    Removes the `rows` of massive particles and the `tracer_rows` of tracers from `system`.\n
+    The remaining particles' accelerations, and jerks if the integrator uses them, are then recalculated without the culled ones.
+    Collisions and tracer absorption are left to the next timestep, so they're handled, and counted, as they always are.
+    """
+    if len(tracer_rows):
+        system.tracers.remove(tracer_rows)
+    if not len(rows):
+        return
+    system.remove(rows)
+    if len(system):
+        if uses_jerks(config_object):
+            update_accelerations_and_jerks(system, config_object)
+        else:
+            calc_and_update_accel(system, config_object)
+    if system.tracers is not None:
+        calc_tracer_accelerations(system.masses, system.positions, system.tracers.positions, config_object, out=system.tracers.accelerations)
+
+
+class EventMonitor:
+    """
+    Checks `events` after each timestep, stopping the run or culling particles as they trigger.\n
+    Each triggered event is kept in `records`, along with the state of any particles it culled, and written to `filename` as JSON lines if given.
+    Resuming from `start_step` appends to the existing file.\n
+    `stopped_by` is the event that stopped the run, if any did.
+    """
+    def __init__(self, events: list[Event], filename: str | None = None, start_step: int = 0) -> None:
+        self.events = events
+        self.records = list()
+        self.culled = 0
+        self.stopped_by = None
+        self.file = open(filename, "a" if start_step else "w") if filename else None
+
+    def start(self) -> None:
+        for event in self.events:
+            event.start()
+
+    def check(self, system: ParticleSystem, step: int, config_object: Config) -> bool:
+        """ Checks every event against `system` after timestep `step`, culling particles if any call for it. Returns whether the run should stop. """
+        for event in self.events:
+            triggered = event.check(system, config_object)
+            if triggered is None:
+                continue
+            rows, tracer_rows = triggered
+            self.record(step, event, system, rows, tracer_rows)
+            if event.action == "stop":
+                self.stopped_by = event
+                return True
+            cull(system, rows, tracer_rows, config_object)
+            self.culled += len(rows) + len(tracer_rows)
+        return False
+
+    def record(self, step: int, event: Event, system: ParticleSystem, rows: ndarray, tracer_rows: ndarray) -> None:
+        record = { "step": step, "event": event.name, "action": event.action, "particles": list() }
+        for source, source_rows in ((system, rows), (system.tracers, tracer_rows)):
+            for row in source_rows:
+                record["particles"].append({
+                    "id": int(source.ids[row]), "mass": float(source.masses[row]),
+                    "position": source.positions[row].tolist(), "velocity": source.velocities[row].tolist(),
+                })
+        self.records.append(record)
+        if self.file:
+            self.file.write(json.dumps(record) + "\n")
+
+    @property
+    def deterministic(self) -> bool:
+        """ Whether the run's outcome depends on the simulation alone, so the same config always reproduces it. """
+        return (self.stopped_by is None) or self.stopped_by.deterministic
+
+    def summary(self) -> str:
+        lines = list()
+        if self.culled:
+            lines.append(f"Culled {self.culled} particles as they triggered events.")
+        if self.stopped_by:
+            lines.append(f"Run stopped early at timestep #{self.records[-1]['step']} by the '{self.stopped_by.name}' event.")
+        return "\n".join(lines)
+
+    def close(self) -> None:
+        if self.file:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,180 @@
+""" Module for exporting a recorded trajectory as an MP4 or GIF animation, rendering its frames in parallel. """
+
+from argparse import ArgumentParser
+from multiprocessing import Pool
+from os import path
+from shutil import which
+from subprocess import DEVNULL, PIPE, Popen
+
+from matplotlib import rcParams
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import to_rgba_array
+from matplotlib.figure import Figure
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
+from numpy import ndarray, arange, asarray, fmax, fmin, full, inf, nanmax, nanmin, stack, where, zeros
+from PIL import Image
+
+from src.classes.config import Config
+from src.trajectory import TrajectoryReader
+
+FORMATS = (".mp4", ".gif")
+DPI = 100
+TRACER_MARKER_SCALE = 0.25 #* Size of tracers' markers, relative to `marker_size`.
+BOUNDS_CHUNK_FRAMES = 256 #* Frames of positions read at once while finding the axis limits.
+
+_worker_state: dict = dict() #* The trajectory, figure and styling each worker renders with.
+
+
+def get_trail_segments(positions: ndarray, alive: ndarray, frame: int, trail: int) -> tuple[ndarray, ndarray, ndarray]:
+    """
+    Takes in (frames, n, 3) `positions` and (frames, n) `alive` arrays, returns the line segments tracing each particle's last `trail` frames up to `frame`.\n
+    Returns the (segments, 2, 3) array of segments, the particle slot of each, and its age as a fraction of the trail (0 newest, up to 1).
+    """
+    start = max(0, frame - trail)
+    window, living = asarray(positions[start:frame+1]), asarray(alive[start:frame+1])
+    if len(window) < 2:
+        return zeros((0, 2, 3)), arange(0), zeros(0)
+    #* Only segments whose particle was alive at both ends, so merged particles' trails stop where they were absorbed.
+    both_alive = living[:-1] & living[1:]
+    segments = stack([window[:-1], window[1:]], axis=2)[both_alive]
+    ages, slots = both_alive.nonzero()
+    return segments, slots, (len(window) - 2 - ages) / max(trail, 1)
+
+
+def get_marker_sizes(masses: ndarray, reference_mass: float, marker_size: float) -> ndarray:
+    """
+    Returns scatter sizes for `masses`, with the area growing as mass^(2/3) so each marker's radius tracks that of a sphere of equal density.\n
+    Massless tracers get a small fixed size instead, so they stay visible.
+    """
+    return where(masses > 0, marker_size * (masses / reference_mass)**(2/3), TRACER_MARKER_SCALE * marker_size)
+
+
+def get_trajectory_bounds(reader: TrajectoryReader) -> tuple[ndarray, ndarray]:
+    """ Returns the lowest and highest coordinates, along each axis, that any particle was alive at, reading only a chunk of frames at a time. """
+    low, high = full(3, inf), full(3, -inf)
+    for start in range(0, reader.frames, BOUNDS_CHUNK_FRAMES):
+        chunk = slice(start, min(start + BOUNDS_CHUNK_FRAMES, reader.frames))
+        alive_positions = asarray(reader.positions[chunk])[asarray(reader.alive[chunk])]
+        if len(alive_positions):
+            low, high = fmin(low, nanmin(alive_positions, axis=0)), fmax(high, nanmax(alive_positions, axis=0))
+    return low, high
+
+
+def _initialise_worker(folder: str, low: ndarray, high: ndarray, resolution: tuple[int, int], trail: int, marker_size: float) -> None:
+    """ Worker initialiser: opens the trajectory and sets up a headless figure with fixed axes from `low` to `high`, spanning the whole run. """
+    reader = TrajectoryReader(folder)
+
+    figure = Figure(figsize=(resolution[0] / DPI, resolution[1] / DPI), dpi=DPI)
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot((0,.01,1,1), projection='3d')
+    pane_rgba = (.8,.8,.8,.1)
+    for axis in (ax.xaxis, ax.yaxis, ax.zaxis):
+        axis.set_pane_color(pane_rgba)
+    ax.set_xlim(low[0], high[0])
+    ax.set_ylim(low[1], high[1])
+    ax.set_zlim(low[2], high[2])
+    ax.set_xlabel('x-axis')
+    ax.set_ylabel('y-axis')
+    ax.set_zlabel('z-axis')
+
+    cycle = to_rgba_array(rcParams["axes.prop_cycle"].by_key()["color"])
+    _worker_state.update(
+        reader=reader,
+        figure=figure,
+        ax=ax,
+        colours=cycle[arange(len(reader.ids)) % len(cycle)],
+        reference_mass=nanmax(reader.masses[0]),
+        trail=trail,
+        marker_size=marker_size,
+    )
+
+
+def render_frame(frame: int) -> bytes:
+    """ Renders `frame` of the trajectory the worker was initialised with, returning its raw RGB pixels. """
+    reader, ax, colours = _worker_state["reader"], _worker_state["ax"], _worker_state["colours"]
+    for artist in list(ax.collections):
+        artist.remove()
+
+    if _worker_state["trail"] and frame:
+        segments, slots, ages = get_trail_segments(reader.positions, reader.alive, frame, _worker_state["trail"])
+        trail_colours = colours[slots]
+        trail_colours[:, 3] = 1 - ages #* Older parts of each trail fade out.
+        ax.add_collection3d(Line3DCollection(segments, colors=trail_colours, linewidths=1), autolim=False)
+
+    alive = asarray(reader.alive[frame])
+    positions = asarray(reader.positions[frame])[alive]
+    sizes = get_marker_sizes(asarray(reader.masses[frame])[alive], _worker_state["reference_mass"], _worker_state["marker_size"])
+    ax.scatter(*positions.T, s=sizes, c=colours[alive], depthshade=False)
+
+    canvas = _worker_state["figure"].canvas
+    canvas.draw()
+    return asarray(canvas.buffer_rgba())[..., :3].tobytes()
+
+
+def render_gif_frame(frame: int) -> Image.Image:
+    """ Renders `frame` like `render_frame`, then reduces it to a GIF's 256 colours, so that's spread across the workers too. """
+    resolution = _worker_state["figure"].canvas.get_width_height()
+    return Image.frombytes("RGB", resolution, render_frame(frame)).quantize(method=Image.Quantize.FASTOCTREE)
+
+
+def write_mp4(frames, output: str, fps: float, resolution: tuple[int, int]) -> None:
+    """ Streams raw RGB `frames` to ffmpeg, which encodes them as an H.264 MP4 at `output`. """
+    command = [
+        which(rcParams["animation.ffmpeg_path"]), "-y", "-loglevel", "error",
+        "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{resolution[0]}x{resolution[1]}", "-r", str(fps), "-i", "-",
+        "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-c:v", "libx264", "-pix_fmt", "yuv420p", output,
+    ]
+    with Popen(command, stdin=PIPE, stdout=DEVNULL) as encoder:
+        for frame in frames:
+            encoder.stdin.write(frame)
+        encoder.stdin.close()
+        if encoder.wait():
+            raise RuntimeError(f"ffmpeg failed to encode {output}.")
+
+
+def write_gif(frames, output: str, fps: float, resolution: tuple[int, int]) -> None:
+    """ Writes `frames`, already reduced to GIF colours, as a looping GIF at `output`. """
+    images = list(frames)
+    if images:
+        images[0].save(output, save_all=True, append_images=images[1:], duration=round(1000 / fps), loop=0)
+
+
+def export_animation(folder: str, output: str, fps: float, trail: int, resolution: tuple[int, int], workers: int = 1, marker_size: float = 6) -> int:
+    """
+    Renders every frame of the trajectory in `folder` across a pool of `workers` headless processes, and stitches them into `output`, an MP4 or GIF.\n
+    Each particle is drawn with a marker sized by its mass, trailed by its path over the last `trail` frames. Returns the number of frames exported.
+    """
+    extension = path.splitext(output)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Animations can only be exported as: {', '.join(FORMATS)}.")
+    if (extension == ".mp4") and not which(rcParams["animation.ffmpeg_path"]):
+        raise RuntimeError("Exporting an MP4 needs ffmpeg installed; export a .gif instead.")
+    render, write = (render_frame, write_mp4) if extension == ".mp4" else (render_gif_frame, write_gif)
+    reader = TrajectoryReader(folder)
+    frames, (low, high) = reader.frames, get_trajectory_bounds(reader) #* Found once here, rather than by every worker.
+
+    with Pool(workers, initializer=_initialise_worker, initargs=(folder, low, high, tuple(resolution), trail, marker_size)) as pool:
+        #* Frames come back in order, so an MP4 is encoded as they arrive rather than once they're all rendered.
+        write(pool.imap(render, range(frames), chunksize=max(1, frames // (4*workers))), output, fps, tuple(resolution))
+    return frames
+
+
+def main() -> None:
+    CFG = Config()
+    parser = ArgumentParser(prog="python -m src.export", description="Exports the trajectory recorded at `trajectory_path` as an animation.")
+    parser.add_argument("output", nargs="?", default=CFG.animation_path, help="file to export to, ending in .mp4 or .gif")
+    parser.add_argument("--trajectory", default=CFG.trajectory_path, help="folder of the recorded trajectory")
+    parser.add_argument("--fps", type=float, default=CFG.animation_fps, help="frames per second")
+    parser.add_argument("--trail", type=int, default=CFG.animation_trail, help="logged frames each particle's trail lasts for")
+    parser.add_argument("--resolution", type=int, nargs=2, default=CFG.animation_resolution, metavar=("WIDTH", "HEIGHT"), help="size in pixels")
+    parser.add_argument("--workers", type=int, default=CFG.workers, help="processes rendering frames")
+    arguments = parser.parse_args()
+
+    if not arguments.trajectory:
+        parser.error("no trajectory was recorded; set `trajectory_path` in the config and run the simulation first.")
+    frames = export_animation(arguments.trajectory, arguments.output, arguments.fps, arguments.trail, arguments.resolution, arguments.workers, CFG.marker_size)
+    print(f"Exported {frames:,} frames to {arguments.output}.")
+
+
+if __name__ == "__main__":
+    main()
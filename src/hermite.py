@@ -0,0 +1,76 @@
+""" Module for calculating accelerations along with their time derivatives, for integrators that use both. """
+
+from numpy import ndarray, arange, einsum, empty, inf
+
+from src.classes.config import Config
+from src.classes.particle_system import ParticleSystem
+from src.collision_handler import handle_collisions
+from src.parallel import PAIRS_PER_BLOCK
+from src.profiling import NULL_TIMER, PhaseTimer
+
+
+def calc_accelerations_and_jerks(masses: ndarray, positions: ndarray, velocities: ndarray, config_object: Config, rows: ndarray | None = None) -> tuple[ndarray, ndarray]:
+    """
+    Takes in the state of every particle, and optionally the `rows` of the particles to calculate for.\n
+    Returns (len(rows), 3) arrays of the direct-sum accelerations of those particles and their time derivatives, the jerks.
+    """
+    rows = arange(len(masses)) if rows is None else rows
+    accelerations, jerks = empty((len(rows), 3)), empty((len(rows), 3))
+    block_size = max(1, PAIRS_PER_BLOCK // max(len(masses), 1)) #* Bounds memory to a few (block_size, N, 3) arrays.
+    for start in range(0, len(rows), block_size):
+        block = rows[start:start + block_size]
+        displacements = positions[None, :, :] - positions[block, None, :] #* Point from each particle in `block` to every other.
+        relative_velocities = velocities[None, :, :] - velocities[block, None, :]
+        distances_sq = einsum("ijk,ijk->ij", displacements, displacements)
+        distances_sq[arange(len(block)), block] = inf #* Excludes each particle's interaction with itself.
+
+        weights = config_object.G * masses[None, :] * distances_sq**-1.5
+        approach_rates = einsum("ijk,ijk->ij", displacements, relative_velocities) / distances_sq
+        accelerations[start:start + block_size] = einsum("ij,ijk->ik", weights, displacements)
+        jerks[start:start + block_size] = einsum("ij,ijk->ik", weights, relative_velocities - 3*approach_rates[..., None]*displacements)
+    return accelerations, jerks
+
+
+def hermite_predict(system: ParticleSystem, h: float | ndarray) -> tuple[ndarray, ndarray]:
+    """ Returns the positions and velocities of every particle in `system` extrapolated by `h`, a time or an (N, 1) array of times. """
+    positions = system.positions + h*(system.velocities + h*(system.accelerations/2 + h*system.jerks/6))
+    velocities = system.velocities + h*(system.accelerations + h*system.jerks/2)
+    return positions, velocities
+
+
+def hermite_correct(system: ParticleSystem, rows: ndarray | slice, h: float | ndarray, accelerations: ndarray, jerks: ndarray) -> None:
+    """
+    Completes a step of `h` for the particles at `rows`, given their `accelerations` and `jerks` at its end.\n
+    Uses those at both ends of the step to correct their positions and velocities to 4th order, in place.
+    """
+    old_accelerations, old_jerks = system.accelerations[rows], system.jerks[rows]
+    velocities = system.velocities[rows] + h*(old_accelerations + accelerations)/2 + h**2*(old_jerks - jerks)/12
+    system.positions[rows] += h*(system.velocities[rows] + velocities)/2 + h**2*(old_accelerations - accelerations)/12
+    system.velocities[rows] = velocities
+    system.accelerations[rows], system.jerks[rows] = accelerations, jerks
+    system.potential_energy = None
+
+
+def update_accelerations_and_jerks(system: ParticleSystem, config_object: Config) -> None:
+    system.accelerations, system.jerks = calc_accelerations_and_jerks(system.masses, system.positions, system.velocities, config_object)
+
+
+def hermite4_timestep(system: ParticleSystem, config_object: Config, timer: PhaseTimer = NULL_TIMER) -> None:
+    """
+    Advances `system` by `dt` with a 4th-order Hermite predictor-corrector, which needs `jerks` to be up to date beforehand.\n
+    Collisions are handled at the end of the step, after which the forces on everything are recalculated.
+    """
+    positions, velocities = hermite_predict(system, config_object.dt)
+    timer.lap("position")
+
+    accelerations, jerks = calc_accelerations_and_jerks(system.masses, positions, velocities, config_object)
+    timer.lap("acceleration")
+
+    hermite_correct(system, slice(None), config_object.dt, accelerations, jerks)
+    timer.lap("velocity")
+
+    particles = len(system)
+    handle_collisions(system, config_object)
+    if len(system) < particles: #* Merges change the forces on everything.
+        update_accelerations_and_jerks(system, config_object)
+    timer.lap("collisions")
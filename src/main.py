@@ -1,33 +1,154 @@
 """ Module for executing n-body gravity simulation and plotting its results in 3D. """
 
+from argparse import ArgumentParser
+from contextlib import ExitStack
+from os import path
 
 from src.classes.config import Config
-from src.energy import print_gravitational_boundedness
+from src.classes.particle_system import ParticleSystem
+from src.checkpoint import save_checkpoint, load_checkpoint, load_checkpoint_log_rate
+from src.data_types import PositionLog
+from src.events import EVENTS_FILE, EventMonitor, get_configured_events
+from src.energy import ConservationMonitor, get_diagnostics, print_gravitational_boundedness
 from src.plotter import log_positions, plot_logs
 from src.motion_calcs import initialise_particles, simulate_timestep
-from src.particle_setup import get_configured_particles
+from src.particle_setup import get_configured_system
+from src.profiling import StepProfiler, observing
+from src.run_cache import RunCache, run_key
+from src.telemetry import StepTelemetry
+from src.trajectory import TrajectoryWriter, TrajectoryReader
 
 
-def main() -> None:
+def run_timesteps(
+        system: ParticleSystem, position_logs: PositionLog | TrajectoryWriter, config_object: Config,
+        start_step: int = 0, events: EventMonitor | None = None, log_rate: int | None = None,
+    ) -> PositionLog | TrajectoryWriter:
+    """
+    Takes in an initialised `ParticleSystem` and the log its positions are recorded in.\n
+    Simulates timesteps from `start_step` onwards, logging positions and saving checkpoints at their configured intervals.\n
+    Positions are logged every `simple_log_rate` timesteps, unless a resumed run gives the `log_rate` it was started with.\n
+    Any `events` are checked after each timestep; if one stops the run, its final positions are logged and a checkpoint is saved there.
+    """
+    log_rate = log_rate or config_object.simple_log_rate
+    if events:
+        events.start()
+    logger = config_object.logger if config_object.step_logging else None
+    for i in range(start_step, config_object.timesteps + 1):
+        if logger:
+            logger.info("'Running timestep' #%d.", i) #* Only formatted if the message is actually emitted.
+        simulate_timestep(system, config_object)
+        if i % log_rate == 0:
+            if logger:
+                logger.info("Logging updated positions: %s", system.positions)
+            position_logs = log_positions(system, position_logs)
+
+        stopping = events.check(system, i, config_object) if events else False
+        if stopping and (i % log_rate):
+            position_logs = log_positions(system, position_logs)
+
+        if config_object.checkpoint_interval and (stopping or ((i + 1) % config_object.checkpoint_interval == 0)):
+            frame = 0
+            if isinstance(position_logs, TrajectoryWriter):
+                position_logs.sync() #* The checkpoint mustn't claim frames that aren't on disk yet.
+                frame = position_logs.frame
+            save_checkpoint(config_object.checkpoint_path, system, i + 1, frame, config_object)
+        if stopping:
+            break
+    return position_logs
+
+
+def show_results(position_logs: PositionLog | TrajectoryReader, config_object: Config, headless: bool) -> None:
+    """ Plots the logged positions, or when `headless`, just says where they were saved. """
+    if headless:
+        if config_object.trajectory_path:
+            print(f"Trajectory saved to {config_object.trajectory_path}.")
+        return
+    plot_logs(position_logs, config_object)
+
+
+def main(resume: bool = False, profile: bool = False, headless: bool = False, no_cache: bool = False) -> None:
     CFG = Config()
-    particles = get_configured_particles(CFG)
-
-    print_gravitational_boundedness(particles, CFG)
-    
-    CFG.logger.info("'Running main.'")
-    position_logs = { ptcl.id: list() for ptcl in particles }
-    position_logs = log_positions(particles, position_logs)
-    
-    initialise_particles(particles, CFG)
-    for i in range(CFG.timesteps + 1):
-        CFG.logger.info(f"'Running timestep' #{i}.")
-        simulate_timestep(particles, CFG)
-        if i % CFG.simple_log_rate == 0:
-            CFG.logger.info(f"Logging updated positions: {[ptcl.position for ptcl in particles]}")
-            position_logs = log_positions(particles, position_logs)
-    
-    plot_logs(position_logs, CFG)
+    CFG.start_logging()
+    profiler = StepProfiler() if profile else None
+    telemetry, monitor = None, None
+
+    #* Only streamed trajectories are cached, since they're already on disk to copy.
+    cache, key = None, None
+    if CFG.run_cache_path and CFG.trajectory_path and not no_cache:
+        cache, key = RunCache(CFG.run_cache_path, int(CFG.run_cache_max_mb * 2**20)), run_key(CFG)
+        if (not resume) and (cached := cache.load(key, CFG)) is not None:
+            final_system, cached_trajectory = cached
+            CFG.logger.info(f"'Loaded run' {key} from the cache, ending with {len(final_system)} particles.")
+            print(f"Loaded this config's run from {cached_trajectory}; pass --no-cache to simulate it again.")
+            if not headless:
+                plot_logs(TrajectoryReader(cached_trajectory), CFG)
+            return
+
+    log_rate = CFG.simple_log_rate
+    if resume:
+        system, start_step, frame = load_checkpoint(CFG.checkpoint_path, CFG)
+        log_rate = load_checkpoint_log_rate(CFG.checkpoint_path) or log_rate
+        CFG.logger.info(f"'Resuming main' from timestep #{start_step}.")
+        if CFG.trajectory_path:
+            #* Room for every frame still to come, which is more than before if `timesteps` was raised to extend the run.
+            frames = frame + (CFG.timesteps - start_step) // log_rate + 2
+            position_logs = TrajectoryWriter(CFG.trajectory_path, system.logged_state()[0], frames, start_frame=frame)
+        else:
+            position_logs = { int(id): list() for id in system.logged_state()[0] }
+    else:
+        system, start_step = get_configured_system(CFG), 0
+        print_gravitational_boundedness(system, CFG)
+
+        CFG.logger.info("'Running main.'")
+        if CFG.trajectory_path:
+            position_logs = TrajectoryWriter(CFG.trajectory_path, system.logged_state()[0], CFG.logged_frames)
+        else:
+            position_logs = { int(id): list() for id in system.logged_state()[0] }
+        position_logs = log_positions(system, position_logs)
+
+    events = EventMonitor(get_configured_events(CFG), CFG.trajectory_path and path.join(CFG.trajectory_path, EVENTS_FILE), start_step)
+    if CFG.telemetry_sample_rate:
+        telemetry = StepTelemetry(CFG.telemetry_path, CFG.telemetry_sample_rate, CFG.telemetry_buffer_size, start_step)
+
+    try:
+        if not resume:
+            initialise_particles(system, CFG)
+        monitor = ConservationMonitor(get_diagnostics(system, CFG)) if CFG.energy_diagnostics else None
+        with ExitStack() as observers:
+            for observer in (profiler, telemetry, monitor):
+                if observer:
+                    observers.enter_context(observing(observer))
+            position_logs = run_timesteps(system, position_logs, CFG, start_step, events, log_rate)
+    finally:
+        events.close()
+        if events.summary():
+            print(events.summary())
+        if telemetry:
+            telemetry.close()
+        if isinstance(position_logs, TrajectoryWriter):
+            position_logs.close() #* Keeps everything logged so far, even if the run is interrupted.
+            position_logs = TrajectoryReader(CFG.trajectory_path)
+        if profiler:
+            print(profiler.summary())
+        if monitor:
+            print(monitor.summary())
+
+    #* An extended run keeps its original log rate, so it isn't what this config would record from scratch.
+    if cache and events.deterministic and (log_rate == CFG.simple_log_rate):
+        final_step = events.records[-1]["step"] + 1 if events.stopped_by else CFG.timesteps + 1
+        if not cache.store(key, CFG.trajectory_path, system, final_step, position_logs.frames, CFG):
+            CFG.logger.info(f"'Not caching run' {key}, as it's larger than the cache's {CFG.run_cache_max_mb} MB limit.")
+    show_results(position_logs, CFG, headless)
+
+
+def parse_arguments() -> dict:
+    parser = ArgumentParser(description="Runs the n-body gravity simulation set up in `.config/config.yaml`, then plots it.")
+    parser.add_argument("--resume", action="store_true", help="continue from the latest checkpoint instead of starting over")
+    parser.add_argument("--profile", action="store_true", help="time each phase of every timestep, and print a summary at the end")
+    parser.add_argument("--no-cache", action="store_true", help="simulate the run even if it's cached, without caching the result")
+    parser.add_argument("--headless", action="store_true", help="skip the plot at the end, without ever loading matplotlib, for batch jobs")
+    return vars(parser.parse_args())
 
 
 if __name__ == "__main__":
-    main()
+    main(**parse_arguments())
@@ -1,71 +1,225 @@
 """ Module for calculating and updating the motion of particles. """
 
-from numpy import ndarray, zeros
-from copy import deepcopy
+from numpy import ndarray, add, array, bincount, concatenate, empty, multiply, ones, zeros_like
 
 from src.classes.config import Config
-from src.classes.particle import Particle
-from src.permutations import all_chosen_and_others
-from src.collision_handler import get_disp_dist_and_handle_collisions
-from src.data_types import Particles, IdPairVectorDict, IdPairFloatDict
-
+from src.classes.particle_system import ParticleSystem, particle_system_of
+from src.barnes_hut import calc_barnes_hut_accelerations
+from src.particle_mesh import calc_particle_mesh_accelerations
+from src.encounters import calc_group_accelerations, find_encounter_groups, sub_cycle_group
+from src.tracers import absorb_tracers, calc_tracer_accelerations, initialise_tracers
+from src.block_timesteps import simulate_block_timestep
+from src.hermite import hermite4_timestep, update_accelerations_and_jerks
+from src.collision_handler import handle_collisions, get_pair_separations
+from src.parallel import worker_pool_for
+from src.energy import calc_pair_potential_energy, get_diagnostics
+from src.profiling import NULL_TIMER, PhaseTimer, start_phase_timer
+from src.data_types import Particles, PairSeparations
+
+
+def calc_accelerations(masses: ndarray, separations: PairSeparations, config_object: Config, out: ndarray | None = None) -> ndarray:
+    """
+    Takes in particle `masses` and their pairwise `separations`, and optionally an (N, 3) array to write into.\n
+    Returns an (N, 3) array of accelerations, evaluating each pair's interaction once and applying it to both particles (Newton's third law).
+    """
+    first, second, displacements, distances = separations
+    pair_terms = config_object.G * displacements / distances[:, None]**3 #* Points from the second particle to the first.
 
-def calc_accel_of_chosen(chosen: Particle, others: Particles, displacements: IdPairVectorDict, distances: IdPairFloatDict, config_object: Config) -> ndarray:
-    """ Calculates the acceleration of a chosen `Particle` given a list of the other `Particles` in the system. """
-    total_accel = zeros(3)
-    for other in others:
-        total_accel += config_object.G * other.mass * displacements[(other.id, chosen.id)] / distances[(other.id, chosen.id)]**3
-    return total_accel
+    accelerations = empty((len(masses), 3)) if out is None else out
+    for axis in range(3):
+        accelerations[:, axis] = (
+            bincount(second, weights=masses[first] * pair_terms[:, axis], minlength=len(masses))
+          - bincount(first, weights=masses[second] * pair_terms[:, axis], minlength=len(masses))
+        )
+    return accelerations
 
 
-def initialise_particles(particles: Particles, config_object: Config) -> None:
+def initialise_particles(particles: Particles | ParticleSystem, config_object: Config) -> None:
     """ Calculates and assigns the initial accelerations of `Particles`; this is required to start the simulation loop. """
-    displacements, distances = get_disp_dist_and_handle_collisions(particles, config_object)
-    calc_and_update_accel(particles, displacements, distances, config_object)
-        
+    with particle_system_of(particles) as system:
+        handle_collisions(system, config_object)
+        if uses_jerks(config_object):
+            update_accelerations_and_jerks(system, config_object)
+        else:
+            calc_and_update_accel(system, config_object)
+        if system.tracers is not None:
+            initialise_tracers(system, config_object)
+
+
+def calc_and_update_position(system: ParticleSystem, config_object: Config) -> None:
+    """ Updates the `positions` of each particle in `system`, in place, using only its own state. """
+    system.positions += multiply(system.velocities, config_object.dt, out=system.scratch)
+    system.positions += multiply(system.accelerations, config_object.half_dtsq, out=system.scratch)
 
-def calc_and_update_position(particles: Particles, config_object: Config) -> None:
-    """ Updates the `position` attribute of each particle in `particles` using only its own attributes. """
-    for particle in particles:
-        particle.position = particle.position + particle.velocity*config_object.dt + particle.acceleration*config_object.half_dtsq
 
+def calc_and_update_accel(system: ParticleSystem, config_object: Config) -> None:
+    """
+    Overwrites the `accelerations` buffer of `system` using the configured `force_engine`, split across `workers` if there are several.\n
+    With `energy_diagnostics` on, the serial direct sum also leaves the system's `potential_energy`, from the same pairwise distances.
+    """
+    system.potential_energy = None
+    if config_object.force_engine == "particle_mesh":
+        #* The FFTs already run in optimised, vectorised code, so the grid isn't split across workers.
+        calc_particle_mesh_accelerations(system.masses, system.positions, config_object, out=system.accelerations)
+    elif pool := worker_pool_for(len(system), config_object):
+        pool.calc_accelerations(system.masses, system.positions, config_object, out=system.accelerations)
+    elif config_object.force_engine == "barnes_hut":
+        calc_barnes_hut_accelerations(system.masses, system.positions, config_object, out=system.accelerations)
+    else:
+        separations = get_pair_separations(system)
+        calc_accelerations(system.masses, separations, config_object, out=system.accelerations)
+        if config_object.energy_diagnostics:
+            system.potential_energy = calc_pair_potential_energy(system.masses, separations, config_object)
+
+
+def calc_and_update_vel(system: ParticleSystem, config_object: Config) -> None:
+    """ Updates the `velocities` of each particle in `system`, in place, using both its `last_accelerations` and its current ones. """
+    change = add(system.last_accelerations, system.accelerations, out=system.scratch)
+    change *= config_object.dt
+    change /= 2
+    system.velocities += change
+
+
+def verlet_timestep(system: ParticleSystem, config_object: Config, timer: PhaseTimer = NULL_TIMER) -> None:
+    """
+    Advances `system` by `dt` with Velocity Verlet, which is 2nd order and needs one force evaluation per timestep.\n
+    Simulates a timestep on the system's arrays, looks for and handles any collisions,\n
+    then completes the velocity update using the accelerations of both the last and next states.\n
+    Collisions remove rows from every buffer alike, so the last and next states always stay matched row by row.\n
+    With `encounter_distance` set, timesteps with any close encounters are taken by `encounter_verlet_timestep` instead.
+    """
+    if config_object.encounter_distance and (groups := find_encounter_groups(system, config_object)):
+        timer.lap("encounters")
+        encounter_verlet_timestep(system, groups, config_object, timer)
+        return
 
-def calc_and_update_accel(particles: Particles, displacements: IdPairVectorDict, distances: IdPairFloatDict, config_object: Config) -> None:
-    """ Updates the `acceleration` attribute of each particle in `particles` using its `position` attribute. """
-    for chosen, others in all_chosen_and_others(particles):
-        chosen.acceleration = calc_accel_of_chosen(chosen, others, displacements, distances, config_object)
+    calc_and_update_position(system, config_object)
+    timer.lap("position")
 
+    handle_collisions(system, config_object) #* Collided particles removed.
+    timer.lap("collisions")
 
-def calc_and_update_vel(particles_next: Particles, particles_last: Particles, config_object: Config) -> None:
-    """ Updates the `velocity` attribute of each particle in `particles_next` using state attributes from both `particles_next` and `particles_last`. """
-    #* Requires access to last velocity and acceleration, but also next acceleration, so both particles are required.
+    system.swap_accelerations()
+    calc_and_update_accel(system, config_object)
+    timer.lap("acceleration")
 
-    # Note: After collisions, length of `particles_next` and `particles_last` are different, so this 'pairing'/'matching' is first needed:
-    remaining_ids = {ptcl.id for ptcl in particles_next}
-    filtered_particles_last = [ptcl for ptcl in particles_last if ptcl.id in remaining_ids]
+    calc_and_update_vel(system, config_object)
+    timer.lap("velocity")
 
-    for last, next in zip(filtered_particles_last, particles_next):
-        next.velocity = last.velocity + (last.acceleration + next.acceleration)*config_object.dt/2
 
+def calc_internal_accelerations(system: ParticleSystem, groups: list[ndarray], config_object: Config) -> ndarray:
+    """ Returns an (N, 3) array holding each encounter group member's acceleration due to the rest of its group, and zeros for everyone else. """
+    internal = zeros_like(system.accelerations)
+    for group in groups:
+        if len(group) > 1:
+            internal[group] = calc_group_accelerations(system.masses[group], system.positions[group], config_object)
+    return internal
 
-def simulate_timestep(particles: Particles, config_object: Config) -> None:
+
+def encounter_verlet_timestep(system: ParticleSystem, groups: list[ndarray], config_object: Config, timer: PhaseTimer = NULL_TIMER) -> None:
     """
-    Takes in a list of Particles.\n
-    Returns None.\n
-    First creates a copy of the old particle states, simulates a timestep on the original list,\n 
-    looks for and handles any collisions, logs the updated positions.
+    Advances `system` by `dt` with Velocity Verlet, in kick-drift-kick form, while sub-cycling the rows of each close encounter `group`.\n
+    The kicks either side apply only the pull of particles outside each particle's group, which changes slowly,\n
+    while every group drifts under its own gravity in as many smaller steps as it needs, with `sub_cycle_group`.\n
+    Everyone else drifts in one step, exactly as in `verlet_timestep`, so only the encounters pay for the smaller steps.
     """
-    # config_object.logger.info("'Simulating timestep'")
+    half_dt = config_object.dt / 2
+    system.velocities += (system.accelerations - calc_internal_accelerations(system, groups, config_object)) * half_dt
+
+    drifting = ones(len(system), dtype=bool)
+    drifting[concatenate(groups)] = False
+    system.positions[drifting] += system.velocities[drifting] * config_object.dt
+    for group in groups:
+        system.positions[group], system.velocities[group] = sub_cycle_group(system.masses[group], system.positions[group], system.velocities[group], config_object)
+    timer.lap("position")
+
+    group_ids = [ system.ids[group] for group in groups ]
+    handle_collisions(system, config_object) #* Collided particles removed.
+    timer.lap("collisions")
 
-    particles_saved = deepcopy(particles) #* `deepcopy` Doesn't *seem* to make a difference but may as well use it to be sure.
-    calc_and_update_position(particles, config_object)
-    # config_object.logger.info("'Updated positions.'")
+    system.swap_accelerations()
+    calc_and_update_accel(system, config_object)
+    timer.lap("acceleration")
 
-    next_displacements, next_distances = get_disp_dist_and_handle_collisions(particles, config_object) #* Collided particles removed.
-    # config_object.logger.info(f"'Handled Collisions' {[ptcl.id for ptcl in particles]} remaining.")
+    rows = system.index_map()
+    groups = [ array([rows[int(id)] for id in ids if int(id) in rows], dtype=int) for ids in group_ids ] #* Merged members are gone.
+    system.velocities += (system.accelerations - calc_internal_accelerations(system, groups, config_object)) * half_dt
+    timer.lap("velocity")
+
+
+def tracer_timestep(system: ParticleSystem, config_object: Config) -> int:
+    """
+    Advances the `system`'s tracers by `dt` with Velocity Verlet, once its massive particles have finished their timestep.\n
+    Their new accelerations come from the massive particles alone, and tracers that end up within `collision_distance` of one are absorbed.
+    Returns how many were absorbed.
+    """
+    tracers = system.tracers
+    calc_and_update_position(tracers, config_object)
+    tracers.swap_accelerations()
+    _, nearest = calc_tracer_accelerations(system.masses, system.positions, tracers.positions, config_object, out=tracers.accelerations)
+    calc_and_update_vel(tracers, config_object)
+    return absorb_tracers(tracers, nearest, config_object)
 
-    calc_and_update_accel(particles, next_displacements, next_distances, config_object)
-    # config_object.logger.info(f"'Updated accelerations'")
 
-    calc_and_update_vel(particles, particles_saved, config_object)
-    # config_object.logger.info(f"'Updated velocities'")
+#* Yoshida (1990): three Verlet sub-steps of these fractions of `dt` cancel each other's 3rd-order errors.
+YOSHIDA_WEIGHTS = (1/(2 - 2**(1/3)), -2**(1/3)/(2 - 2**(1/3)), 1/(2 - 2**(1/3)))
+
+
+def yoshida4_timestep(system: ParticleSystem, config_object: Config, timer: PhaseTimer = NULL_TIMER) -> None:
+    """
+    Advances `system` by `dt` with Yoshida's 4th-order symplectic integrator, which needs three force evaluations per timestep.\n
+    Each sub-step is a kick-drift-kick Verlet step, reusing the accelerations the last one ended with.
+    Collisions are handled before the final force evaluation, just as they are in `verlet_timestep`.
+    """
+    for sub_step, weight in enumerate(YOSHIDA_WEIGHTS):
+        half_kick = weight * config_object.dt / 2
+        system.velocities += multiply(system.accelerations, half_kick, out=system.scratch)
+        system.positions += multiply(system.velocities, 2*half_kick, out=system.scratch)
+        timer.lap("position")
+
+        if sub_step == len(YOSHIDA_WEIGHTS) - 1:
+            handle_collisions(system, config_object)
+            timer.lap("collisions")
+
+        calc_and_update_accel(system, config_object)
+        timer.lap("acceleration")
+
+        system.velocities += multiply(system.accelerations, half_kick, out=system.scratch)
+        timer.lap("velocity")
+
+
+INTEGRATORS = {
+    "verlet": verlet_timestep,
+    "yoshida4": yoshida4_timestep,
+    "hermite4": hermite4_timestep,
+}
+
+
+def uses_jerks(config_object: Config) -> bool:
+    """ Returns whether the configured integrator needs `jerks` kept up to date alongside `accelerations`. """
+    return config_object.block_timesteps or (config_object.integrator == "hermite4")
+
+
+def simulate_timestep(particles: Particles | ParticleSystem, config_object: Config) -> None:
+    """
+    Takes in a `ParticleSystem` or a list of Particles.\n
+    Returns None.\n
+    Advances the system by one timestep with the configured `integrator`, handling any collisions along the way.\n
+    With `block_timesteps` on, the system is instead advanced by `simulate_block_timestep`. Any tracers follow with `tracer_timestep`.\n
+    With `energy_diagnostics` on, the system's energies and momenta are passed on to any observers.
+    """
+    with particle_system_of(particles) as system:
+        timer = start_phase_timer(len(system)) #* Does nothing unless something is observing timesteps.
+        if config_object.block_timesteps:
+            simulate_block_timestep(system, config_object, timer)
+        else:
+            INTEGRATORS[config_object.integrator](system, config_object, timer)
+        if system.tracers is not None:
+            tracer_timestep(system, config_object)
+            timer.lap("tracers")
+
+        diagnostics = None
+        if config_object.energy_diagnostics:
+            diagnostics = get_diagnostics(system, config_object)
+            timer.lap("diagnostics")
+        timer.finish(len(system), diagnostics)
@@ -0,0 +1,178 @@
+""" Module for spreading force and collision calculations across a persistent pool of worker processes. """
+
+from atexit import register
+from multiprocessing import get_all_start_methods, get_context
+from multiprocessing.shared_memory import SharedMemory
+
+from numpy import ndarray, arange, array_split, bincount, concatenate, dtype, float64, full, int64, zeros
+from numpy.linalg import norm
+
+from src.classes.config import Config
+from src.classes.cell_list import CellList
+from src.barnes_hut import calc_barnes_hut_accelerations
+from src.permutations import expand_ranges
+
+MIN_PARTICLES_PER_WORKER = 64 #* Below this, splitting the work costs more than it saves.
+PAIRS_PER_BLOCK = 2**22 #* Bounds the memory used by each worker's pair arrays.
+POOL_START_METHOD = "forkserver" if "forkserver" in get_all_start_methods() else "spawn"
+
+#* (shape as multiples of capacity, dtype) of each array shared with the workers.
+SHARED_LAYOUT = {
+    "masses":        ((), float64),
+    "positions":     ((3,), float64),
+    "accelerations": ((3,), float64),
+    "cells":         ((3,), int64),
+    "keys":          ((), int64),
+    "order":         ((), int64),
+    "sorted_keys":   ((), int64),
+}
+
+_worker_arrays: dict[str, ndarray] = dict() #* Views onto shared memory, as seen from inside a worker.
+_worker_memory: list[SharedMemory] = list()
+_worker_pool: "WorkerPool | None" = None
+
+
+def _attach_to_shared_memory(names: dict[str, str], capacity: int) -> None:
+    """ Worker initialiser: maps every shared array into this process. """
+    for key, name in names.items():
+        memory = SharedMemory(name=name, track=False) #* The parent process owns and unlinks the memory.
+        shape, data_type = SHARED_LAYOUT[key]
+        _worker_memory.append(memory)
+        _worker_arrays[key] = ndarray((capacity, *shape), dtype=data_type, buffer=memory.buf)
+
+
+def calc_pair_terms(positions: ndarray, first: ndarray, second: ndarray, config_object: Config) -> ndarray:
+    """ Returns each (first, second) pair's G * displacement / distance**3, pointing from the second particle to the first, as `calc_accelerations` does. """
+    displacements = positions[first] - positions[second]
+    return config_object.G * displacements / norm(displacements, axis=1)[:, None]**3
+
+
+def accumulate(sums: ndarray, bins: ndarray, terms: ndarray, weights: ndarray) -> None:
+    """
+    Adds each of the `weights` times its pair's `terms` onto its bin of the (3, k) `sums`, one after another in order, in place.\n
+    Running sums are carried between calls this way, so sums split over several calls are rounded exactly as one `bincount` over everything would be.
+    """
+    carried_bins = concatenate([arange(sums.shape[1]), bins])
+    for axis in range(3):
+        sums[axis] = bincount(carried_bins, weights=concatenate([sums[axis], weights * terms[:, axis]]), minlength=sums.shape[1])
+
+
+def calc_row_block_accelerations(masses: ndarray, positions: ndarray, config_object: Config, out: ndarray, start: int, stop: int) -> None:
+    """
+    Calculates the direct-sum accelerations of rows `start` to `stop` only, writing them into `out`.\n
+    Pairs within the block are calculated once and applied to both of their rows, but pairs with an earlier row are also calculated by that row's block,
+    so splitting the rows into W blocks costs 2 - 1/W times the serial work in total.\n
+    Each row's pair terms are still summed in the same order as in `calc_accelerations`, so the results are bit-identical to it.
+    """
+    n, size = len(masses), stop - start
+    rows_per_block = max(1, PAIRS_PER_BLOCK // max(n, 1))
+    as_second_sums, as_first_sums = zeros((3, size)), zeros((3, size))
+
+    #* Pairs with every earlier row come first in each row's sum, just as they do in the serial one.
+    for block_start in range(start, stop, rows_per_block):
+        rows = arange(block_start, min(block_start + rows_per_block, stop))
+        as_second, earlier = expand_ranges(rows, zeros(len(rows), dtype=int64), full(len(rows), start))
+        accumulate(as_second_sums, as_second - start, calc_pair_terms(positions, earlier, as_second, config_object), masses[earlier])
+
+    #* Then pairs with every later row, which are applied to the later row too when it's also in the block.
+    for block_start in range(start, stop, rows_per_block):
+        rows = arange(block_start, min(block_start + rows_per_block, stop))
+        as_first, later = expand_ranges(rows, rows + 1, n - rows - 1)
+        terms = calc_pair_terms(positions, as_first, later, config_object)
+        for axis in range(3):
+            as_first_sums[axis, rows - start] = bincount(as_first - block_start, weights=masses[later] * terms[:, axis], minlength=len(rows))
+        inside = later < stop
+        accumulate(as_second_sums, later[inside] - start, terms[inside], masses[as_first[inside]])
+
+    out[start:stop] = (as_second_sums - as_first_sums).T
+
+
+def _accelerations_task(start: int, stop: int, n: int, config_object: Config) -> None:
+    masses, positions, out = _worker_arrays["masses"][:n], _worker_arrays["positions"][:n], _worker_arrays["accelerations"][:n]
+    if config_object.force_engine == "barnes_hut":
+        calc_barnes_hut_accelerations(masses, positions, config_object, out=out, start=start, stop=stop)
+    else:
+        calc_row_block_accelerations(masses, positions, config_object, out, start, stop)
+
+
+def _collisions_task(start: int, stop: int, n: int, cell_size: float, collision_distance: float) -> tuple[ndarray, ndarray]:
+    cell_list = CellList.from_arrays(cell_size, *(_worker_arrays[key][:n] for key in ("cells", "keys", "order", "sorted_keys")))
+    first, second = cell_list.neighbouring_pairs(arange(start, stop))
+    owned = (first >= start) & (first < stop) #* Pairs are owned by the block of their first row, so none are found twice.
+    first, second = first[owned], second[owned]
+    positions = _worker_arrays["positions"][:n]
+    colliding = norm(positions[first] - positions[second], axis=1) <= collision_distance
+    return first[colliding], second[colliding]
+
+
+class WorkerPool:
+    """
+    Persistent pool of worker processes that share particle state through `multiprocessing.shared_memory`,\n
+    so that only row ranges and settings are sent to the workers each step, never the particle arrays themselves.
+    """
+    def __init__(self, workers: int, capacity: int) -> None:
+        self.workers, self.capacity = workers, capacity
+        self.memory, self.arrays = dict(), dict()
+        for key, (shape, data_type) in SHARED_LAYOUT.items():
+            size = capacity * dtype(data_type).itemsize * (shape[0] if shape else 1)
+            self.memory[key] = SharedMemory(create=True, size=max(size, 1))
+            self.arrays[key] = ndarray((capacity, *shape), dtype=data_type, buffer=self.memory[key].buf)
+        names = { key: memory.name for key, memory in self.memory.items() }
+        #* Forked from a clean server process rather than this one, which may already be running the trajectory writer's or telemetry's threads.
+        #* The workers attach to the shared memory by name, so starting them this way costs nothing per step.
+        self.pool = get_context(POOL_START_METHOD).Pool(workers, initializer=_attach_to_shared_memory, initargs=(names, capacity))
+
+    def row_blocks(self, n: int) -> list[tuple[int, int]]:
+        return [ (int(rows[0]), int(rows[-1]) + 1) for rows in array_split(arange(n), self.workers) if len(rows) ]
+
+    def calc_accelerations(self, masses: ndarray, positions: ndarray, config_object: Config, out: ndarray) -> ndarray:
+        """ Splits the configured `force_engine`'s calculation into row blocks across the workers, writing the results into `out`. """
+        n = len(masses)
+        self.arrays["masses"][:n], self.arrays["positions"][:n] = masses, positions
+        self.pool.starmap(_accelerations_task, [ (start, stop, n, config_object) for start, stop in self.row_blocks(n) ])
+        out[:] = self.arrays["accelerations"][:n]
+        return out
+
+    def colliding_pairs(self, cell_list: CellList, positions: ndarray, collision_distance: float) -> tuple[ndarray, ndarray]:
+        """ Splits a full collision sweep of `cell_list` into row blocks across the workers, returning the colliding (x, y) row pairs. """
+        n = len(positions)
+        self.arrays["positions"][:n] = positions
+        for key in ("cells", "keys", "order", "sorted_keys"):
+            self.arrays[key][:n] = getattr(cell_list, key)
+        results = self.pool.starmap(_collisions_task, [ (start, stop, n, cell_list.cell_size, collision_distance) for start, stop in self.row_blocks(n) ])
+        if not results:
+            return zeros(0, dtype=int64), zeros(0, dtype=int64)
+        firsts, seconds = zip(*results)
+        return concatenate(firsts), concatenate(seconds)
+
+    def close(self) -> None:
+        self.pool.terminate()
+        self.pool.join()
+        self.arrays.clear()
+        for memory in self.memory.values():
+            memory.close()
+            memory.unlink()
+
+
+def worker_pool_for(n: int, config_object: Config) -> WorkerPool | None:
+    """
+    Returns the shared `WorkerPool` when `config_object.workers` asks for parallel calculation and there are `n` particles to split between them.\n
+    The pool is created on first use and kept for later steps; returns None when the calculation should stay serial.
+    """
+    global _worker_pool
+    workers = config_object.workers
+    if (workers <= 1) or (n < workers * MIN_PARTICLES_PER_WORKER):
+        return None
+    if (_worker_pool is None) or (_worker_pool.workers != workers) or (_worker_pool.capacity < n):
+        close_worker_pool()
+        _worker_pool = WorkerPool(workers, n)
+    return _worker_pool
+
+
+@register
+def close_worker_pool() -> None:
+    """ Shuts down the shared `WorkerPool`, if there is one, and frees its shared memory. """
+    global _worker_pool
+    if _worker_pool is not None:
+        _worker_pool.close()
+        _worker_pool = None
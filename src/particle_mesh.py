@@ -0,0 +1,76 @@
+""" Module for approximating gravitational accelerations with a particle-mesh (PM) solver on a 3D grid. """
+
+from functools import lru_cache
+
+from numpy import ndarray, arange, bincount, floor, gradient, int64, meshgrid, minimum, sqrt, stack, zeros
+from numpy.fft import rfftn, irfftn
+
+from src.classes.config import Config
+
+MARGIN = 1 #* Empty nodes around the particles, so every force they feel comes from central differences.
+
+
+def get_cloud_in_cell_weights(positions: ndarray, lower: ndarray, spacing: float, mesh_size: int) -> tuple[ndarray, ndarray]:
+    """
+    Takes in (N, 3) `positions` inside a grid of `mesh_size` nodes a side, `spacing` apart, starting at `lower`.\n
+    Returns the flat indices of the 8 nodes around each particle and its cloud-in-cell weight at each, both as (8, N) arrays.
+    """
+    scaled = (positions - lower) / spacing
+    cells = floor(scaled).astype(int64).clip(0, mesh_size - 2)
+    fractions = scaled - cells
+
+    indices, weights = zeros((8, len(positions)), dtype=int64), zeros((8, len(positions)))
+    for corner in range(8):
+        offset = ((corner >> 2) & 1, (corner >> 1) & 1, corner & 1)
+        node = cells + offset
+        indices[corner] = (node[:, 0] * mesh_size + node[:, 1]) * mesh_size + node[:, 2]
+        weights[corner] = 1
+        for axis in range(3):
+            weights[corner] *= fractions[:, axis] if offset[axis] else 1 - fractions[:, axis]
+    return indices, weights
+
+
+@lru_cache(maxsize=4)
+def get_green_function_transform(mesh_size: int) -> ndarray:
+    """
+    Returns the Fourier transform of -1/r sampled on a zero-padded grid twice `mesh_size` a side, with unit node spacing.\n
+    Padding keeps the convolution from wrapping around, so the system is isolated rather than periodic. The grid's own node is given -1.
+    """
+    padded = 2 * mesh_size
+    wrapped = minimum(arange(padded), padded - arange(padded)) #* Distances wrap around, so the kernel is symmetric.
+    x, y, z = meshgrid(wrapped, wrapped, wrapped, indexing="ij", sparse=True)
+    distances = sqrt(x**2 + y**2 + z**2)
+    distances[0, 0, 0] = 1
+    return rfftn(-1 / distances)
+
+
+def calc_particle_mesh_accelerations(masses: ndarray, positions: ndarray, config_object: Config, out: ndarray | None = None) -> ndarray:
+    """
+    Takes in particle `masses` and `positions`, and optionally an (N, 3) array to write into.\n
+    Returns an (N, 3) array of accelerations from a grid of `mesh_size` nodes a side spanning the particles:
+    masses are deposited onto it by cloud-in-cell, the potential is solved for with FFTs, and its gradient is interpolated back the same way.\n
+    Forces are accurate beyond a few grid spacings, and smoothed out closer than that.
+    """
+    accelerations = zeros((len(masses), 3)) if out is None else out
+    if len(masses) < 2:
+        accelerations[:] = 0
+        return accelerations
+
+    mesh_size = config_object.mesh_size
+    lower = positions.min(axis=0)
+    width = (positions.max(axis=0) - lower).max()
+    spacing = width * (1 + 1e-9) / (mesh_size - 1 - 2*MARGIN) if width > 0 else 1.
+    lower = lower - MARGIN * spacing
+
+    indices, weights = get_cloud_in_cell_weights(positions, lower, spacing, mesh_size)
+    node_masses = bincount(indices.ravel(), weights=(weights * masses).ravel(), minlength=mesh_size**3).reshape((mesh_size,)*3)
+
+    padded = 2 * mesh_size
+    potential = irfftn(rfftn(node_masses, s=(padded,)*3, axes=(0, 1, 2)) * get_green_function_transform(mesh_size), s=(padded,)*3, axes=(0, 1, 2))
+    potential = potential[:mesh_size, :mesh_size, :mesh_size] * (config_object.G / spacing)
+
+    field = stack([ -component.ravel() for component in gradient(potential, spacing) ], axis=1)
+    accelerations[:] = 0
+    for corner_indices, corner_weights in zip(indices, weights):
+        accelerations += corner_weights[:, None] * field[corner_indices]
+    return accelerations
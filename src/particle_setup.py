@@ -2,11 +2,11 @@
 
 import numpy.random as random
 from numpy.linalg import norm
-from numpy import array
+from numpy import ndarray, arange, array, empty, isfinite, zeros
 
 from src.data_types import Particles
 from src.classes.config import Config
-from src.classes.particle import Particle
+from src.classes.particle_system import ParticleSystem
 
 
 def get_initial_random_particle_attributes(seed: int, config_object: Config) -> tuple:
@@ -23,18 +23,81 @@ def get_initial_random_particle_attributes(seed: int, config_object: Config) ->
             y = rng.uniform(-1, 1)
             z = rng.uniform(-1, 1)
         return array([x, y, z])
-        
+
     position = config_object.max_distance * unit_vector()
     velocity = config_object.max_speed * unit_vector()
 
     return (mass, position, velocity)
 
 
+def get_unit_ball_vectors(rng: random.Generator, n: int) -> ndarray:
+    """ Takes in a random number generator, returns an (n, 3) array of vectors drawn uniformly from inside the unit sphere, in bulk. """
+    vectors = empty((n, 3))
+    filled = 0
+    while filled < n:
+        #* About 52% of the cube lies inside the sphere, so twice as many candidates usually fills the rest at once.
+        candidates = rng.uniform(-1, 1, size=(2*(n - filled) + 16, 3))
+        accepted = candidates[(candidates**2).sum(axis=1) <= 1][:n - filled]
+        vectors[filled:filled + len(accepted)] = accepted
+        filled += len(accepted)
+    return vectors
+
+
+def get_random_particle_arrays(config_object: Config) -> tuple[ndarray, ndarray, ndarray]:
+    """ Takes in a `Config` instance, returns arrays of random `masses`, `positions` and `velocities`, all drawn in bulk from a single generator. """
+    rng = random.default_rng(config_object.random_seed)
+    n = config_object.number_of_particles
+    masses = config_object.max_mass * (1 - rng.random(n)) #* (1-x) strat avoids the possibility of 0.
+    positions = config_object.max_distance * get_unit_ball_vectors(rng, n)
+    velocities = config_object.max_speed * get_unit_ball_vectors(rng, n)
+    return masses, positions, velocities
+
+
+def get_legacy_particle_arrays(config_object: Config) -> tuple[ndarray, ndarray, ndarray]:
+    """ Takes in a `Config` instance, returns the same `masses`, `positions` and `velocities` as earlier versions, seeding each particle separately. """
+    seed = config_object.random_seed
+    attributes = [ get_initial_random_particle_attributes(seed + i, config_object) for i in range(config_object.number_of_particles) ]
+    masses, positions, velocities = zip(*attributes) if attributes else ((), (), ())
+    return array(masses, dtype=float), array(positions, dtype=float).reshape(-1, 3), array(velocities, dtype=float).reshape(-1, 3)
+
+
+def validate_particle_arrays(masses: ndarray | None, positions: ndarray, velocities: ndarray) -> None:
+    """ Checks every particle's state at once, raising the same errors as `Particle` would for any invalid one. Tracers have no `masses` to check. """
+    if (masses is not None) and not (masses > 0).all():
+        raise ValueError("Mass must be greater than 0.")
+    if not isfinite(norm(positions, axis=1)).all():
+        raise ValueError("Starting distance is too large!")
+    if not isfinite(norm(velocities, axis=1)).all():
+        raise ValueError("Starting speed is too large!")
+
+
+def get_configured_system(config_object: Config) -> ParticleSystem:
+    """
+    Takes in a `Config` instance. Returns a `ParticleSystem` of randomly generated particles, without creating any `Particle` objects.\n
+    With `legacy_seeding` on, each particle is generated from its own seed, exactly as earlier versions did.
+    """
+    get_arrays = get_legacy_particle_arrays if config_object.legacy_seeding else get_random_particle_arrays
+    masses, positions, velocities = get_arrays(config_object)
+    validate_particle_arrays(masses, positions, velocities)
+    system = ParticleSystem(arange(config_object.number_of_particles), masses, positions, velocities)
+    if config_object.number_of_tracers:
+        system.tracers = get_configured_tracers(config_object)
+    return system
+
+
+def get_configured_tracers(config_object: Config) -> ParticleSystem:
+    """
+    Takes in a `Config` instance. Returns a `ParticleSystem` of `number_of_tracers` massless tracers, spread like the massive particles are.\n
+    They're drawn from their own generator, so adding tracers never changes the massive particles, and numbered after them.
+    """
+    rng = random.default_rng([config_object.random_seed, 1])
+    n = config_object.number_of_tracers
+    positions = config_object.max_distance * get_unit_ball_vectors(rng, n)
+    velocities = config_object.max_speed * get_unit_ball_vectors(rng, n)
+    validate_particle_arrays(None, positions, velocities)
+    return ParticleSystem(config_object.number_of_particles + arange(n), zeros(n), positions, velocities)
+
+
 def get_configured_particles(config_object: Config) -> Particles:
     """ Takes in a `Config` instance. Returns a finalised list of `Particles`. """
-    seed = config_object.random_seed
-    random_attributes = lambda x : get_initial_random_particle_attributes(x, config_object)
-    particles = [
-        Particle(i, *random_attributes(seed + i)) for i in range(config_object.number_of_particles)
-    ]
-    return particles
\ No newline at end of file
+    return get_configured_system(config_object).to_particles()
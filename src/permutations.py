@@ -2,6 +2,8 @@
 
 from typing import Generator
 
+from numpy import ndarray, arange, cumsum, repeat
+
 
 def ordered_pairs_permutations(a: list) -> Generator[tuple]:
     """
@@ -15,30 +17,12 @@ def ordered_pairs_permutations(a: list) -> Generator[tuple]:
             yield elem1, elem2
 
 
-def unordered_pairs_permutations(a: list) -> Generator[tuple]:
-    """
-    Takes in a list, yields all unordered pairings of its elements.\n
-    For example: [1,2,3] -> (1,2), (1,3), (2,1), (2,3), (3,1), (3,2).
-    """
-    for elem1 in a:
-        copy = a.copy()
-        copy.remove(elem1)
-        for elem2 in copy:
-            yield elem1, elem2
-
-
-def get_others(elem, a: list) -> tuple:
-    """ Returns a list of every *other* element """
-    others = a.copy()
-    others.remove(elem)
-    return others
-
-
-def all_chosen_and_others(a: list) -> Generator[tuple]:
+def expand_ranges(indices: ndarray, firsts: ndarray, counts: ndarray) -> tuple[ndarray, ndarray]:
     """
-    Takes in a list, yields a tuples of an element and a list o
-    f the other elements.\n
-    For example: [1,2,3] -> (1, [2,3]), (2, [1,3]), (3, [1,2]).
+    Takes in arrays of `indices`, range `firsts` and range `counts`.\n
+    Repeats each index `counts` times, pairing each repeat with consecutive values starting from its `firsts`.\n
+    For example: ([7,8], [0,5], [2,1]) -> ([7,7,8], [0,1,5]).
     """
-    for elem in a:
-        yield elem, get_others(elem, a)
+    repeated = repeat(indices, counts)
+    offsets = arange(len(repeated)) - repeat(cumsum(counts) - counts, counts)
+    return repeated, repeat(firsts, counts) + offsets
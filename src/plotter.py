@@ -1,50 +1,128 @@
-""" Module for logging and plotting `Particles`. """
+""" Module for logging and plotting `Particles`. matplotlib is only imported once something is plotted, so logging alone stays light. """
 
-import matplotlib.pyplot as plt
+from numpy import ndarray, arange, array, asarray, clip, concatenate, einsum, flatnonzero, float64, maximum, minimum, searchsorted, sort, sqrt, unique, where, repeat
 
-from src.data_types import PositionLog, Particles
+from src.data_types import PositionLog
 from src.classes.config import Config
+from src.classes.particle_system import ParticleSystem
+from src.trajectory import TrajectoryWriter, TrajectoryReader
 
+OVERSAMPLING = 16 #* Paths longer than this many times their point budget are evenly thinned out before being simplified.
 
-def log_positions(particles: Particles, position_log: PositionLog) -> None:
+
+def log_positions(system: ParticleSystem, position_log: PositionLog | TrajectoryWriter) -> PositionLog | TrajectoryWriter:
     """
-    Takes in `Particles` and a `PositionLog`.\n
-    Returns an updated `PositionLog` containing particles' positions. 
+    Takes in a `ParticleSystem` and either a `PositionLog` or a `TrajectoryWriter` streaming to disk.\n
+    Returns the updated log containing particles' positions.
     """
-    for particle in particles:
-        position_log[particle.id].append(particle.position)
+    if isinstance(position_log, TrajectoryWriter):
+        position_log.write(system)
+        return position_log
+    ids, _, positions = system.logged_state()
+    for id, position in zip(ids, positions):
+        position_log[int(id)].append(position.copy())
     return position_log
 
 
-def parse_position_logs(position_logs: PositionLog) -> dict[int: tuple]:
+def thin_path(positions: ndarray, stride: int) -> ndarray:
+    """
+    Takes in the `positions` along a path, returns the sorted indices of every `stride`th point and its last point,
+    along with the point furthest from the chord between each consecutive pair of them, so sharp kinks survive the thinning.
+    """
+    windows = (len(positions) - 1) // stride
+    starts = positions[0:windows*stride:stride]
+    chords = positions[stride:windows*stride+1:stride] - starts
+    offsets = positions[:windows*stride].reshape(windows, stride, 3) - starts[:, None, :] #* Strides are evenly spaced, so nothing is gathered.
+    chord_lengths = einsum("ij,ij->i", chords, chords)[:, None]
+    projections = (offsets @ chords[:, :, None])[:, :, 0]
+    along = clip(projections / where(chord_lengths > 0, chord_lengths, 1), 0, 1)
+    #* Squared distance from each point to the nearest point of its chord, expanded so the (n, 3) strays are never built.
+    deviations = einsum("ijk,ijk->ij", offsets, offsets) - along * (2*projections - along*chord_lengths)
+    furthest = deviations.argmax(axis=1) + arange(0, windows*stride, stride)
+    return unique(concatenate([arange(0, len(positions), stride), furthest, [len(positions)-1]]))
+
+
+def simplify_path(positions: ndarray, tolerance: float, max_points: int | None = None) -> ndarray:
+    """
+    Takes in an (n, 3) array of the `positions` along a path, returns the fewest of them needed to trace it to within `tolerance`, in order.\n
+    Works like Ramer-Douglas-Peucker, but splits every segment of the path at once in each pass.
+    With `max_points`, stops there, keeping the points that stray furthest from the simplified path first.\n
+    Paths longer than `OVERSAMPLING` times `max_points` are first thinned by `thin_path`, which keeps sharp kinks like close encounters,
+    though a gentler detour within one of its strides may not be traced to within `tolerance`.
+    """
+    points = len(positions)
+    max_points = points if max_points is None else max(max_points, 2)
+    if points <= 2:
+        return positions
+    if points > OVERSAMPLING*max_points:
+        positions = positions[thin_path(positions, points // (OVERSAMPLING*max_points))]
+        points = len(positions)
+
+    kept, indices = array([0, points-1]), arange(points)
+    while len(kept) < max_points:
+        #* Each point's distance from the segment between the kept points either side of it.
+        segments = minimum(searchsorted(kept, indices, side="right") - 1, len(kept) - 2)
+        starts = positions[kept[segments]]
+        chords, offsets = positions[kept[segments + 1]] - starts, positions - starts
+        chord_lengths = einsum("ij,ij->i", chords, chords)
+        along = clip(einsum("ij,ij->i", offsets, chords) / where(chord_lengths > 0, chord_lengths, 1), 0, 1)
+        strays = offsets - along[:, None] * chords
+        deviations = sqrt(einsum("ij,ij->i", strays, strays))
+        deviations[kept] = 0
+
+        #* The furthest point of every segment that's still too far from it is kept next.
+        furthest = maximum.reduceat(deviations, kept[:-1])
+        candidates = flatnonzero((deviations > tolerance) & (deviations == furthest[segments]))
+        _, first = unique(segments[candidates], return_index=True)
+        candidates = candidates[first]
+        if not len(candidates):
+            break
+        if len(kept) + len(candidates) > max_points:
+            candidates = candidates[(-deviations[candidates]).argsort()[:max_points - len(kept)]]
+        kept = sort(concatenate([kept, candidates]))
+    return positions[kept]
+
+
+def parse_position_logs(position_logs: PositionLog | TrajectoryReader, max_points: int | None = None, tolerance: float = 0.) -> dict[int: tuple]:
     """
-    Takes in `PositionLog` and parses its position lists to pyplot-friendly (xs,ys,zs) tuple.\n
-    Example: { 0: [ [10,20,30], [11,21,31], ... ] } -> { 0: ([10,11,...], [20,21,...], [30,31,...]) }
+    Takes in `PositionLog` (or a `TrajectoryReader`, read one particle at a time) and parses its position lists to pyplot-friendly (xs,ys,zs) array tuples.\n
+    Example: { 0: [ [10,20,30], [11,21,31], ... ] } -> { 0: (array([10,11,...]), array([20,21,...]), array([30,31,...])) }\n
+    With `max_points` or a `tolerance`, each path is simplified by `simplify_path`, `tolerance` being a fraction of the path's own extent.
     """
     parsed_logs = dict()
     for id, positions in position_logs.items():
-        
-        xs, ys, zs = list(), list(), list()
-        for x, y, z in positions:
-            #TODO: Got to be a better way of doing this.
-            xs.append(x)
-            ys.append(y)
-            zs.append(z)
-        parsed_logs[id] = (xs, ys, zs)
+        positions = asarray(positions, dtype=float64).reshape(-1, 3)
+        if len(positions) and (max_points or tolerance):
+            extent = (positions.max(axis=0) - positions.min(axis=0)).max()
+            positions = simplify_path(positions, tolerance * extent, max_points)
+        parsed_logs[id] = tuple(positions.T)
     return parsed_logs
 
 
-def plotter(ax, xyzs: tuple, config_object: Config, **param_dict: dict) -> None:
-    """ Takes in an `axes` argument, xyz positions and  """
+def plot_paths(ax, parsed_logs: dict[int: tuple], config_object: Config) -> None:
+    """ Takes in an `axes` argument and parsed logs, draws every particle's path at once, coloured as separately plotted paths would be. """
+    from matplotlib import rcParams
+    from matplotlib.colors import to_rgba_array
+    from mpl_toolkits.mplot3d.art3d import Line3DCollection
+
+    paths = [ array(xyzs).T for xyzs in parsed_logs.values() if len(xyzs[0]) ]
+    if not paths:
+        return
+    cycle = to_rgba_array(rcParams["axes.prop_cycle"].by_key()["color"])
+    colours = cycle[arange(len(paths)) % len(cycle)]
+
     if config_object.scatter:
-        ax.scatter(*xyzs, s=config_object.marker_size, **param_dict)
+        lengths = [ len(path) for path in paths ]
+        ax.scatter(*concatenate(paths).T, s=config_object.marker_size, c=repeat(colours, lengths, axis=0))
     if config_object.lines:
-        ax.plot(*xyzs, **param_dict)
+        ax.add_collection3d(Line3DCollection(paths, colors=colours))
+
 
+def plot_logs(position_logs: PositionLog | TrajectoryReader, config_object: Config) -> None:
+    """ Takes in a `PositionLog' (or `TrajectoryReader`) and `Config` object, parses and simplifies it into pyplot-readable arrays, styles and plots it in 3D. """
+    import matplotlib.pyplot as plt
 
-def plot_logs(position_logs: PositionLog, config_object: Config) -> None:
-    """ Takes in a `PositionLog' and `Config` object, parses it into pyplot-readable tuples, styles and plots it in 3D. """
-    parsed_logs = parse_position_logs(position_logs)
+    parsed_logs = parse_position_logs(position_logs, config_object.plot_max_points, config_object.plot_tolerance)
 
     fig = plt.figure(label="Gravity Simulation")
     ax = fig.add_subplot((0,.01,1,1), projection='3d')
@@ -58,8 +136,7 @@ def plot_logs(position_logs: PositionLog, config_object: Config) -> None:
     ax.set_ylabel('y-axis')
     ax.set_zlabel('z-axis')
 
-    for id, xyzs in parsed_logs.items():
-        plotter(ax, xyzs, config_object, label=f"Particle {id}")
+    plot_paths(ax, parsed_logs, config_object)
 
     try:
         plt.show()
@@ -0,0 +1,124 @@
+""" Module for observing the phases of each timestep, and profiling where a run spends its time. """
+
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Generator
+
+PHASES = ("position", "collisions", "acceleration", "velocity")
+
+
+class StepRecord:
+    """
+    What happened during one timestep: the wall-clock `phase_seconds` spent in each of its `PHASES`,
+    how many particles were absorbed by `collisions`, how many were left `alive`,
+    and how many `pair_interactions` the force calculation covered (counted as in a direct sum).\n
+    When `energy_diagnostics` are on, the energies and momenta at the end of the timestep are included as `diagnostics`.
+    """
+    __slots__ = ("phase_seconds", "collisions", "alive", "pair_interactions", "diagnostics")
+
+    def __init__(self, phase_seconds: dict[str, float], collisions: int, alive: int, diagnostics=None) -> None:
+        self.phase_seconds = phase_seconds
+        self.collisions = collisions
+        self.alive = alive
+        self.pair_interactions = alive * (alive - 1) // 2
+        self.diagnostics = diagnostics
+
+
+class StepObserver:
+    """ Base class for anything notified of each timestep while it's registered with `add_observer`. """
+    def on_step(self, record: StepRecord) -> None:
+        pass
+
+
+_observers: list[StepObserver] = list()
+
+
+def add_observer(observer: StepObserver) -> None:
+    _observers.append(observer)
+
+
+def remove_observer(observer: StepObserver) -> None:
+    _observers.remove(observer)
+
+
+@contextmanager
+def observing(observer: StepObserver) -> Generator[StepObserver]:
+    """ Registers `observer` for the duration of the context. """
+    add_observer(observer)
+    try:
+        yield observer
+    finally:
+        remove_observer(observer)
+
+
+class _NullTimer:
+    """ Stands in for a `PhaseTimer` when nothing is observing, so an unobserved timestep does no timing at all. """
+    def lap(self, phase: str) -> None:
+        pass
+
+    def finish(self, alive: int, diagnostics=None) -> None:
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+class PhaseTimer:
+    """ Times consecutive phases of one timestep, then notifies every observer once the timestep is finished. """
+    def __init__(self, particles: int) -> None:
+        self.particles = particles
+        self.phase_seconds = dict()
+        self.last = perf_counter()
+
+    def lap(self, phase: str) -> None:
+        """ Adds the time since the last lap to the time spent in `phase`. """
+        now = perf_counter()
+        self.phase_seconds[phase] = self.phase_seconds.get(phase, 0.) + now - self.last
+        self.last = now
+
+    def finish(self, alive: int, diagnostics=None) -> None:
+        record = StepRecord(self.phase_seconds, self.particles - alive, alive, diagnostics)
+        for observer in _observers:
+            observer.on_step(record)
+
+
+def start_phase_timer(particles: int) -> PhaseTimer | _NullTimer:
+    """ Takes in the number of `particles` at the start of a timestep, returns a timer for its phases, if anything's observing them. """
+    return PhaseTimer(particles) if _observers else NULL_TIMER
+
+
+class StepProfiler(StepObserver):
+    """ Accumulates the time spent in each phase, along with throughput counters, over every timestep it observes. """
+    def __init__(self) -> None:
+        self.steps = 0
+        self.phase_seconds = { phase: 0. for phase in PHASES }
+        self.collisions = 0
+        self.pair_interactions = 0
+        self.alive = None
+
+    def on_step(self, record: StepRecord) -> None:
+        self.steps += 1
+        for phase, seconds in record.phase_seconds.items():
+            self.phase_seconds[phase] = self.phase_seconds.get(phase, 0.) + seconds
+        self.collisions += record.collisions
+        self.pair_interactions += record.pair_interactions
+        self.alive = record.alive
+
+    @property
+    def pair_interactions_per_second(self) -> float:
+        """ Pair interactions covered per second spent calculating accelerations. """
+        seconds = self.phase_seconds["acceleration"]
+        return self.pair_interactions / seconds if seconds else 0.
+
+    def summary(self) -> str:
+        """ Returns a plain-text summary of everything observed so far. """
+        total = sum(self.phase_seconds.values())
+        lines = [f"Profiled {self.steps:,} timesteps in {total:.3f} s:"]
+        for phase, seconds in self.phase_seconds.items():
+            share = seconds / total if total else 0.
+            mean = seconds / self.steps if self.steps else 0.
+            lines.append(f"  {phase:<13} {seconds:>10.3f} s {share:>7.1%} {1e3*mean:>10.4f} ms/step")
+        lines.append(f"  pair interactions per second: {self.pair_interactions_per_second:.3g}")
+        lines.append(f"  collisions: {self.collisions:,} ({self.collisions / max(self.steps, 1):.3g} per step)")
+        lines.append(f"  particles alive: {self.alive}")
+        return "\n".join(lines)
@@ -0,0 +1,110 @@
+""" Module for caching finished runs, so that running an unchanged config again loads its results instead of repeating the simulation. """
+
+from functools import lru_cache
+from hashlib import sha256
+from os import path, scandir, utime, walk
+from shutil import copytree, rmtree
+
+import numpy
+
+from src.checkpoint import TRAJECTORY_SETTINGS, save_checkpoint, load_checkpoint
+from src.classes.config import Config
+from src.classes.particle_system import ParticleSystem
+
+#* Settings that change what a run records, on top of those that change the trajectory itself. Display settings are left out.
+RECORDING_SETTINGS = ("timesteps", "simple_log_rate")
+TRAJECTORY_FOLDER = "trajectory"
+FINAL_STATE_FILE = "final_state.npz"
+
+
+def normalise_setting(value) -> str:
+    """ Returns a canonical string for a config `value`, so that equal settings written differently (like `1` and `1.0`) hash the same. """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return repr(float(value))
+    return repr(value)
+
+
+@lru_cache(maxsize=1)
+def code_fingerprint() -> str:
+    """ Returns a hash of every source file of the simulation and the NumPy version, so that changing either invalidates cached runs. """
+    source_hash = sha256(numpy.__version__.encode())
+    source_folder = path.dirname(path.abspath(__file__))
+    for folder, subfolders, files in sorted(walk(source_folder)):
+        subfolders.sort()
+        for name in sorted(files):
+            if name.endswith(".py"):
+                with open(path.join(folder, name), "rb") as source_file:
+                    source_hash.update(path.relpath(path.join(folder, name), source_folder).encode())
+                    source_hash.update(source_file.read())
+    return source_hash.hexdigest()
+
+
+def run_key(config_object: Config) -> str:
+    """ Returns the cache key of the run `config_object` describes: a hash of its normalised settings and of the code that runs them. """
+    settings = ";".join(f"{name}={normalise_setting(getattr(config_object, name))}" for name in TRAJECTORY_SETTINGS + RECORDING_SETTINGS)
+    return sha256(f"{settings};code={code_fingerprint()}".encode()).hexdigest()
+
+
+def folder_size(folder: str) -> int:
+    """ Returns the total size, in bytes, of every file inside `folder`. """
+    return sum( path.getsize(path.join(root, name)) for root, _, files in walk(folder) for name in files )
+
+
+class RunCache:
+    """
+    Folder of finished runs, each holding its recorded trajectory and final state, named by its `run_key`.\n
+    Entries are used least recently first when the cache grows beyond `max_bytes`, with their folders' modification times marking their last use.\n
+    Cached trajectories are read in place rather than copied back out, so loading a run costs the same however long it is.
+    """
+    def __init__(self, folder: str, max_bytes: int) -> None:
+        self.folder = folder
+        self.max_bytes = max_bytes
+
+    def entry(self, key: str) -> str:
+        return path.join(self.folder, key)
+
+    def load(self, key: str, config_object: Config) -> tuple[ParticleSystem, str] | None:
+        """
+        Returns the final state of the run cached under `key`, and the folder its trajectory was recorded in, to be read from where it is.\n
+        Returns None if there's no such run cached.
+        """
+        entry = self.entry(key)
+        if not path.exists(path.join(entry, FINAL_STATE_FILE)):
+            return None
+        utime(entry) #* Marks it as the most recently used.
+        return load_checkpoint(path.join(entry, FINAL_STATE_FILE), config_object)[0], path.join(entry, TRAJECTORY_FOLDER)
+
+    def store(self, key: str, trajectory_path: str, system: ParticleSystem, step: int, frame: int, config_object: Config) -> bool:
+        """
+        Caches the trajectory recorded at `trajectory_path` and the final state of `system` under `key`, then evicts old runs if needed.\n
+        Runs too large to fit within `max_bytes` on their own aren't cached, since making room for them would evict every other run.
+        Returns whether the run was cached.
+        """
+        if folder_size(trajectory_path) > self.max_bytes:
+            return False
+        entry = self.entry(key)
+        rmtree(entry, ignore_errors=True) #* Nothing is left over from a run stored under the same key before.
+        copytree(trajectory_path, path.join(entry, TRAJECTORY_FOLDER))
+        #* The final state is written last, so an interrupted store is never mistaken for a whole run.
+        save_checkpoint(path.join(entry, FINAL_STATE_FILE), system, step, frame, config_object)
+        if folder_size(entry) > self.max_bytes:
+            rmtree(entry)
+            return False
+        utime(entry)
+        self.evict()
+        return True
+
+    def evict(self) -> list[str]:
+        """ Deletes the least recently used runs until the cache fits within `max_bytes`. Returns the keys of those deleted. """
+        if not path.isdir(self.folder):
+            return list()
+        entries = sorted(( entry for entry in scandir(self.folder) if entry.is_dir() ), key=lambda entry: entry.stat().st_mtime)
+        sizes = { entry.name: folder_size(entry.path) for entry in entries }
+        total, evicted = sum(sizes.values()), list()
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            rmtree(entry.path)
+            total -= sizes[entry.name]
+            evicted.append(entry.name)
+        return evicted
@@ -0,0 +1,84 @@
+""" Module for recording sampled, structured telemetry about each timestep without slowing the main loop. """
+
+import json
+from collections import deque
+from threading import Event, Thread
+from time import perf_counter
+
+from src.profiling import StepObserver, StepRecord
+
+FLUSH_INTERVAL = 1. #* Longest time, in seconds, a record waits in memory before being written.
+
+
+class StepTelemetry(StepObserver):
+    """
+    Observes timesteps, keeping a structured record of every `sample_rate`-th one in an in-memory ring buffer of `buffer_size` records.\n
+    A background thread writes the buffered records to `filename` in bulk as JSON lines, so the main loop never formats or writes anything.
+    If the writer falls a whole buffer behind, the oldest records are overwritten and counted in `dropped`.\n
+    Step numbers start from `start_step`; resuming from one appends to the existing file.
+    """
+    def __init__(self, filename: str, sample_rate: int, buffer_size: int, start_step: int = 0) -> None:
+        self.sample_rate = sample_rate
+        self.step = start_step
+        self.start = perf_counter()
+        self.records = deque(maxlen=buffer_size)
+        self.recorded, self.written = 0, 0
+
+        self.file = open(filename, "a" if start_step else "w")
+        self.wake, self.stopping = Event(), Event()
+        self.thread = Thread(target=self._drain, daemon=True)
+        self.thread.start()
+
+    def on_step(self, record: StepRecord) -> None:
+        step, self.step = self.step, self.step + 1
+        if step % self.sample_rate:
+            return
+        self.records.append((step, perf_counter() - self.start, record))
+        self.recorded += 1
+        if len(self.records) >= self.records.maxlen // 2:
+            self.wake.set()
+
+    @property
+    def dropped(self) -> int:
+        """ Number of records overwritten before they could be written. """
+        return self.recorded - self.written - len(self.records)
+
+    def recent(self) -> list[dict]:
+        """ Returns the records still held in memory, oldest first. """
+        return [ self._as_dict(*entry) for entry in list(self.records) ]
+
+    @staticmethod
+    def _as_dict(step: int, elapsed: float, record: StepRecord) -> dict:
+        as_dict = {
+            "step": step,
+            "elapsed": elapsed,
+            "alive": record.alive,
+            "collisions": record.collisions,
+            "phase_seconds": record.phase_seconds,
+        }
+        if record.diagnostics is not None:
+            as_dict["diagnostics"] = record.diagnostics.as_dict()
+        return as_dict
+
+    def _write_buffered(self) -> None:
+        lines = list()
+        while self.records:
+            lines.append(json.dumps(self._as_dict(*self.records.popleft())))
+        if lines:
+            self.file.write("\n".join(lines) + "\n")
+            self.file.flush()
+            self.written += len(lines)
+
+    def _drain(self) -> None:
+        while not self.stopping.is_set():
+            self.wake.wait(FLUSH_INTERVAL)
+            self.wake.clear()
+            self._write_buffered()
+        self._write_buffered()
+
+    def close(self) -> None:
+        """ Writes every remaining record, then closes the file. """
+        self.stopping.set()
+        self.wake.set()
+        self.thread.join()
+        self.file.close()
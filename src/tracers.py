@@ -0,0 +1,45 @@
+""" Module for calculating the motion of massless tracer particles, which feel the gravity of massive particles without exerting any. """
+
+from numpy import ndarray, einsum, flatnonzero, full, inf, sqrt, zeros
+
+from src.classes.config import Config
+from src.classes.particle_system import ParticleSystem
+
+PAIRS_PER_BLOCK = 2**20 #* Bounds the working memory of `calc_tracer_accelerations` to a few arrays of this many (tracer, massive) pairs.
+
+
+def calc_tracer_accelerations(masses: ndarray, positions: ndarray, tracer_positions: ndarray, config_object: Config, out: ndarray | None = None) -> tuple[ndarray, ndarray]:
+    """
+    Takes in the `masses` and `positions` of the massive particles, the positions of the tracers, and optionally an (T, 3) array to write into.\n
+    Returns the tracers' (T, 3) accelerations due to the massive particles alone, and each tracer's distance to its nearest massive particle.\n
+    Only (tracer, massive) pairs are evaluated, so the cost grows with their product rather than with the square of everything.
+    """
+    accelerations = zeros((len(tracer_positions), 3)) if out is None else out
+    nearest = full(len(tracer_positions), inf)
+    if not len(masses):
+        accelerations[:] = 0
+        return accelerations, nearest
+
+    rows_per_block = max(1, PAIRS_PER_BLOCK // len(masses))
+    for start in range(0, len(tracer_positions), rows_per_block):
+        block = slice(start, start + rows_per_block)
+        displacements = positions[None, :, :] - tracer_positions[block, None, :]
+        distances = sqrt(einsum("ijk,ijk->ij", displacements, displacements))
+        accelerations[block] = einsum("ij,ijk->ik", config_object.G * masses / distances**3, displacements)
+        nearest[block] = distances.min(axis=1)
+    return accelerations, nearest
+
+
+def absorb_tracers(tracers: ParticleSystem, nearest: ndarray, config_object: Config) -> int:
+    """ Removes every tracer within `collision_distance` of a massive particle, which carries on unchanged. Returns how many were absorbed. """
+    absorbed = flatnonzero(nearest <= config_object.collision_distance)
+    if len(absorbed):
+        tracers.remove(absorbed)
+    return len(absorbed)
+
+
+def initialise_tracers(system: ParticleSystem, config_object: Config) -> int:
+    """ Calculates the initial accelerations of the `system`'s tracers, absorbing any that start too close to a massive particle. """
+    tracers = system.tracers
+    _, nearest = calc_tracer_accelerations(system.masses, system.positions, tracers.positions, config_object, out=tracers.accelerations)
+    return absorb_tracers(tracers, nearest, config_object)
@@ -0,0 +1,154 @@
+""" Module for streaming logged particle positions to disk and reading them back lazily. """
+
+from os import makedirs, path, replace
+from queue import Queue
+from threading import Thread
+from typing import Generator
+
+from numpy import ndarray, load, save, searchsorted, sort, nan, argmin, float64
+from numpy.lib.format import open_memmap
+
+from src.classes.particle_system import ParticleSystem
+
+CHUNK_FRAMES = 64 #* Frames written between each flush to disk.
+
+
+TRAJECTORY_FILES = ("positions.npy", "masses.npy", "alive.npy", "written.npy")
+
+
+def grow_trajectory(folder: str, frames: int) -> None:
+    """ Copies each of the trajectory's files in `folder` into a larger one with room for `frames`, if it doesn't have room already. """
+    for name in TRAJECTORY_FILES:
+        filename = path.join(folder, name)
+        existing = load(filename, mmap_mode="r")
+        if len(existing) >= frames:
+            continue
+        temporary = filename + ".tmp.npy"
+        grown = open_memmap(temporary, mode="w+", dtype=existing.dtype, shape=(frames, *existing.shape[1:]))
+        grown[:len(existing)] = existing
+        grown.flush()
+        del grown, existing #* Releases both maps before the old file is replaced.
+        replace(temporary, filename)
+
+
+class TrajectoryWriter:
+    """
+    Streams snapshots of a `ParticleSystem` into preallocated, memory-mapped `.npy` files inside the `folder`:\n
+    `positions` and `masses` per frame and particle, which particles are `alive` in each frame, and which frames have been `written`.\n
+    Snapshots are copied and queued, then written and flushed in chunks by a background thread.\n
+    If the thread fails to write or flush, it keeps emptying the queue, and its error is raised again by the next `write`, `sync` or `close`.\n
+    Given a `start_frame`, the existing trajectory in `folder` is reopened and continued from that frame instead,
+    first growing it to hold `frames` if it's too small, as when a run is extended.
+    """
+    def __init__(self, folder: str, ids: ndarray, frames: int, start_frame: int = 0) -> None:
+        makedirs(folder, exist_ok=True)
+        mode = "r+" if start_frame else "w+"
+        self.folder, self.frames, self.frame = folder, frames, start_frame
+        self.ids = load(path.join(folder, "ids.npy")) if start_frame else sort(ids)
+        if not start_frame:
+            save(path.join(folder, "ids.npy"), self.ids)
+        else:
+            grow_trajectory(folder, frames)
+
+        shape = (frames, len(self.ids))
+        self.positions = open_memmap(path.join(folder, "positions.npy"), mode=mode, dtype=float64, shape=(*shape, 3))
+        self.masses    = open_memmap(path.join(folder, "masses.npy"), mode=mode, dtype=float64, shape=shape)
+        self.alive     = open_memmap(path.join(folder, "alive.npy"), mode=mode, dtype=bool, shape=shape)
+        self.written   = open_memmap(path.join(folder, "written.npy"), mode=mode, dtype=bool, shape=(frames,))
+        self.frames = len(self.written)
+
+        if start_frame:
+            #* Anything past `start_frame` is left over from an interrupted run, and will be written again.
+            #* New files start out zeroed, so nothing is written up front; readers only look at frames that are `written` and particles that are `alive`.
+            self.written[start_frame:], self.alive[start_frame:] = False, False
+            self.positions[start_frame:], self.masses[start_frame:] = nan, nan
+
+        self.error = None
+        self.queue = Queue(maxsize=2*CHUNK_FRAMES) #* Bounds memory if the disk can't keep up.
+        self.thread = Thread(target=self._drain, daemon=True)
+        self.thread.start()
+
+    def write(self, system: ParticleSystem) -> None:
+        """ Queues a snapshot of the `system`, and its tracers if it has any, as the next frame. """
+        if self.frame >= self.frames:
+            raise ValueError(f"Trajectory only has room for {self.frames:,} frames.")
+        self.raise_error()
+        ids, masses, positions = system.logged_state()
+        self.queue.put((self.frame, ids.copy(), masses.copy(), positions.copy()))
+        self.frame += 1
+
+    def _drain(self) -> None:
+        while (snapshot := self.queue.get()) is not None:
+            if self.error is None: #* Once writing has failed, the rest are discarded, so `write` never blocks on a full queue.
+                try:
+                    self._write_snapshot(*snapshot)
+                except Exception as error:
+                    self.error = error
+            self.queue.task_done()
+        if self.error is None:
+            try:
+                self.flush()
+            except Exception as error:
+                self.error = error
+
+    def _write_snapshot(self, frame: int, ids: ndarray, masses: ndarray, positions: ndarray) -> None:
+        slots = searchsorted(self.ids, ids)
+        self.positions[frame, slots] = positions
+        self.masses[frame, slots] = masses
+        self.alive[frame, slots] = True
+        self.written[frame] = True
+        if (frame + 1) % CHUNK_FRAMES == 0:
+            self.flush()
+
+    def raise_error(self) -> None:
+        """ Raises the error the background thread stopped writing with, if it has. """
+        if self.error is not None:
+            raise self.error
+
+    def flush(self) -> None:
+        #* `written` goes last, so a reader never sees a frame before its data.
+        for memmap in (self.positions, self.masses, self.alive, self.written):
+            memmap.flush()
+
+    def sync(self) -> None:
+        """ Waits for every queued frame to be written, then flushes them to disk. """
+        self.queue.join()
+        self.raise_error()
+        self.flush()
+
+    def close(self) -> None:
+        """ Waits for every queued frame to be written and flushed. """
+        self.queue.put(None)
+        self.thread.join()
+        self.raise_error()
+
+
+class TrajectoryReader:
+    """
+    Lazily reads a trajectory written by `TrajectoryWriter`, even one that was interrupted part way through.\n
+    Behaves like a `PositionLog`, mapping each particle ID to the positions it was logged at.
+    """
+    def __init__(self, folder: str) -> None:
+        self.ids       = load(path.join(folder, "ids.npy"))
+        self.positions = load(path.join(folder, "positions.npy"), mmap_mode="r")
+        self.masses    = load(path.join(folder, "masses.npy"), mmap_mode="r")
+        self.alive     = load(path.join(folder, "alive.npy"), mmap_mode="r")
+        written        = load(path.join(folder, "written.npy"), mmap_mode="r")
+        self.frames    = int(argmin(written)) if not written.all() else len(written)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, id: int) -> ndarray:
+        """ Returns an (n, 3) array of the positions particle `id` was logged at, read from disk only now. """
+        slot = int(searchsorted(self.ids, id))
+        if (slot == len(self.ids)) or (self.ids[slot] != id):
+            raise KeyError(id)
+        return self.positions[:self.frames, slot][self.alive[:self.frames, slot]]
+
+    def keys(self) -> list[int]:
+        return [ int(id) for id in self.ids ]
+
+    def items(self) -> Generator[tuple[int, ndarray]]:
+        for id in self.keys():
+            yield id, self[id]
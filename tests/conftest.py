@@ -22,6 +22,7 @@ class Config:
     def __init__(
             self, 
             number_of_particles: int = 4,
+            number_of_tracers: int = 0,
             max_mass: float = 100,
             max_distance: float = 10,
             max_speed: float = 1,
@@ -29,9 +30,37 @@ class Config:
             G: float = 1,
             collision_distance: float = 1e-4,
             dt: float = 0.001,
-            random_seed : int = 1
+            random_seed : int = 1,
+            force_engine: str = "direct",
+            opening_angle: float = 0.5,
+            mesh_size: int = 32,
+            workers: int = 1,
+            checkpoint_interval: int = 0,
+            checkpoint_path: str = "sim_checkpoint.npz",
+            step_logging: bool = True,
+            telemetry_sample_rate: int = 0,
+            telemetry_buffer_size: int = 1024,
+            telemetry_path: str = "sim_telemetry.jsonl",
+            energy_diagnostics: bool = False,
+            integrator: str = "verlet",
+            block_timesteps: bool = False,
+            block_levels: int = 10,
+            timestep_accuracy: float = 0.02,
+            encounter_distance: float = 0,
+            encounter_substeps: int = 64,
+            legacy_seeding: bool = False,
+            scatter: bool = True,
+            lines: bool = False,
+            marker_size: float = 6,
+            plot_max_points: int = 2_000,
+            plot_tolerance: float = 0.001,
+            stop_at_single_survivor: bool = True,
+            escape_radius: float = 0,
+            escape_action: str = "cull",
+            wall_clock_budget: float = 0
         ):
         self.number_of_particles = number_of_particles
+        self.number_of_tracers = number_of_tracers
         self.max_mass = max_mass
         self.max_distance = max_distance
         self.max_speed = max_speed
@@ -40,6 +69,33 @@ class Config:
         self.collision_distance = collision_distance
         self.dt = dt
         self.random_seed = random_seed
+        self.force_engine = force_engine
+        self.opening_angle = opening_angle
+        self.mesh_size = mesh_size
+        self.workers = workers
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoint_path = checkpoint_path
+        self.step_logging = step_logging
+        self.telemetry_sample_rate = telemetry_sample_rate
+        self.telemetry_buffer_size = telemetry_buffer_size
+        self.telemetry_path = telemetry_path
+        self.energy_diagnostics = energy_diagnostics
+        self.integrator = integrator
+        self.block_timesteps = block_timesteps
+        self.block_levels = block_levels
+        self.timestep_accuracy = timestep_accuracy
+        self.encounter_distance = encounter_distance
+        self.encounter_substeps = encounter_substeps
+        self.legacy_seeding = legacy_seeding
+        self.scatter = scatter
+        self.lines = lines
+        self.marker_size = marker_size
+        self.plot_max_points = plot_max_points
+        self.plot_tolerance = plot_tolerance
+        self.stop_at_single_survivor = stop_at_single_survivor
+        self.escape_radius = escape_radius
+        self.escape_action = escape_action
+        self.wall_clock_budget = wall_clock_budget
         self.half_dtsq = .5 * self.dt**2
         self.simple_log_rate = int(self.number_of_particles *  self.timesteps / 1_000)
 
@@ -0,0 +1,67 @@
+import pytest
+from numpy import arange, zeros, median
+from numpy.linalg import norm
+from numpy.random import default_rng
+
+from src.barnes_hut import Octree, calc_barnes_hut_accelerations
+from src.classes.particle_system import ParticleSystem
+from src.collision_handler import get_pair_separations
+from src.motion_calcs import calc_accelerations, simulate_timestep
+
+
+SYSTEMS = [
+    (2, 2, "normal"), (3, 3, "normal"), (40, 40, "normal"), (600, 600, "normal"),
+    (7, 50, "uniform"), (11, 100, "uniform"), (1234, 1500, "normal"), (99, 3000, "normal"), (5, 1000, "uniform"),
+]
+
+
+@pytest.fixture(params=SYSTEMS, ids=lambda params: "seed{}-n{}-{}".format(*params))
+def system(request):
+    seed, n, distribution = request.param
+    rng = default_rng(seed)
+    positions = rng.normal(scale=10, size=(n, 3)) if distribution == "normal" else rng.uniform(-10, 10, size=(n, 3))
+    return ParticleSystem(arange(n), 1 + 99*rng.random(n), positions, zeros((n, 3)))
+
+
+@pytest.fixture
+def direct_accelerations(system, config):
+    return calc_accelerations(system.masses, get_pair_separations(system), config)
+
+
+def relative_errors(system, direct_accelerations, config, opening_angle):
+    config.opening_angle = opening_angle
+    approximate = calc_barnes_hut_accelerations(system.masses, system.positions, config)
+    return norm(approximate - direct_accelerations, axis=1) / norm(direct_accelerations, axis=1)
+
+
+class TestOctree:
+    def test_root_holds_total_mass_and_centre_of_mass(self, system):
+        tree = Octree(system.masses, system.positions)
+        assert tree.mass[0] == pytest.approx(system.masses.sum())
+        centre_of_mass = (system.masses[:, None] * system.positions).sum(axis=0) / system.masses.sum()
+        assert list(tree.centre_of_mass[0]) == pytest.approx(list(centre_of_mass))
+
+    def test_children_partition_their_parent(self, system):
+        tree = Octree(system.masses, system.positions)
+        for node in range(len(tree)):
+            children = range(tree.first_child[node], tree.first_child[node] + tree.n_children[node])
+            if tree.n_children[node]:
+                assert sum(tree.count[child] for child in children) == tree.count[node]
+                assert sum(tree.mass[child] for child in children) == pytest.approx(tree.mass[node])
+
+
+class TestBarnesHutAccuracy:
+    def test_zero_opening_angle_matches_direct_sum(self, system, direct_accelerations, config):
+        assert relative_errors(system, direct_accelerations, config, 0).max() < 1e-10
+
+    def test_error_grows_with_opening_angle(self, system, direct_accelerations, config):
+        errors = [ median(relative_errors(system, direct_accelerations, config, theta)) for theta in (0.2, 0.5, 1.0) ]
+        assert errors[0] <= errors[1] <= errors[2]
+        assert errors[1] < 1e-2
+
+    def test_simulate_timestep_with_barnes_hut(self, initialised_particles, config):
+        config.force_engine, config.opening_angle = "barnes_hut", 0
+        momentum = lambda ptcls: sum([ptcl.mass*ptcl.velocity for ptcl in ptcls])
+        initial_momentum = list(momentum(initialised_particles))
+        simulate_timestep(initialised_particles, config)
+        assert list(momentum(initialised_particles)) == pytest.approx(initial_momentum)
@@ -0,0 +1,50 @@
+import pytest
+from pathlib import Path
+
+from benchmarks.history import load_history, save_history, make_record, find_regressions
+from benchmarks.startup import loaded_modules, measure_import_time
+from benchmarks.suite import BENCHMARKS, get_benchmark_config, run_benchmarks
+
+
+class TestBenchmarks:
+    def test_every_benchmark_runs(self, config):
+        timings = run_benchmarks(config, (10,), repeats=1, report=lambda _: None)
+        assert len(timings) == sum( len(benchmark.densities) for benchmark in BENCHMARKS )
+        assert all( timing >= 0 for timing in timings.values() )
+
+    def test_benchmarks_respect_their_limits(self, config):
+        timings = run_benchmarks(config, (10, 20_000), repeats=1, names=["calculate_potential_energy_of_particles"], report=lambda _: None)
+        assert list(timings) == ["calculate_potential_energy_of_particles/sparse/10"]
+
+    def test_collision_heavy_setups_collide_more(self, config):
+        sparse, heavy = ( get_benchmark_config(config, 100, density) for density in ("sparse", "collision_heavy") )
+        assert heavy.collision_distance > 1e3 * sparse.collision_distance
+
+    def test_history_round_trip(self, tmp_path):
+        filename = str(tmp_path / "history.json")
+        assert load_history(filename) == list()
+        history = [make_record({ "a/sparse/10": 1.0 })]
+        save_history(filename, history)
+        assert load_history(filename) == history
+
+    @pytest.mark.parametrize("timing, flagged", [(1.1, False), (1.3, True), (0.5, False)])
+    def test_regressions_are_flagged_beyond_threshold(self, timing, flagged):
+        history = [{ "timings": { "a/sparse/10": 2.0 } }, { "timings": { "a/sparse/10": 1.0, "b/sparse/10": 1.0 } }]
+        regressions = find_regressions(history, { "a/sparse/10": timing, "c/sparse/10": 9.0 }, threshold=0.2)
+        assert ("a/sparse/10" in regressions) == flagged
+        assert "c/sparse/10" not in regressions #* Nothing to compare against yet.
+
+
+class TestStartup:
+    def test_headless_import_skips_matplotlib(self):
+        assert not any( module.startswith("matplotlib") for module in loaded_modules() )
+
+    def test_importing_reads_no_config(self, tmp_path, monkeypatch):
+        #* Without a `.config` folder to read, importing would fail if it read one.
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv("PYTHONPATH", str(Path(__file__).parents[1]))
+        assert "src.main" in loaded_modules()
+        assert not (tmp_path / "sim.log").exists()
+
+    def test_import_time_measured(self):
+        assert 0 < measure_import_time(repeats=1)
@@ -0,0 +1,92 @@
+from copy import copy
+
+import pytest
+from numpy import arange, array, cos, sin, linspace, ones, pi, sqrt, allclose
+
+from src.block_timesteps import simulate_block_timestep, get_block_levels
+from src.classes.particle_system import ParticleSystem
+from src.energy import calculate_total_energy_of_particles
+from src.hermite import calc_accelerations_and_jerks
+from src.motion_calcs import calc_accelerations, initialise_particles, simulate_timestep
+from src.collision_handler import get_pair_separations
+
+
+@pytest.fixture
+def block_config(config):
+    config.block_timesteps, config.dt = True, 0.05
+    return config
+
+
+@pytest.fixture
+def clustered_system():
+    """ A tight binary orbited at a distance by a ring of 16 particles. """
+    angles = linspace(0, 2*pi, 16, endpoint=False)
+    positions = [[.05, 0, 0], [-.05, 0, 0]] + [ [20*cos(angle), 20*sin(angle), 0] for angle in angles ]
+    velocities = [[0, sqrt(5), 0], [0, -sqrt(5), 0]] + [ [-.2*sin(angle), .2*cos(angle), 0] for angle in angles ]
+    return ParticleSystem(arange(18), ones(18), positions, velocities)
+
+
+def energy(system, config):
+    return calculate_total_energy_of_particles(system.to_particles(), config)
+
+
+class TestBlockTimesteps:
+    def test_jerks_match_finite_differences(self, particles, config):
+        system = ParticleSystem.from_particles(particles)
+        accelerations, jerks = calc_accelerations_and_jerks(system.masses, system.positions, system.velocities, config)
+        assert allclose(accelerations, calc_accelerations(system.masses, get_pair_separations(system), config), rtol=1e-10, atol=0)
+
+        h = 1e-6
+        later, _ = calc_accelerations_and_jerks(system.masses, system.positions + h*system.velocities, system.velocities, config)
+        earlier, _ = calc_accelerations_and_jerks(system.masses, system.positions - h*system.velocities, system.velocities, config)
+        assert allclose(jerks, (later - earlier) / (2*h), rtol=1e-4, atol=1e-12)
+
+    def test_close_particles_get_smaller_steps(self, clustered_system, block_config):
+        initialise_particles(clustered_system, block_config)
+        levels = get_block_levels(clustered_system.accelerations, clustered_system.jerks, block_config)
+        assert (levels[:2] > levels[2:].max()).all()
+
+    def test_fewer_force_evaluations_than_a_shared_step(self, clustered_system, block_config):
+        initialise_particles(clustered_system, block_config)
+        shared_system = ParticleSystem(clustered_system.ids, clustered_system.masses, clustered_system.positions, clustered_system.velocities, clustered_system.accelerations, clustered_system.jerks)
+        shared_config = copy(block_config)
+        #* Puts everyone on the binary's level, as a shared timestep would have to.
+        shared_config.block_levels = int(get_block_levels(clustered_system.accelerations, clustered_system.jerks, block_config).max())
+        shared_config.timestep_accuracy = 1e-12
+
+        initial_energy = energy(clustered_system, block_config)
+        block_evaluations = sum( simulate_block_timestep(clustered_system, block_config) for _ in range(20) )
+        shared_evaluations = sum( simulate_block_timestep(shared_system, shared_config) for _ in range(20) )
+
+        assert block_evaluations * 6 < shared_evaluations
+        block_error = abs(energy(clustered_system, block_config) / initial_energy - 1)
+        shared_error = abs(energy(shared_system, shared_config) / initial_energy - 1)
+        assert block_error < max(2*shared_error, 1e-8)
+
+    def test_simulate_timestep_uses_block_timesteps(self, particles, block_config):
+        block_config.dt = 0.001
+        initialise_particles(particles, block_config)
+        system = ParticleSystem.from_particles(particles)
+        simulate_timestep(particles, block_config)
+        simulate_block_timestep(system, block_config)
+        assert allclose(array([ ptcl.position for ptcl in particles ]), system.positions, rtol=0, atol=0)
+
+    def test_lists_keep_their_jerks_between_timesteps(self, clustered_system, block_config):
+        particles = clustered_system.to_particles()
+        initialise_particles(clustered_system, block_config)
+        initialise_particles(particles, block_config)
+        for _ in range(5):
+            simulate_timestep(clustered_system, block_config)
+            simulate_timestep(particles, block_config)
+        assert allclose(array([ ptcl.position for ptcl in particles ]), clustered_system.positions, rtol=0, atol=0)
+        assert allclose(array([ ptcl.jerk for ptcl in particles ]), clustered_system.jerks, rtol=0, atol=0)
+
+    def test_collisions_are_handled_in_sync(self, block_config):
+        block_config.collision_distance = .1
+        system = ParticleSystem([0, 1, 2], [1, 1, 1], [[-1, 0, 0], [1, 0, 0], [0, 50, 0]], [[19.5, 0, 0], [-19.5, 0, 0], [0, 0, 0]])
+        initialise_particles(system, block_config)
+        simulate_block_timestep(system, block_config) #* The first two end the step within collision distance.
+
+        assert list(system.ids) == [0, 2]
+        accelerations, jerks = calc_accelerations_and_jerks(system.masses, system.positions, system.velocities, block_config)
+        assert allclose(system.accelerations, accelerations) and allclose(system.jerks, jerks)
@@ -0,0 +1,92 @@
+import pytest
+from numpy import array_equal
+
+from src.classes.particle_system import ParticleSystem
+from src.checkpoint import save_checkpoint, load_checkpoint, load_checkpoint_log_rate, config_fingerprint
+from src.main import run_timesteps
+from src.motion_calcs import initialise_particles
+from src.plotter import log_positions
+from src.trajectory import TrajectoryWriter, TrajectoryReader
+
+
+@pytest.fixture
+def checkpoint_config(config, tmp_path):
+    config.checkpoint_path = str(tmp_path / "checkpoint.npz")
+    config.simple_log_rate = 5
+    return config
+
+
+class TestCheckpoint:
+    def test_round_trip_preserves_state(self, initialised_particles, checkpoint_config):
+        system = ParticleSystem.from_particles(initialised_particles)
+        save_checkpoint(checkpoint_config.checkpoint_path, system, 12, 3, checkpoint_config)
+        loaded, step, frame = load_checkpoint(checkpoint_config.checkpoint_path, checkpoint_config)
+        assert (step, frame) == (12, 3)
+        for name in ("ids", "masses", "positions", "velocities", "accelerations", "jerks"):
+            assert array_equal(getattr(loaded, name), getattr(system, name))
+
+    def test_changed_settings_are_rejected(self, initialised_particles, checkpoint_config):
+        save_checkpoint(checkpoint_config.checkpoint_path, ParticleSystem.from_particles(initialised_particles), 1, 0, checkpoint_config)
+        checkpoint_config.G *= 2
+        with pytest.raises(ValueError):
+            load_checkpoint(checkpoint_config.checkpoint_path, checkpoint_config)
+
+    def test_fingerprint_ignores_run_length_and_display(self, config):
+        fingerprint = config_fingerprint(config)
+        config.timesteps, config.workers = 10*config.timesteps, 4
+        assert config_fingerprint(config) == fingerprint
+
+    @pytest.mark.parametrize("name, value", [("stop_at_single_survivor", False), ("escape_radius", 100.), ("escape_action", "stop")])
+    def test_fingerprint_covers_event_settings(self, config, name, value):
+        fingerprint = config_fingerprint(config)
+        setattr(config, name, value)
+        assert config_fingerprint(config) != fingerprint
+
+    def test_resumed_run_matches_uninterrupted_run(self, particles, checkpoint_config):
+        checkpoint_config.timesteps = 40
+        uninterrupted = ParticleSystem.from_particles(particles)
+        initialise_particles(uninterrupted, checkpoint_config)
+        uninterrupted_logs = run_timesteps(uninterrupted, { ptcl.id: list() for ptcl in particles }, checkpoint_config)
+
+        #* Runs until step 20 with checkpoints, then 'crashes' and resumes from the latest one.
+        checkpoint_config.checkpoint_interval, checkpoint_config.timesteps = 10, 19
+        interrupted = ParticleSystem.from_particles(particles)
+        initialise_particles(interrupted, checkpoint_config)
+        run_timesteps(interrupted, { ptcl.id: list() for ptcl in particles }, checkpoint_config)
+
+        checkpoint_config.timesteps = 40
+        resumed, step, _ = load_checkpoint(checkpoint_config.checkpoint_path, checkpoint_config)
+        assert step == 20
+        resumed_logs = run_timesteps(resumed, { ptcl.id: list() for ptcl in particles }, checkpoint_config, step)
+
+        assert array_equal(resumed.positions, uninterrupted.positions)
+        assert array_equal(resumed.velocities, uninterrupted.velocities)
+        for id, positions in resumed_logs.items():
+            assert array_equal(positions, uninterrupted_logs[id][-len(positions):])
+
+    def test_extended_run_matches_longer_run(self, particles, checkpoint_config, tmp_path):
+        ids = [ptcl.id for ptcl in particles]
+        checkpoint_config.timesteps = 40
+        longer = ParticleSystem.from_particles(particles)
+        initialise_particles(longer, checkpoint_config)
+        writer = log_positions(longer, TrajectoryWriter(tmp_path / "longer", ids, 40 // 5 + 2))
+        run_timesteps(longer, writer, checkpoint_config).close()
+
+        #* Runs to step 20, then is extended to step 40, which on its own would log at a different rate.
+        checkpoint_config.checkpoint_interval, checkpoint_config.timesteps = 10, 19
+        extended = ParticleSystem.from_particles(particles)
+        initialise_particles(extended, checkpoint_config)
+        writer = log_positions(extended, TrajectoryWriter(tmp_path / "extended", ids, 19 // 5 + 2))
+        run_timesteps(extended, writer, checkpoint_config).close()
+
+        checkpoint_config.timesteps, checkpoint_config.simple_log_rate = 40, 10
+        extended, step, frame = load_checkpoint(checkpoint_config.checkpoint_path, checkpoint_config)
+        log_rate = load_checkpoint_log_rate(checkpoint_config.checkpoint_path)
+        assert log_rate == 5
+        writer = TrajectoryWriter(tmp_path / "extended", ids, frame + (40 - step) // log_rate + 2, start_frame=frame)
+        run_timesteps(extended, writer, checkpoint_config, step, log_rate=log_rate).close()
+
+        longer_log, extended_log = TrajectoryReader(tmp_path / "longer"), TrajectoryReader(tmp_path / "extended")
+        assert array_equal(extended.positions, longer.positions)
+        for id in ids:
+            assert array_equal(extended_log[id], longer_log[id])
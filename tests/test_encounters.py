@@ -0,0 +1,100 @@
+from warnings import catch_warnings, simplefilter
+
+import pytest
+from numpy import arange, array_equal, zeros
+
+from src.classes.particle_system import ParticleSystem
+from src.collision_handler import get_pair_separations
+from src.encounters import calc_group_accelerations, find_encounter_groups, get_encounter_substeps
+from src.energy import get_diagnostics
+from src.motion_calcs import calc_accelerations, initialise_particles, simulate_timestep
+
+
+def binary_system() -> ParticleSystem:
+    """ Returns a tight, circular binary of two unit masses, orbited from afar by a light third particle. """
+    speed = .5 * 2**.5 #* Circular for a separation of 1, with G = 1.
+    return ParticleSystem(
+        arange(3), [1, 1, 1e-2],
+        [[-.5, 0, 0], [.5, 0, 0], [20, 0, 0]],
+        [[0, -speed, 0], [0, speed, 0], [0, .3, 0]],
+    )
+
+
+def energy_error(config, steps: int) -> float:
+    system = binary_system()
+    initialise_particles(system, config)
+    initial = get_diagnostics(system, config).total
+    for _ in range(steps):
+        simulate_timestep(system, config)
+    return abs(get_diagnostics(system, config).total / initial - 1)
+
+
+class TestFindEncounterGroups:
+    def test_groups_close_particles(self, config):
+        config.encounter_distance = 2
+        groups = find_encounter_groups(binary_system(), config)
+        assert len(groups) == 1
+        assert array_equal(groups[0], [0, 1])
+
+    def test_chains_pairs_into_groups(self, config):
+        config.encounter_distance = 1.5
+        system = ParticleSystem(arange(4), [1]*4, [[0, 0, 0], [1, 0, 0], [2, 0, 0], [10, 0, 0]], zeros((4, 3)))
+        groups = find_encounter_groups(system, config)
+        assert [group.tolist() for group in groups] == [[0, 1, 2]]
+
+    def test_finds_nothing_when_far_apart(self, config):
+        config.encounter_distance = .5
+        assert find_encounter_groups(binary_system(), config) == []
+
+
+class TestSubCycling:
+    def test_group_accelerations_match_direct_sum(self, config):
+        system = binary_system()
+        expected = calc_accelerations(system.masses, get_pair_separations(system), config)
+        assert calc_group_accelerations(system.masses, system.positions, config) == pytest.approx(expected, rel=1e-12)
+
+    def test_substeps_are_capped(self, config):
+        system = binary_system()
+        config.G, config.dt = 1, .3
+        assert 1 < get_encounter_substeps(system.masses[:2], system.positions[:2], system.velocities[:2], config) <= config.encounter_substeps
+        config.encounter_substeps = 4
+        assert get_encounter_substeps(system.masses[:2], system.positions[:2], system.velocities[:2], config) == 4
+
+    def test_coincident_particles_get_most_substeps(self, config):
+        config.collision_distance = 0
+        system = binary_system()
+        system.positions[1], system.velocities[1] = system.positions[0], system.velocities[0]
+        with catch_warnings():
+            simplefilter("error")
+            assert get_encounter_substeps(system.masses, system.positions, system.velocities, config) == config.encounter_substeps
+
+    def test_without_encounters_matches_verlet(self, config):
+        config.G, config.dt = 1, .1
+        plain, sub_cycled = binary_system(), binary_system()
+        initialise_particles(plain, config)
+        initialise_particles(sub_cycled, config)
+        for _ in range(10):
+            simulate_timestep(plain, config)
+        config.encounter_distance = .5 #* Closer than any pair gets.
+        for _ in range(10):
+            simulate_timestep(sub_cycled, config)
+        assert array_equal(sub_cycled.positions, plain.positions)
+        assert array_equal(sub_cycled.velocities, plain.velocities)
+
+    def test_conserves_energy_at_large_timesteps(self, config):
+        config.G, config.dt, config.collision_distance = 1, .3, 1e-3
+        plain = energy_error(config, 300)
+        config.encounter_distance = 3
+        sub_cycled = energy_error(config, 300)
+        assert sub_cycled < 1e-6
+        assert sub_cycled < plain / 100
+
+    def test_merges_colliding_encounters(self, config):
+        config.G, config.dt, config.collision_distance, config.encounter_distance = 1, .1, .1, 2
+        system = ParticleSystem(arange(3), [1, 1, 1e-2], [[-.5, 0, 0], [.5, 0, 0], [20, 0, 0]], zeros((3, 3))) #* Falls straight together.
+        initialise_particles(system, config)
+        momentum = system.momenta().sum(axis=0)
+        for _ in range(20):
+            simulate_timestep(system, config)
+        assert len(system) == 2
+        assert system.momenta().sum(axis=0) == pytest.approx(momentum, abs=1e-9)
@@ -1,9 +1,18 @@
 import pytest
 from copy import deepcopy
+from warnings import catch_warnings, simplefilter
+from numpy import allclose, cross, float64, zeros
 from numpy.linalg import norm
 
-from src.energy import calculate_kinetic_energy_of_particles, calculate_potential_energy_of_particles, calculate_total_energy_of_particles
+import src.energy
+from src.classes.particle_system import ParticleSystem
+from src.energy import (
+    calculate_kinetic_energy_of_particles, calculate_potential_energy_of_particles, calculate_total_energy_of_particles,
+    calc_potential_energy, get_diagnostics, ConservationMonitor, Diagnostics,
+)
 from src.motion_calcs import simulate_timestep
+from src.permutations import ordered_pairs_permutations
+from src.profiling import StepRecord, observing
 
 
 @pytest.fixture
@@ -55,6 +64,43 @@ class TestEnergy:
     def test_energy_conservation_after_1000_timestep(self, assert_energy_conservation_after_n_timesteps):
         assert_energy_conservation_after_n_timesteps(1000, 1e-4)
 
+    def test_tiled_potential_matches_pairwise_sum(self, particles, config, monkeypatch):
+        expected = -sum( config.G * x.mass * y.mass / norm(x.position - y.position) for x, y in ordered_pairs_permutations(particles) )
+        system = ParticleSystem.from_particles(particles)
+        monkeypatch.setattr(src.energy, "PAIRS_PER_TILE", 2 * len(particles)) #* Forces several tiles, including a single-row one.
+        assert calc_potential_energy(system.masses, system.positions, config) == pytest.approx(expected, rel=1e-12)
+
+    def test_force_pass_potential_matches_tiled_potential(self, initialised_particles, config):
+        config.energy_diagnostics = True
+        system = ParticleSystem.from_particles(initialised_particles)
+        simulate_timestep(system, config)
+        assert system.potential_energy == pytest.approx(calc_potential_energy(system.masses, system.positions, config), rel=1e-12)
+
+    def test_diagnostics(self, initialised_particles, config):
+        system = ParticleSystem.from_particles(initialised_particles)
+        diagnostics = get_diagnostics(system, config)
+        assert diagnostics.total == pytest.approx(calculate_total_energy_of_particles(initialised_particles, config), rel=1e-12)
+        assert allclose(diagnostics.momentum, sum( ptcl.mass * ptcl.velocity for ptcl in initialised_particles ))
+        assert allclose(diagnostics.angular_momentum, sum( cross(ptcl.position, ptcl.mass * ptcl.velocity) for ptcl in initialised_particles ))
+
+    def test_conservation_is_monitored_every_step(self, initialised_particles, config):
+        config.energy_diagnostics = True
+        system = ParticleSystem.from_particles(initialised_particles)
+        with observing(ConservationMonitor(get_diagnostics(system, config))) as monitor:
+            for _ in range(100):
+                simulate_timestep(system, config)
+        if len(system) == len(initialised_particles):
+            assert monitor.energy_drift < 1e-4
+        assert monitor.momentum_drift <= 1e-6 * norm(monitor.initial.momentum) + 1e-6 #* Even through collisions.
+
+    def test_drift_is_finite_for_marginally_bound_start(self):
+        at_rest = zeros(3)
+        monitor = ConservationMonitor(Diagnostics(float64(2.), float64(-2.), at_rest, at_rest))
+        with catch_warnings():
+            simplefilter("error")
+            monitor.on_step(StepRecord(dict(), 0, 2, Diagnostics(float64(2.002), float64(-2.), at_rest, at_rest)))
+        assert monitor.energy_drift == pytest.approx(.002 / 4)
+
 
 if __name__ == "__main__":
     ...
\ No newline at end of file
@@ -0,0 +1,66 @@
+from copy import copy
+
+import pytest
+from numpy import allclose
+
+from src.classes.particle_system import ParticleSystem
+from src.ensemble import Ensemble, get_member_configs, initialise_ensemble, simulate_ensemble_timestep, summarise_ensemble
+from src.motion_calcs import initialise_particles, simulate_timestep
+
+
+@pytest.fixture
+def member_configs(config):
+    return get_member_configs(config, { "G": [0.5, 1, 2] })
+
+
+class TestEnsemble:
+    def test_members_match_individual_runs(self, particles, member_configs):
+        #* Members differ in size, so the smaller ones are padded.
+        member_particles = [ particles[:n] for n in (len(particles), 2, len(particles) - 1) ]
+        ensemble = Ensemble([ ParticleSystem.from_particles(ptcls) for ptcls in member_particles ], member_configs)
+        initialise_ensemble(ensemble)
+        for _ in range(20):
+            simulate_ensemble_timestep(ensemble)
+
+        for member, (ptcls, member_config) in enumerate(zip(member_particles, member_configs)):
+            system = ParticleSystem.from_particles(ptcls)
+            initialise_particles(system, member_config)
+            for _ in range(20):
+                simulate_timestep(system, member_config)
+            batched = ensemble.member(member)
+            assert (batched.ids == system.ids).all()
+            assert allclose(batched.positions, system.positions, rtol=1e-10, atol=0)
+            assert allclose(batched.velocities, system.velocities, rtol=1e-10, atol=0)
+
+    def test_collisions_only_affect_their_own_member(self, particles, config):
+        close_config = copy(config)
+        close_config.collision_distance = 1e7 #* Everything collides into one particle.
+        systems = [ ParticleSystem.from_particles(particles) for _ in range(2) ]
+        ensemble = Ensemble(systems, [config, close_config])
+        initialise_ensemble(ensemble)
+        simulate_ensemble_timestep(ensemble)
+
+        summary = summarise_ensemble(ensemble)
+        assert [ row["survivors"] for row in summary ] == [len(particles), 1]
+        assert ensemble.masses[1].sum() == pytest.approx(sum(ptcl.mass for ptcl in particles))
+        assert (ensemble.velocities[1][~ensemble.alive[1]] == 0).all()
+
+    def test_sweeps_cover_every_combination(self, config):
+        configs = get_member_configs(config, { "random_seed": [1, 2, 3], "max_speed": [1., 5.] })
+        assert len(configs) == 6
+        assert { (cfg.random_seed, cfg.max_speed) for cfg in configs } == { (s, v) for s in (1, 2, 3) for v in (1., 5.) }
+        assert config.random_seed == 1 and config.max_speed == 1
+
+    @pytest.mark.parametrize("setting, value", [
+        ("integrator", "yoshida4"), ("block_timesteps", True), ("force_engine", "barnes_hut"), ("encounter_distance", 1.), ("number_of_tracers", 10),
+    ])
+    def test_rejects_unsupported_settings(self, particles, config, setting, value):
+        setattr(config, setting, value)
+        with pytest.raises(ValueError):
+            Ensemble([ParticleSystem.from_particles(particles)], [config])
+
+    def test_rejects_systems_with_tracers(self, particles, config):
+        system = ParticleSystem.from_particles(particles)
+        system.tracers = ParticleSystem([100], [0], [[0, 0, 0]], [[0, 0, 0]])
+        with pytest.raises(ValueError):
+            Ensemble([system], [config])
@@ -0,0 +1,116 @@
+import json
+
+import pytest
+from numpy import arange, array_equal, zeros
+
+from src.classes.particle_system import ParticleSystem
+from src.events import EventMonitor, Escape, SingleSurvivor, WallClockBudget, find_escapers, get_configured_events
+from src.main import run_timesteps
+from src.motion_calcs import initialise_particles
+
+
+def escaping_system(escape_speed: float) -> ParticleSystem:
+    """ Returns a bound pair at the origin, and a light particle far from it moving outwards at `escape_speed`. """
+    return ParticleSystem(
+        arange(3), [100, 100, 1e-3],
+        [[-1, 0, 0], [1, 0, 0], [1_000, 0, 0]],
+        [[0, -5, 0], [0, 5, 0], [escape_speed, 0, 0]],
+    )
+
+
+class TestFindEscapers:
+    def test_finds_unbound_particle_beyond_radius(self, config):
+        #* Escape speed at 1000 from a mass of 200 with G = 1 is sqrt(2*200/1000) ~= 0.63.
+        system = escaping_system(1.)
+        assert array_equal(find_escapers(system, system.positions, system.velocities, 100, config), [2])
+
+    def test_ignores_bound_particle_beyond_radius(self, config):
+        system = escaping_system(.5)
+        assert not len(find_escapers(system, system.positions, system.velocities, 100, config))
+
+    def test_ignores_unbound_particle_within_radius(self, config):
+        system = escaping_system(1.)
+        assert not len(find_escapers(system, system.positions, system.velocities, 2_000, config))
+
+    def test_blocks_match_single_pass(self, config, monkeypatch):
+        system = escaping_system(1.)
+        system.positions[:2] *= 500 #* Every particle is now a candidate.
+        single = find_escapers(system, system.positions, system.velocities, 1, config)
+        monkeypatch.setattr("src.events.PAIRS_PER_BLOCK", 1)
+        assert array_equal(find_escapers(system, system.positions, system.velocities, 1, config), single)
+
+    def test_finds_escaping_tracers(self, config):
+        system = escaping_system(1.)
+        system.tracers = ParticleSystem([3, 4], zeros(2), [[0, 500, 0], [0, 5_000, 0]], [[0, 2, 0], [0, .1, 0]])
+        triggered = Escape(100, "cull").check(system, config)
+        assert array_equal(triggered[0], [2])
+        assert array_equal(triggered[1], [0])
+
+
+class TestEvents:
+    def test_single_survivor_stops_run(self, config):
+        system = ParticleSystem([0], [1], [[0, 0, 0]], [[0, 0, 0]])
+        assert SingleSurvivor().check(system, config) is not None
+
+    def test_single_survivor_waits_for_tracers(self, config):
+        system = ParticleSystem([0], [1], [[0, 0, 0]], [[0, 0, 0]])
+        system.tracers = ParticleSystem([1], [0], [[5, 0, 0]], [[0, 1, 0]])
+        assert SingleSurvivor().check(system, config) is None
+
+    def test_wall_clock_budget_stops_run(self, config):
+        system = escaping_system(1.)
+        assert WallClockBudget(1e-9).check(system, config) is not None
+        assert WallClockBudget(1e9).check(system, config) is None
+
+    def test_configured_events(self, config):
+        assert [event.name for event in get_configured_events(config)] == ["single_survivor"]
+        config.escape_radius, config.wall_clock_budget = 100, 10
+        assert [event.name for event in get_configured_events(config)] == ["escape", "single_survivor", "wall_clock_budget"]
+
+
+class TestEventMonitor:
+    def test_culls_and_records_escapers(self, config, tmp_path):
+        system = escaping_system(1.)
+        initialise_particles(system, config)
+        monitor = EventMonitor([Escape(100, "cull"), SingleSurvivor()], tmp_path / "events.jsonl")
+
+        assert not monitor.check(system, 7, config)
+        monitor.close()
+        assert array_equal(system.ids, [0, 1])
+        assert system.accelerations[:, 0] == pytest.approx([100/4, -100/4]) #* Recalculated without the escaper.
+
+        with open(tmp_path / "events.jsonl") as file:
+            record = json.loads(file.readline())
+        assert (record["step"], record["event"], record["action"]) == (7, "escape", "cull")
+        assert record["particles"][0]["id"] == 2
+        assert record["particles"][0]["position"] == [1_000, 0, 0]
+
+    def test_culling_leaves_collisions_to_the_timestep(self, config):
+        system = escaping_system(1.)
+        system.tracers = ParticleSystem([3], zeros(1), [[-1, 1e-3, 0]], [[0, 0, 0]])
+        initialise_particles(system, config)
+        config.collision_distance = 3 #* The bound pair and the tracer are now all touching.
+        EventMonitor([Escape(100, "cull")]).check(system, 0, config)
+        assert array_equal(system.ids, [0, 1])
+        assert array_equal(system.tracers.ids, [3])
+
+    def test_stopping_event_ends_run_early(self, config):
+        config.timesteps, config.simple_log_rate = 100, 7
+        system = ParticleSystem([0, 1], [1, 1], [[0, 0, 0], [1e-5, 0, 0]], [[0, 0, 0], [0, 0, 0]]) #* Will merge straight away.
+        initialise_particles(system, config)
+        monitor = EventMonitor([SingleSurvivor()])
+
+        logs = run_timesteps(system, { id: list() for id in (0, 1) }, config, events=monitor)
+        assert monitor.stopped_by.name == "single_survivor"
+        assert monitor.records[-1]["step"] == 0
+        assert sum( len(positions) for positions in logs.values() ) == 1 #* Only the survivor's final position is logged.
+        assert monitor.deterministic
+
+    def test_wall_clock_stop_is_not_deterministic(self, config):
+        config.timesteps = 10
+        system = escaping_system(1.)
+        initialise_particles(system, config)
+        monitor = EventMonitor([WallClockBudget(1e-9)])
+        run_timesteps(system, { id: list() for id in range(3) }, config, events=monitor)
+        assert not monitor.deterministic
+        assert "wall_clock_budget" in monitor.summary()
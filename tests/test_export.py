@@ -0,0 +1,80 @@
+import pytest
+from numpy import allclose, array, array_equal, ones, zeros
+from PIL import Image
+
+from src.export import export_animation, get_marker_sizes, get_trail_segments, get_trajectory_bounds
+from src.motion_calcs import initialise_particles, simulate_timestep
+from src.particle_setup import get_configured_system
+from src.trajectory import TrajectoryReader, TrajectoryWriter
+
+
+@pytest.fixture
+def trajectory(config, tmp_path):
+    system = get_configured_system(config)
+    initialise_particles(system, config)
+    writer = TrajectoryWriter(tmp_path / "trajectory", system.ids, 12)
+    for frame in range(12):
+        writer.write(system)
+        for _ in range(10):
+            simulate_timestep(system, config)
+        if frame == 6:
+            system.remove([len(system) - 1]) #* Stands in for a collision absorbing a particle.
+    writer.close()
+    return tmp_path / "trajectory"
+
+
+class TestTrajectoryBounds:
+    def test_chunks_match_whole_trajectory(self, trajectory, monkeypatch):
+        reader = TrajectoryReader(trajectory)
+        alive_positions = reader.positions[:reader.frames][reader.alive[:reader.frames]]
+        monkeypatch.setattr("src.export.BOUNDS_CHUNK_FRAMES", 5)
+        low, high = get_trajectory_bounds(reader)
+        assert array_equal(low, alive_positions.min(axis=0))
+        assert array_equal(high, alive_positions.max(axis=0))
+
+
+class TestTrailSegments:
+    def test_segments_join_consecutive_frames(self):
+        positions = array([ [[frame, 0, 0], [0, frame, 0]] for frame in range(5) ], dtype=float)
+        segments, slots, ages = get_trail_segments(positions, ones((5, 2), dtype=bool), 4, 2)
+        assert len(segments) == 4
+        assert array_equal(slots, [0, 1, 0, 1])
+        assert allclose(ages, [.5, .5, 0, 0])
+        assert array_equal(segments[2], [[3, 0, 0], [4, 0, 0]])
+
+    def test_absorbed_particles_trail_stops(self):
+        alive = ones((5, 2), dtype=bool)
+        alive[3:, 1] = False
+        _, slots, _ = get_trail_segments(zeros((5, 2, 3)), alive, 4, 10)
+        assert (slots == 1).sum() == 2
+
+    def test_first_frame_has_no_trail(self):
+        assert len(get_trail_segments(zeros((5, 2, 3)), ones((5, 2), dtype=bool), 0, 10)[0]) == 0
+
+
+class TestMarkerSizes:
+    def test_area_scales_with_mass_to_two_thirds(self):
+        assert allclose(get_marker_sizes(array([1., 8.]), 1., 6), [6, 24])
+
+    def test_tracers_stay_visible(self):
+        assert get_marker_sizes(array([0.]), 1., 6)[0] > 0
+
+
+class TestExportAnimation:
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_gif_has_every_frame(self, trajectory, tmp_path, workers):
+        output = tmp_path / "animation.gif"
+        frames = export_animation(trajectory, str(output), fps=10, trail=3, resolution=(160, 120), workers=workers)
+        assert frames == 12
+        with Image.open(output) as gif:
+            assert gif.size == (160, 120)
+            #* Identical consecutive frames are merged into one longer one, so the total duration is what counts.
+            durations = list()
+            for frame in range(gif.n_frames):
+                gif.seek(frame)
+                durations.append(gif.info["duration"])
+        assert sum(durations) == 12 * 100
+
+    def test_unknown_format(self, trajectory, tmp_path):
+        with pytest.raises(ValueError):
+            export_animation(trajectory, str(tmp_path / "animation.avi"), fps=10, trail=3, resolution=(160, 120))
@@ -0,0 +1,66 @@
+import pytest
+from numpy import allclose, array, log2
+
+from src.classes.particle_system import ParticleSystem
+from src.energy import calculate_total_energy_of_particles
+from src.motion_calcs import INTEGRATORS, initialise_particles, simulate_timestep, verlet_timestep
+from benchmarks.integrators import compare_integrators
+
+
+def binary():
+    """ Two equal masses in an eccentric orbit. """
+    return ParticleSystem([0, 1], [1, 1], [[1, 0, 0], [-1, 0, 0]], [[0, .3, 0], [0, -.3, 0]])
+
+
+def energy_error(config, integrator: str, dt: float) -> float:
+    config.integrator, config.dt, config.half_dtsq = integrator, dt, .5*dt**2
+    system = binary()
+    initialise_particles(system, config)
+    initial_energy = calculate_total_energy_of_particles(system.to_particles(), config)
+    for _ in range(round(2 / dt)):
+        simulate_timestep(system, config)
+    return abs(calculate_total_energy_of_particles(system.to_particles(), config) / initial_energy - 1)
+
+
+class TestIntegrators:
+    @pytest.mark.parametrize("integrator, order", [("verlet", 2), ("yoshida4", 4), ("hermite4", 4)])
+    def test_order_of_accuracy(self, config, integrator, order):
+        coarse, fine = energy_error(config, integrator, .01), energy_error(config, integrator, .005)
+        assert log2(coarse / fine) == pytest.approx(order, abs=.5)
+
+    def test_higher_orders_are_more_accurate_for_the_same_dt(self, config):
+        errors = { integrator: energy_error(config, integrator, .01) for integrator in INTEGRATORS }
+        assert errors["yoshida4"] < errors["verlet"] / 100
+        assert errors["hermite4"] < errors["verlet"] / 100
+
+    def test_verlet_is_unchanged(self, initialised_particles, config):
+        system = ParticleSystem.from_particles(initialised_particles)
+        simulate_timestep(initialised_particles, config)
+        verlet_timestep(system, config)
+        assert allclose(array([ ptcl.position for ptcl in initialised_particles ]), system.positions, rtol=0, atol=0)
+
+    def test_hermite_matches_on_a_list(self, config):
+        config.integrator, config.dt, config.half_dtsq = "hermite4", .05, .5*.05**2
+        system = ParticleSystem([0, 1, 2], [1, 1, .5], [[1, 0, 0], [-1, 0, 0], [0, 3, 0]], [[0, .3, 0], [0, -.3, 0], [.4, 0, 0]])
+        particles = system.to_particles()
+        initialise_particles(system, config)
+        initialise_particles(particles, config)
+        for _ in range(50):
+            simulate_timestep(system, config)
+            simulate_timestep(particles, config)
+        assert allclose(array([ ptcl.position for ptcl in particles ]), system.positions, rtol=0, atol=0)
+
+    @pytest.mark.parametrize("integrator", ["yoshida4", "hermite4"])
+    def test_collisions_conserve_momentum(self, particles, config, integrator):
+        config.integrator, config.collision_distance = integrator, 1e7
+        system = ParticleSystem.from_particles(particles)
+        momentum = system.momenta().sum(axis=0)
+        initialise_particles(system, config)
+        simulate_timestep(system, config)
+        assert len(system) == 1
+        assert allclose(system.momenta().sum(axis=0), momentum, rtol=1e-9)
+
+    def test_comparison_covers_every_integrator(self, config):
+        results = compare_integrators(config, (.01,), duration=.05)
+        assert [ row["integrator"] for row in results ] == list(INTEGRATORS)
+        assert all( row["steps"] == 5 for row in results )
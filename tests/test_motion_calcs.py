@@ -1,8 +1,14 @@
 import pytest
 from copy import deepcopy
 from numpy.linalg import norm 
+from numpy import array_equal
+from numpy.random import default_rng
 
 from src.classes.particle import Particle
+from src.classes.particle_system import ParticleSystem
+from src.classes.cell_list import CellList
+from src.collision_handler import collision_pairs_finder, collided_id_grouper, collision_handler, handle_collisions
+from src.permutations import ordered_pairs_permutations
 from src.particle_setup import get_configured_particles
 from src.motion_calcs import initialise_particles, simulate_timestep
 
@@ -113,25 +119,96 @@ class TestSimulateTimestep:
 
 
 class TestCollisionPairsFinder:
-    def test_qualifying_distances_are_identified(self, particles, config):
-
-        ...
-
-    def test_each_list_element_is_two_item_set(self):
-        ...
-
-    def test_each_pair_is_unique(self):
-        ...
-
+    @pytest.mark.parametrize("config", [
+        {"collision_distance": 1, "max_distance": 5, "number_of_particles": 60},
+        {"collision_distance": 3, "max_distance": 20, "number_of_particles": 200},
+        {"collision_distance": 50, "max_distance": 10, "number_of_particles": 30},
+    ], indirect=True)
+    def test_qualifying_distances_are_identified(self, config):
+        system = ParticleSystem.from_particles(get_configured_particles(config))
+        expected = [
+            {x.id, y.id} for x, y in ordered_pairs_permutations(system.to_particles())
+            if norm(x.position - y.position) <= config.collision_distance
+        ]
+        assert collision_pairs_finder(system, config) == expected
+
+    def test_each_list_element_is_two_item_set(self, particles, config):
+        config.collision_distance = 1e7
+        collision_pairs = collision_pairs_finder(ParticleSystem.from_particles(particles), config)
+        assert collision_pairs
+        assert all(isinstance(pair, set) and len(pair) == 2 for pair in collision_pairs)
+
+    def test_each_pair_is_unique(self, particles, config):
+        config.collision_distance = 1e7
+        collision_pairs = collision_pairs_finder(ParticleSystem.from_particles(particles), config)
+        assert len({frozenset(pair) for pair in collision_pairs}) == len(collision_pairs)
+
+
+def naive_grouper(id_collection):
+    """ Reference grouping: repeatedly merges any two intersecting groups until none remain. """
+    groups = [set(pair) for pair in id_collection]
+    merged = True
+    while merged:
+        merged = False
+        for group1, group2 in ordered_pairs_permutations(groups):
+            if group1 & group2:
+                group1 |= group2
+                groups.remove(group2)
+                merged = True
+                break
+    return groups
 
 
 class TestCollidedIdGrouper:
-    pass
+    def test_deep_dive_example(self):
+        id_pairs = [{15, 7}, {8, 4}, {9, 3}, {1, 2}, {2, 6}, {8, 15}, {5, 14}]
+        assert collided_id_grouper(id_pairs) == [{15, 7, 8, 4}, {9, 3}, {1, 2, 6}, {5, 14}]
+
+    @pytest.mark.parametrize("seed", [1, 2, 3])
+    def test_matches_naive_grouping(self, seed):
+        rng = default_rng(seed)
+        id_pairs = [ set(rng.choice(60, 2, replace=False).tolist()) for _ in range(40) ]
+        assert collided_id_grouper(id_pairs) == naive_grouper(id_pairs)
+
+    def test_thousands_of_chained_pairs(self):
+        """ Shuffled chain 0-1-2-...-n, interleaved with isolated pairs, as in a collapsing dense cluster. """
+        n = 5_000
+        rng = default_rng(0)
+        chain = [ {i, i + 1} for i in range(n) ]
+        isolated = [ {-2*i - 1, -2*i - 2} for i in range(n) ]
+        id_pairs = chain + isolated
+        rng.shuffle(id_pairs)
+
+        groups = collided_id_grouper(id_pairs)
+        assert len(groups) == n + 1
+        assert set(range(n + 1)) in groups
+        assert sum(len(group) for group in groups) == 3*n + 1
 
 
 class TestCollisionHandler:
-    pass
-
-
-class TestGetDisplacementAndDistancesFromOrderedPairs:
-    pass
+    @pytest.mark.parametrize("config", [
+        {"collision_distance": 3, "max_distance": 20, "number_of_particles": 200},
+        {"collision_distance": 10, "max_distance": 20, "number_of_particles": 100},
+    ], indirect=True)
+    def test_incremental_recheck_matches_full_recheck(self, config):
+        incremental = ParticleSystem.from_particles(get_configured_particles(config))
+        handle_collisions(incremental, config)
+
+        full = ParticleSystem.from_particles(get_configured_particles(config))
+        while collision_pairs := collision_pairs_finder(full, config):
+            collision_handler(full, collision_pairs)
+
+        assert list(incremental.ids) == list(full.ids)
+        assert array_equal(incremental.positions, full.positions)
+        assert array_equal(incremental.velocities, full.velocities)
+
+    @pytest.mark.parametrize("config", [{"collision_distance": 4, "max_distance": 20, "number_of_particles": 150}], indirect=True)
+    def test_patched_cell_list_matches_rebuilt_one(self, config):
+        system = ParticleSystem.from_particles(get_configured_particles(config))
+        cell_list = CellList(system.positions, config.collision_distance)
+        merged, removed = collision_handler(system, collision_pairs_finder(system, config, cell_list))
+        cell_list.update(system.positions, merged, removed)
+
+        rebuilt = CellList(system.positions, config.collision_distance)
+        for patched_rows, rebuilt_rows in zip(cell_list.neighbouring_pairs(), rebuilt.neighbouring_pairs()):
+            assert array_equal(patched_rows, rebuilt_rows)
@@ -0,0 +1,102 @@
+from threading import Event, Thread
+from warnings import catch_warnings, simplefilter
+
+import pytest
+from numpy import arange, array_equal, zeros
+from numpy.random import default_rng
+
+from src.classes.particle_system import ParticleSystem
+from src.collision_handler import collision_pairs_finder, get_pair_separations
+from src.motion_calcs import calc_accelerations, calc_and_update_accel, initialise_particles, simulate_timestep
+from src.barnes_hut import calc_barnes_hut_accelerations
+from src.parallel import worker_pool_for, close_worker_pool, calc_row_block_accelerations
+
+
+@pytest.fixture
+def make_system():
+    def make(n: int = 300, seed: int = 0) -> ParticleSystem:
+        rng = default_rng(seed)
+        return ParticleSystem(arange(n), 1 + 99*rng.random(n), rng.uniform(-20, 20, (n, 3)), rng.normal(size=(n, 3)))
+    return make
+
+
+@pytest.fixture
+def parallel_config(config):
+    config.workers = 2
+    yield config
+    close_worker_pool()
+
+
+class TestRowBlocks:
+    def test_row_blocks_match_serial_kernel_exactly(self, make_system, config):
+        system = make_system(50)
+        expected = calc_accelerations(system.masses, get_pair_separations(system), config)
+        blocked = zeros((len(system), 3))
+        for start, stop in [(0, 7), (7, 30), (30, 50)]:
+            calc_row_block_accelerations(system.masses, system.positions, config, blocked, start, stop)
+        assert array_equal(blocked, expected)
+
+    def test_memory_bounded_blocks_match_serial_kernel_exactly(self, make_system, config, monkeypatch):
+        system = make_system(50)
+        expected = calc_accelerations(system.masses, get_pair_separations(system), config)
+        monkeypatch.setattr("src.parallel.PAIRS_PER_BLOCK", 120) #* A few rows at a time, so running sums are carried between them.
+        blocked = zeros((len(system), 3))
+        for start, stop in [(0, 23), (23, 50)]:
+            calc_row_block_accelerations(system.masses, system.positions, config, blocked, start, stop)
+        assert array_equal(blocked, expected)
+
+
+class TestWorkerPool:
+    def test_serial_for_single_worker_or_few_particles(self, config):
+        assert worker_pool_for(10_000, config) is None
+        config.workers = 4
+        assert worker_pool_for(10, config) is None
+
+    def test_pool_isnt_forked_from_a_threaded_process(self, make_system, parallel_config):
+        finished = Event()
+        thread = Thread(target=finished.wait) #* Stands in for the trajectory writer's thread.
+        thread.start()
+        try:
+            with catch_warnings(record=True) as caught:
+                simplefilter("always", DeprecationWarning)
+                assert worker_pool_for(len(make_system()), parallel_config) is not None
+            assert not [ warning for warning in caught if "fork" in str(warning.message) ]
+        finally:
+            finished.set()
+            thread.join()
+
+    @pytest.mark.parametrize("force_engine", ["direct", "barnes_hut"])
+    def test_accelerations_are_bit_identical(self, make_system, parallel_config, force_engine):
+        parallel_config.force_engine = force_engine
+        system = make_system()
+        calc_and_update_accel(system, parallel_config)
+
+        if force_engine == "barnes_hut":
+            expected = calc_barnes_hut_accelerations(system.masses, system.positions, parallel_config)
+        else:
+            expected = calc_accelerations(system.masses, get_pair_separations(system), parallel_config)
+        assert array_equal(system.accelerations, expected)
+
+    def test_collision_sweep_matches_serial(self, make_system, parallel_config):
+        parallel_config.collision_distance = 1.5
+        system = make_system()
+        parallel_pairs = collision_pairs_finder(system, parallel_config)
+        parallel_config.workers = 1
+        assert parallel_pairs and parallel_pairs == collision_pairs_finder(system, parallel_config)
+
+    def test_trajectories_are_bit_identical(self, make_system, parallel_config):
+        parallel_config.collision_distance = 0.5
+        parallel_system, serial_system = make_system(), make_system()
+
+        initialise_particles(parallel_system, parallel_config)
+        for _ in range(5):
+            simulate_timestep(parallel_system, parallel_config)
+
+        parallel_config.workers = 1
+        initialise_particles(serial_system, parallel_config)
+        for _ in range(5):
+            simulate_timestep(serial_system, parallel_config)
+
+        assert array_equal(parallel_system.ids, serial_system.ids)
+        assert array_equal(parallel_system.positions, serial_system.positions)
+        assert array_equal(parallel_system.velocities, serial_system.velocities)
@@ -0,0 +1,77 @@
+import pytest
+from numpy import arange, concatenate, full, zeros
+from numpy.linalg import norm
+from numpy.random import default_rng
+
+from src.classes.particle_system import ParticleSystem
+from src.collision_handler import get_pair_separations
+from src.motion_calcs import calc_accelerations, simulate_timestep
+from src.particle_mesh import calc_particle_mesh_accelerations, get_cloud_in_cell_weights
+
+
+def sphere(rng, n, radius):
+    directions = rng.normal(size=(n, 3))
+    directions /= norm(directions, axis=1)[:, None]
+    return radius * rng.random(n)[:, None]**(1/3) * directions
+
+
+def direct_accelerations(masses, positions, config):
+    system = ParticleSystem(arange(len(masses)), masses, positions, zeros((len(masses), 3)))
+    return calc_accelerations(masses, get_pair_separations(system), config)
+
+
+class TestCloudInCell:
+    def test_weights_sum_to_one_and_recover_position(self):
+        rng = default_rng(0)
+        positions = 10 * rng.random((100, 3))
+        indices, weights = get_cloud_in_cell_weights(positions, zeros(3), 1., 11)
+        assert weights.sum(axis=0) == pytest.approx(1)
+        nodes = arange(11**3)
+        node_positions = concatenate([ (nodes // 121)[:, None], (nodes // 11 % 11)[:, None], (nodes % 11)[:, None] ], axis=1)
+        assert (weights[:, :, None] * node_positions[indices]).sum(axis=0) == pytest.approx(positions)
+
+
+class TestParticleMeshAccuracy:
+    @pytest.mark.parametrize("mesh_size", [32, 64])
+    def test_far_field_matches_direct_sum(self, config, mesh_size):
+        #* A massive cluster, probed by light particles many grid spacings away from it.
+        rng = default_rng(1)
+        cluster, probes = sphere(rng, 400, 1.), sphere(rng, 50, 20.)
+        probes = probes[norm(probes, axis=1) > 10]
+        masses = concatenate([ 1 + rng.random(len(cluster)), full(len(probes), 1e-9) ])
+        positions = concatenate([cluster, probes])
+        config.mesh_size = mesh_size
+
+        approximate = calc_particle_mesh_accelerations(masses, positions, config)[len(cluster):]
+        exact = direct_accelerations(masses, positions, config)[len(cluster):]
+        assert (norm(approximate - exact, axis=1) / norm(exact, axis=1)).max() < 0.02
+
+    def test_error_shrinks_with_mesh_size(self, config):
+        rng = default_rng(2)
+        positions = sphere(rng, 2_000, 10.)
+        masses = 1 + rng.random(2_000)
+        exact = direct_accelerations(masses, positions, config)
+        outer = norm(positions, axis=1) > 8
+        errors = list()
+        for mesh_size in (16, 64):
+            config.mesh_size = mesh_size
+            approximate = calc_particle_mesh_accelerations(masses, positions, config)
+            errors.append((norm(approximate - exact, axis=1) / norm(exact, axis=1))[outer].mean())
+        assert errors[1] < errors[0] < 0.2
+
+    def test_net_force_is_small(self, config):
+        rng = default_rng(3)
+        positions, masses = sphere(rng, 1_000, 10.), 1 + rng.random(1_000)
+        accelerations = calc_particle_mesh_accelerations(masses, positions, config)
+        net_force = norm((masses[:, None] * accelerations).sum(axis=0))
+        assert net_force < 1e-3 * (masses[:, None] * norm(accelerations, axis=1)[:, None]).sum()
+
+    def test_single_particle_feels_nothing(self, config):
+        assert (calc_particle_mesh_accelerations(full(1, 5.), zeros((1, 3)), config) == 0).all()
+
+    def test_simulate_timestep_with_particle_mesh(self, initialised_particles, config):
+        config.force_engine = "particle_mesh"
+        momentum = lambda ptcls: sum([ptcl.mass*ptcl.velocity for ptcl in ptcls])
+        initial_momentum = momentum(initialised_particles)
+        simulate_timestep(initialised_particles, config)
+        assert norm(momentum(initialised_particles) - initial_momentum) < 1e-2 * sum( ptcl.mass for ptcl in initialised_particles )
@@ -1,6 +1,7 @@
 import pytest
+from numpy import array, array_equal, full, inf, zeros
 from numpy.linalg import norm
-from src.particle_setup import get_initial_random_particle_attributes
+from src.particle_setup import get_initial_random_particle_attributes, get_configured_system, validate_particle_arrays
 
 
 @pytest.fixture(params=[1, 4542243, 54254543452, 8127743453232155])
@@ -24,3 +25,48 @@ class TestInitialParticleAttributes:
         velocity = get_initial_random_particle_attributes(seed, config)[2]
         speed = norm(velocity)
         assert (0 <= speed) and (speed <= config.max_speed)
+
+
+class TestConfiguredSystem:
+    @pytest.mark.parametrize("config", [{"number_of_particles": 500, "max_mass": 3, "max_distance": 1.64, "max_speed": 1.213}], indirect=True)
+    def test_attributes_in_bounds(self, config):
+        system = get_configured_system(config)
+        assert array_equal(system.ids, range(500))
+        assert ((0 < system.masses) & (system.masses <= config.max_mass)).all()
+        assert (norm(system.positions, axis=1) <= config.max_distance).all()
+        assert (norm(system.velocities, axis=1) <= config.max_speed).all()
+
+    @pytest.mark.parametrize("config", [{"number_of_particles": 50}], indirect=True)
+    def test_same_seed_same_system(self, config):
+        first, second = get_configured_system(config), get_configured_system(config)
+        assert array_equal(first.masses, second.masses)
+        assert array_equal(first.positions, second.positions)
+        assert array_equal(first.velocities, second.velocities)
+
+    @pytest.mark.parametrize("config", [{"number_of_particles": 20, "legacy_seeding": True}], indirect=True)
+    def test_legacy_seeding_reproduces_per_seed_particles(self, seed, config):
+        config.random_seed = seed
+        system = get_configured_system(config)
+        for i in range(config.number_of_particles):
+            mass, position, velocity = get_initial_random_particle_attributes(seed + i, config)
+            assert system.masses[i] == mass
+            assert array_equal(system.positions[i], position)
+            assert array_equal(system.velocities[i], velocity)
+
+    @pytest.mark.parametrize("config", [{"number_of_particles": 0}], indirect=True)
+    def test_no_particles(self, config):
+        assert len(get_configured_system(config).ids) == 0
+
+
+class TestValidateParticleArrays:
+    def test_valid_arrays(self):
+        validate_particle_arrays(full(3, 1.), zeros((3, 3)), zeros((3, 3)))
+
+    @pytest.mark.parametrize("masses, positions, velocities, message", [
+        (array([1., 0., 1.]), zeros((3, 3)), zeros((3, 3)), "Mass must be greater than 0."),
+        (full(3, 1.), array([[0, 0, 0], [inf, 0, 0], [0, 0, 0]]), zeros((3, 3)), "Starting distance is too large!"),
+        (full(3, 1.), zeros((3, 3)), array([[0, 0, 0], [0, 0, 0], [0, 0, inf]]), "Starting speed is too large!"),
+    ])
+    def test_invalid_arrays(self, masses, positions, velocities, message):
+        with pytest.raises(ValueError, match=message):
+            validate_particle_arrays(masses, positions, velocities)
@@ -0,0 +1,93 @@
+import pytest
+from numpy import zeros, array_equal
+from numpy.linalg import norm
+
+from src.classes.particle import Particle
+from src.classes.particle_system import ParticleSystem
+from src.collision_handler import get_pair_separations, get_disp_dist_and_handle_collisions
+from src.motion_calcs import calc_accelerations, simulate_timestep, initialise_particles
+
+
+def direct_accelerations(particles, G):
+    """ Reference per-particle sum, as the simulation originally calculated it. """
+    accelerations = list()
+    for chosen in particles:
+        total_accel = zeros(3)
+        for other in particles:
+            if other is not chosen:
+                displacement = other.position - chosen.position
+                total_accel += G * other.mass * displacement / norm(displacement)**3
+        accelerations.append(total_accel)
+    return accelerations
+
+
+class TestParticleSystem:
+    def test_round_trip_preserves_state(self, particles):
+        system = ParticleSystem.from_particles(particles)
+        assert len(system) == len(particles)
+        for original, snapshot in zip(particles, system):
+            assert snapshot.id == original.id
+            assert snapshot.mass == original.mass
+            assert array_equal(snapshot.position, original.position)
+            assert array_equal(snapshot.velocity, original.velocity)
+
+    def test_remove_keeps_rows_matched(self, particles):
+        system = ParticleSystem.from_particles(particles)
+        system.remove([0])
+        assert list(system.ids) == [ptcl.id for ptcl in particles[1:]]
+        assert array_equal(system.positions, [ptcl.position for ptcl in particles[1:]])
+
+    def test_vectorised_accelerations_match_direct_sum(self, particles, config):
+        system = ParticleSystem.from_particles(particles)
+        accelerations = calc_accelerations(system.masses, get_pair_separations(system), config)
+        for accel, expected in zip(accelerations, direct_accelerations(particles, config.G)):
+            assert list(accel) == pytest.approx(list(expected), rel=1e-9, abs=1e-300)
+
+    def test_list_and_system_timesteps_agree(self, initialised_particles, config):
+        system = ParticleSystem.from_particles(initialised_particles)
+        simulate_timestep(initialised_particles, config)
+        simulate_timestep(system, config)
+        for particle, position in zip(initialised_particles, system.positions):
+            assert array_equal(particle.position, position)
+
+    def test_timestep_reuses_state_buffers(self, initialised_particles, config):
+        system = ParticleSystem.from_particles(initialised_particles)
+        buffers = (system.positions, system.velocities, system.accelerations, system.last_accelerations)
+        simulate_timestep(system, config)
+        assert system.positions is buffers[0]
+        assert system.velocities is buffers[1]
+        assert (system.accelerations is buffers[3]) and (system.last_accelerations is buffers[2])
+
+    def test_remove_returns_survivor_map(self, particles):
+        system = ParticleSystem.from_particles(particles)
+        survivors = system.remove([0])
+        assert list(survivors) == list(range(1, len(particles)))
+        assert len(system.last_accelerations) == len(system.scratch) == len(particles) - 1
+
+
+class TestCollisions:
+    def test_merge_conserves_mass_and_momentum(self, config):
+        config.collision_distance = 1
+        particles = [
+            Particle(0, 2, [0, 0, 0], [1, 0, 0]),
+            Particle(1, 1, [0.5, 0, 0], [0, 3, 0]),
+            Particle(2, 5, [50, 0, 0], [0, 0, 0]),
+        ]
+        system = ParticleSystem.from_particles(particles)
+        start_momentum = system.momenta().sum(axis=0)
+        get_disp_dist_and_handle_collisions(system, config)
+
+        assert list(system.ids) == [0, 2]
+        assert system.masses[0] == 3
+        assert list(system.positions[0]) == [0.25, 0, 0]
+        assert list(system.momenta().sum(axis=0)) == pytest.approx(list(start_momentum))
+
+    def test_momentum_conserved_through_merging_timesteps(self, config):
+        config.collision_distance = 0.5
+        particles = [ Particle(i, 1 + i, [i, 0.1*i, 0], [-1 if i % 2 else 1, 0, 0]) for i in range(4) ]
+        initialise_particles(particles, config)
+        start_momentum = sum(ptcl.momentum() for ptcl in particles)
+        for _ in range(1_000):
+            simulate_timestep(particles, config)
+        assert len(particles) < 4
+        assert list(sum(ptcl.momentum() for ptcl in particles)) == pytest.approx(list(start_momentum))
@@ -0,0 +1,70 @@
+import pytest
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from numpy import array, array_equal, column_stack, cos, linspace, sin, zeros
+from src.plotter import simplify_path, parse_position_logs, plot_paths
+
+
+def helix(points: int):
+    angles = linspace(0, 20, points)
+    return column_stack([cos(angles), sin(angles), angles / 20])
+
+
+class TestSimplifyPath:
+    def test_straight_line_keeps_ends(self):
+        line = column_stack([linspace(0, 1, 1_000), zeros(1_000), zeros(1_000)])
+        assert array_equal(simplify_path(line, 1e-9), line[[0, -1]])
+
+    def test_corner_kept(self):
+        path = array([[0, 0, 0], [1, 0, 0], [2, 0, 0], [2, 1, 0], [2, 2, 0]], dtype=float)
+        assert array_equal(simplify_path(path, 1e-9), path[[0, 2, 4]])
+
+    @pytest.mark.parametrize("tolerance", [1e-2, 1e-3])
+    def test_within_tolerance(self, tolerance):
+        path = helix(5_000)
+        simplified = simplify_path(path, tolerance)
+        assert len(simplified) < len(path) // 10
+        #* Every original point lies close to some segment of the simplified path.
+        starts, ends = simplified[:-1], simplified[1:]
+        chords = ends - starts
+        offsets = path[:, None, :] - starts[None, :, :]
+        along = ((offsets * chords).sum(axis=2) / (chords**2).sum(axis=1)).clip(0, 1)
+        distances = ((offsets - along[:, :, None] * chords)**2).sum(axis=2)**.5
+        assert distances.min(axis=1).max() <= tolerance + 1e-12
+
+    @pytest.mark.parametrize("max_points", [2, 10, 500])
+    def test_max_points(self, max_points):
+        path = helix(100_000)
+        simplified = simplify_path(path, 0, max_points)
+        assert len(simplified) == max_points
+        assert array_equal(simplified[[0, -1]], path[[0, -1]])
+
+    def test_thinning_keeps_sharp_kinks(self):
+        line = column_stack([linspace(0, 1, 100_001), zeros(100_001), zeros(100_001)])
+        line[50_001, 1] = 1 #* A close encounter, between the thinning's evenly spaced strides.
+        assert any( point[1] == 1 for point in simplify_path(line, 1e-3, 10) )
+
+    def test_short_paths_unchanged(self):
+        path = helix(2)
+        assert array_equal(simplify_path(path, 1.), path)
+
+
+class TestParsePositionLogs:
+    def test_parsed_to_coordinate_arrays(self):
+        parsed = parse_position_logs({ 0: [ [10, 20, 30], [11, 21, 31] ], 1: list() })
+        assert [ list(coordinates) for coordinates in parsed[0] ] == [ [10, 11], [20, 21], [30, 31] ]
+        assert all( len(coordinates) == 0 for coordinates in parsed[1] )
+
+    def test_simplified_per_particle(self):
+        parsed = parse_position_logs({ 0: helix(50_000), 1: list(helix(50_000)) }, max_points=100, tolerance=1e-3)
+        assert all( len(xs) == 100 for xs, _, _ in parsed.values() )
+
+
+class TestPlotPaths:
+    @pytest.mark.parametrize("config", [{"scatter": True, "lines": True}], indirect=True)
+    def test_one_artist_for_every_path(self, config):
+        ax = plt.figure().add_subplot(projection="3d")
+        plot_paths(ax, parse_position_logs({ id: helix(100) for id in range(30) }), config)
+        assert len(ax.collections) == 2
+        plt.close("all")
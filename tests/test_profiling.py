@@ -0,0 +1,40 @@
+from copy import copy
+
+from src.classes.particle_system import ParticleSystem
+from src.motion_calcs import simulate_timestep
+from src.profiling import PHASES, NULL_TIMER, StepObserver, StepProfiler, observing, start_phase_timer
+
+
+class TestProfiling:
+    def test_unobserved_timesteps_are_not_timed(self):
+        assert start_phase_timer(10) is NULL_TIMER
+
+    def test_profiler_accumulates_every_phase(self, initialised_particles, config):
+        system = ParticleSystem.from_particles(initialised_particles)
+        with observing(StepProfiler()) as profiler:
+            for _ in range(5):
+                simulate_timestep(system, config)
+        assert start_phase_timer(10) is NULL_TIMER #* No longer observed.
+
+        assert profiler.steps == 5
+        assert set(profiler.phase_seconds) == set(PHASES)
+        assert all( seconds > 0 for seconds in profiler.phase_seconds.values() )
+        assert profiler.alive == len(system)
+        assert profiler.pair_interactions == 5 * len(system) * (len(system) - 1) // 2
+        assert "pair interactions per second" in profiler.summary()
+
+    def test_collisions_are_counted(self, particles, config):
+        system = ParticleSystem.from_particles(particles)
+        collision_config = copy(config)
+        collision_config.collision_distance = 1e7 #* Everything collides within the first timestep.
+
+        class Recorder(StepObserver):
+            records = list()
+            def on_step(self, record):
+                self.records.append(record)
+
+        with observing(Recorder()) as recorder:
+            simulate_timestep(system, collision_config)
+            simulate_timestep(system, collision_config)
+        assert [ record.collisions for record in recorder.records ] == [len(particles) - 1, 0]
+        assert [ record.alive for record in recorder.records ] == [1, 1]
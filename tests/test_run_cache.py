@@ -0,0 +1,91 @@
+import os
+
+import pytest
+from numpy import array_equal
+
+from src.classes.particle_system import ParticleSystem
+from src.motion_calcs import initialise_particles, simulate_timestep
+from src.plotter import log_positions
+from src.run_cache import RunCache, run_key
+from src.trajectory import TrajectoryWriter, TrajectoryReader
+
+
+@pytest.fixture
+def recorded_run(particles, config, tmp_path):
+    """ Simulates a few timesteps of `particles`, streaming them to a trajectory. Returns the final system and the trajectory's folder. """
+    folder = tmp_path / "trajectory"
+    system = ParticleSystem.from_particles(particles)
+    initialise_particles(system, config)
+    writer = log_positions(system, TrajectoryWriter(folder, system.ids, 6))
+    for _ in range(5):
+        simulate_timestep(system, config)
+        writer = log_positions(system, writer)
+    writer.close()
+    return system, folder
+
+
+class TestRunKey:
+    def test_matches_for_equal_settings(self, config):
+        key = run_key(config)
+        config.max_mass = float(config.max_mass) #* Same setting, written differently.
+        assert run_key(config) == key
+
+    def test_ignores_plot_settings(self, config):
+        key = run_key(config)
+        config.marker_size, config.lines = 12, True
+        assert run_key(config) == key
+
+    @pytest.mark.parametrize("name, value", [("random_seed", 2), ("timesteps", 2_000), ("dt", 0.002), ("simple_log_rate", 1)])
+    def test_changes_with_trajectory_settings(self, config, name, value):
+        key = run_key(config)
+        setattr(config, name, value)
+        assert run_key(config) != key
+
+
+class TestRunCache:
+    def test_missing_run_is_not_loaded(self, config, tmp_path):
+        cache = RunCache(tmp_path / "cache", 2**30)
+        assert cache.load(run_key(config), config) is None
+
+    def test_stored_run_is_restored(self, recorded_run, config, tmp_path):
+        system, folder = recorded_run
+        cache = RunCache(tmp_path / "cache", 2**30)
+        cache.store(run_key(config), folder, system, config.timesteps + 1, 6, config)
+
+        final_system, cached_trajectory = cache.load(run_key(config), config)
+        assert array_equal(final_system.ids, system.ids)
+        assert array_equal(final_system.positions, system.positions)
+
+        assert not cached_trajectory.startswith(str(folder)) #* Kept apart from the run's own folder, which later runs overwrite.
+        original, restored = TrajectoryReader(folder), TrajectoryReader(cached_trajectory)
+        assert restored.keys() == original.keys()
+        for id in original.keys():
+            assert array_equal(restored[id], original[id])
+
+    def test_least_recently_used_runs_are_evicted(self, recorded_run, config, tmp_path):
+        system, folder = recorded_run
+        cache = RunCache(tmp_path / "cache", 2**30)
+        keys = dict()
+        for age, seed in enumerate((1, 2, 3)):
+            config.random_seed = seed
+            keys[seed] = run_key(config)
+            cache.store(keys[seed], folder, system, config.timesteps + 1, 6, config)
+            os.utime(cache.entry(keys[seed]), (age, age)) #* Set explicitly, as filesystem times may be too coarse to tell them apart.
+        config.random_seed = 1
+        cache.load(keys[1], config) #* Using the oldest run makes it the newest.
+
+        entry_size = sum( file.stat().st_size for file in (tmp_path / "cache" / keys[1]).rglob("*") if file.is_file() )
+        cache.max_bytes = 2*entry_size
+        assert cache.evict() == [keys[2]]
+        assert sorted(os.listdir(tmp_path / "cache")) == sorted([keys[1], keys[3]])
+
+    def test_runs_larger_than_the_cache_are_not_stored(self, recorded_run, config, tmp_path):
+        system, folder = recorded_run
+        cache = RunCache(tmp_path / "cache", 2**30)
+        kept = run_key(config)
+        cache.store(kept, folder, system, config.timesteps + 1, 6, config)
+        cache.max_bytes = 1
+
+        config.random_seed = 2
+        assert not cache.store(run_key(config), folder, system, config.timesteps + 1, 6, config)
+        assert os.listdir(tmp_path / "cache") == [kept] #* Older runs aren't evicted for it.
@@ -0,0 +1,61 @@
+import json
+import logging
+
+from src.classes.particle_system import ParticleSystem
+from src.main import run_timesteps
+from src.motion_calcs import simulate_timestep
+from src.profiling import observing
+from src.telemetry import StepTelemetry
+
+
+def read_records(filename) -> list[dict]:
+    with open(filename) as telemetry_file:
+        return [ json.loads(line) for line in telemetry_file ]
+
+
+class TestTelemetry:
+    def test_every_sampled_step_is_written(self, initialised_particles, config, tmp_path):
+        filename = tmp_path / "telemetry.jsonl"
+        system = ParticleSystem.from_particles(initialised_particles)
+        with observing(StepTelemetry(filename, 3, 64)) as telemetry:
+            for _ in range(10):
+                simulate_timestep(system, config)
+        telemetry.close()
+
+        records = read_records(filename)
+        assert [ record["step"] for record in records ] == [0, 3, 6, 9]
+        assert all( record["alive"] == len(system) for record in records )
+        assert set(records[0]["phase_seconds"]) == {"position", "collisions", "acceleration", "velocity"}
+        assert telemetry.dropped == 0
+
+    def test_overwritten_records_are_counted(self, initialised_particles, config, tmp_path):
+        filename = tmp_path / "telemetry.jsonl"
+        system = ParticleSystem.from_particles(initialised_particles)
+        with observing(StepTelemetry(filename, 1, 1)) as telemetry: #* Can only hold the latest record.
+            for _ in range(50):
+                simulate_timestep(system, config)
+        telemetry.close()
+
+        records = read_records(filename)
+        assert len(records) + telemetry.dropped == 50
+        assert records[-1]["step"] == 49
+
+    def test_resumed_telemetry_is_appended(self, initialised_particles, config, tmp_path):
+        filename = tmp_path / "telemetry.jsonl"
+        system = ParticleSystem.from_particles(initialised_particles)
+        for start_step in (0, 4):
+            with observing(StepTelemetry(filename, 2, 16, start_step)) as telemetry:
+                for _ in range(4):
+                    simulate_timestep(system, config)
+            telemetry.close()
+        assert [ record["step"] for record in read_records(filename) ] == [0, 2, 4, 6]
+
+    def test_step_logging_can_be_dropped(self, initialised_particles, config, caplog):
+        config.timesteps = 20
+        for step_logging, expected in ((True, True), (False, False)):
+            caplog.clear()
+            config.step_logging = step_logging
+            system = ParticleSystem.from_particles(initialised_particles)
+            with caplog.at_level(logging.INFO):
+                run_timesteps(system, { ptcl.id: list() for ptcl in initialised_particles }, config)
+            assert any( "Running timestep" in message for message in caplog.messages ) == expected
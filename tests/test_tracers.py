@@ -0,0 +1,107 @@
+import pytest
+from numpy import arange, array_equal, concatenate, full, zeros
+from numpy.linalg import norm
+from numpy.random import default_rng
+
+from src.checkpoint import save_checkpoint, load_checkpoint
+from src.classes.particle_system import ParticleSystem
+from src.collision_handler import get_pair_separations
+from src.motion_calcs import calc_accelerations, initialise_particles, simulate_timestep
+from src.particle_setup import get_configured_system
+from src.plotter import log_positions
+from src.tracers import calc_tracer_accelerations
+from src.trajectory import TrajectoryWriter, TrajectoryReader
+
+
+@pytest.fixture
+def tracer_config(config):
+    config.number_of_particles, config.number_of_tracers = 5, 200
+    return config
+
+
+class TestTracerAccelerations:
+    def test_match_direct_sum_of_massive_particles(self, config):
+        rng = default_rng(0)
+        masses, positions, tracer_positions = 1 + rng.random(5), rng.normal(size=(5, 3)), rng.normal(size=(50, 3))
+        accelerations, nearest = calc_tracer_accelerations(masses, positions, tracer_positions, config)
+
+        #* In a direct sum, negligible tracer masses barely pull on each other.
+        all_masses = concatenate([masses, full(50, 1e-30)])
+        all_positions = concatenate([positions, tracer_positions])
+        system = ParticleSystem(arange(55), all_masses, all_positions, zeros((55, 3)))
+        direct = calc_accelerations(all_masses, get_pair_separations(system), config)[5:]
+        assert accelerations == pytest.approx(direct, rel=1e-12)
+        assert nearest == pytest.approx(norm(tracer_positions[:, None] - positions[None], axis=2).min(axis=1))
+
+    def test_blocks_match_single_pass(self, config, monkeypatch):
+        rng = default_rng(1)
+        masses, positions, tracer_positions = 1 + rng.random(7), rng.normal(size=(7, 3)), rng.normal(size=(100, 3))
+        single = calc_tracer_accelerations(masses, positions, tracer_positions, config)[0]
+        monkeypatch.setattr("src.tracers.PAIRS_PER_BLOCK", 20)
+        assert array_equal(calc_tracer_accelerations(masses, positions, tracer_positions, config)[0], single)
+
+    def test_no_massive_particles(self, config):
+        accelerations, _ = calc_tracer_accelerations(zeros(0), zeros((0, 3)), zeros((3, 3)), config)
+        assert (accelerations == 0).all()
+
+
+class TestTracerSystems:
+    def test_configured_tracers(self, tracer_config):
+        system = get_configured_system(tracer_config)
+        assert array_equal(system.tracers.ids, 5 + arange(200))
+        assert (system.tracers.masses == 0).all()
+        assert (norm(system.tracers.positions, axis=1) <= tracer_config.max_distance).all()
+
+    def test_tracers_do_not_change_massive_particles(self, tracer_config):
+        with_tracers = get_configured_system(tracer_config)
+        tracer_config.number_of_tracers = 0
+        without_tracers = get_configured_system(tracer_config)
+        for system in (with_tracers, without_tracers):
+            initialise_particles(system, tracer_config)
+            for _ in range(50):
+                simulate_timestep(system, tracer_config)
+        assert array_equal(with_tracers.positions, without_tracers.positions)
+        assert array_equal(with_tracers.velocities, without_tracers.velocities)
+
+    def test_tracer_orbit_is_followed(self, config):
+        #* A tracer on a circular orbit around a single massive particle should stay on it.
+        config.G, config.dt = 1, 0.001
+        config.half_dtsq = .5 * config.dt**2
+        system = ParticleSystem([0], [1.], zeros((1, 3)), zeros((1, 3)))
+        system.tracers = ParticleSystem([1], [0.], [[1., 0, 0]], [[0, 1., 0]])
+        initialise_particles(system, config)
+        for _ in range(round(6.283 / config.dt)):
+            simulate_timestep(system, config)
+        assert norm(system.tracers.positions[0]) == pytest.approx(1, abs=1e-5)
+        assert system.tracers.positions[0] == pytest.approx([1, 0, 0], abs=1e-2)
+
+    def test_tracers_absorbed_on_collision(self, config):
+        config.collision_distance = 0.1
+        system = ParticleSystem([0], [1.], zeros((1, 3)), zeros((1, 3)))
+        system.tracers = ParticleSystem([1, 2], [0., 0.], [[0.5, 0, 0], [5., 0, 0]], [[-100., 0, 0], [0, 0, 0]])
+        initialise_particles(system, config)
+        for _ in range(10):
+            simulate_timestep(system, config)
+        assert array_equal(system.tracers.ids, [2])
+        assert system.masses[0] == 1 #* Absorbed, not merged.
+
+    def test_logged_alongside_massive_particles(self, tracer_config, tmp_path):
+        system = get_configured_system(tracer_config)
+        ids = system.logged_state()[0]
+        in_memory = log_positions(system, { int(id): list() for id in ids })
+        assert len(in_memory) == 205
+
+        writer = TrajectoryWriter(tmp_path, ids, 1)
+        writer.write(system)
+        writer.close()
+        reader = TrajectoryReader(tmp_path)
+        assert array_equal(reader[204], in_memory[204])
+        assert reader.masses[0, 204] == 0
+
+    def test_checkpoint_round_trip(self, tracer_config, tmp_path):
+        system = get_configured_system(tracer_config)
+        initialise_particles(system, tracer_config)
+        save_checkpoint(str(tmp_path / "checkpoint.npz"), system, 0, 0, tracer_config)
+        loaded, _, _ = load_checkpoint(str(tmp_path / "checkpoint.npz"), tracer_config)
+        for name in ("ids", "positions", "velocities", "accelerations"):
+            assert array_equal(getattr(loaded.tracers, name), getattr(system.tracers, name))
@@ -0,0 +1,71 @@
+import pytest
+from numpy import array_equal
+
+from src.classes.particle_system import ParticleSystem
+from src.motion_calcs import initialise_particles, simulate_timestep
+from src.plotter import log_positions, parse_position_logs
+from src.trajectory import TrajectoryWriter, TrajectoryReader, CHUNK_FRAMES
+
+
+@pytest.fixture
+def run_and_log(particles, config):
+    def run(position_log, steps: int = 20):
+        system = ParticleSystem.from_particles(particles)
+        initialise_particles(system, config)
+        position_log = log_positions(system, position_log)
+        for _ in range(steps):
+            simulate_timestep(system, config)
+            position_log = log_positions(system, position_log)
+            if len(system) > 2:
+                system.remove([len(system) - 1]) #* Stands in for collisions removing particles.
+        return position_log
+    return run
+
+
+class TestTrajectory:
+    def test_streamed_log_matches_in_memory_log(self, particles, run_and_log, tmp_path):
+        in_memory = run_and_log({ ptcl.id: list() for ptcl in particles })
+
+        writer = run_and_log(TrajectoryWriter(tmp_path, [ptcl.id for ptcl in particles], 21))
+        writer.close()
+        streamed = TrajectoryReader(tmp_path)
+
+        assert len(streamed) == len(in_memory)
+        for id, positions in in_memory.items():
+            assert array_equal(streamed[id], positions)
+        assert parse_position_logs(streamed).keys() == parse_position_logs(in_memory).keys()
+
+    def test_unfinished_trajectory_is_readable(self, particles, tmp_path):
+        system = ParticleSystem.from_particles(particles)
+        writer = TrajectoryWriter(tmp_path, system.ids, 10*CHUNK_FRAMES)
+        for _ in range(CHUNK_FRAMES):
+            writer.write(system)
+        writer.close()
+
+        reader = TrajectoryReader(tmp_path)
+        assert reader.frames == CHUNK_FRAMES
+        assert len(reader[particles[0].id]) == CHUNK_FRAMES
+
+    def test_writing_past_capacity_raises(self, particles, tmp_path):
+        system = ParticleSystem.from_particles(particles)
+        writer = TrajectoryWriter(tmp_path, system.ids, 1)
+        writer.write(system)
+        with pytest.raises(ValueError):
+            writer.write(system)
+        writer.close()
+
+    def test_write_errors_are_raised_instead_of_blocking(self, particles, tmp_path):
+        system = ParticleSystem.from_particles(particles)
+        writer = TrajectoryWriter(tmp_path, system.ids, 10*CHUNK_FRAMES)
+        system.ids[:] = system.ids.max() + 1 #* Not in the trajectory, so there's nowhere to write them.
+        with pytest.raises(IndexError):
+            for _ in range(5*CHUNK_FRAMES): #* More than the queue holds.
+                writer.write(system)
+            writer.sync()
+        with pytest.raises(IndexError):
+            writer.close()
+
+    def test_new_trajectory_starts_unwritten(self, particles, tmp_path):
+        writer = TrajectoryWriter(tmp_path, [ptcl.id for ptcl in particles], 10)
+        writer.close()
+        assert TrajectoryReader(tmp_path).frames == 0